@@ -0,0 +1,291 @@
+"""
+Offline accuracy and latency benchmark over data/eval.csv.
+
+Loads the CSV datasets into a temporary SQLite database and runs every eval question through
+`generate_and_execute_with_retries` concurrently, with a record/replay LLM stub in place of the
+model. Each case passes when its result matches the gold query's result (ignoring row order and
+column names). The JSON report has the accuracy, retry counts and p50/p95/p99 latency per stage.
+
+Without --cassette the gold SQL of each case is replayed as the model's answer, which benchmarks
+the pipeline itself. --record forwards the questions to the real model and saves its responses
+to the cassette file for later offline replays.
+
+Usage: python -m src.benchmarks.eval_harness [--cassette PATH [--record]] [--concurrency N]
+                                             [--output PATH]
+"""
+
+import argparse
+import asyncio
+import contextvars
+import csv
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+from sqlalchemy import Boolean, Float, Integer, create_engine
+from sqlalchemy.engine import Engine
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+from src.config import config
+from src.core.fake_llm import CassetteModel
+from src.core.llm import GenerativeModelWrapper, use_llm
+from src.db.bulk_load import TABLE_SOURCES, copy_columns
+from src.db.create_table import Base
+from src.utils.database_utils import DatabaseConnector
+
+STAGES = ["llm", "execute", "total"]
+
+# Stage timings of the case running in the current task
+_case_timings: contextvars.ContextVar[Optional[Dict[str, List[float]]]] = (
+    contextvars.ContextVar("case_timings", default=None)
+)
+
+
+def _sqlite_value(column, value: str):
+    if value == "":
+        return None
+    if isinstance(column.type, Boolean):
+        return value.strip().lower() in ("1", "1.0", "t", "true")
+    if isinstance(column.type, Integer):
+        return int(float(value))
+    if isinstance(column.type, Float):
+        return float(value)
+    return value
+
+
+def load_sqlite(data_dir: str = None, path: str = None, chunk_rows: int = 10_000) -> Engine:
+    """
+    Creates a SQLite database at `path` (a fresh temporary file by default) with the model
+    tables filled from the CSV datasets.
+    """
+    data_dir = data_dir or config.DATA_DIR
+    if path is None:
+        fd, path = tempfile.mkstemp(prefix="nl2sql_eval_", suffix=".sqlite")
+        os.close(fd)
+    if os.path.exists(path):
+        os.remove(path)
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    tables = list(TABLE_SOURCES)
+    Base.metadata.create_all(bind=engine, tables=tables)
+    for table, filename in TABLE_SOURCES.items():
+        with open(os.path.join(data_dir, filename), newline="") as f:
+            reader = csv.reader(f)
+            header = [name.strip().lower() for name in next(reader)]
+            columns = copy_columns(table, header)
+            positions = [header.index(name) for name in columns]
+            rows = []
+            with engine.begin() as conn:
+                for record in reader:
+                    rows.append(
+                        {
+                            name: _sqlite_value(table.columns[name], record[position])
+                            for name, position in zip(columns, positions)
+                        }
+                    )
+                    if len(rows) == chunk_rows:
+                        conn.execute(table.insert(), rows)
+                        rows = []
+                if rows:
+                    conn.execute(table.insert(), rows)
+    return engine
+
+
+def load_cases(path: str) -> List[Dict]:
+    """Reads the eval cases (question, gold SQL) from the eval CSV."""
+    with open(path, newline="") as f:
+        return [
+            {"question": row["description"].strip(), "sql": row["sql_query"].strip()}
+            for row in csv.DictReader(f)
+        ]
+
+
+def gold_cassette(cases: List[Dict]) -> Dict[str, List[str]]:
+    """Builds a cassette that answers every question with its gold SQL."""
+    return {case["question"]: [json.dumps({"sql": case["sql"]})] for case in cases}
+
+
+def result_signature(rows: List[Dict]) -> Counter:
+    """Returns an order-insensitive signature of a result that ignores column names."""
+    signature = Counter()
+    for row in rows:
+        values = []
+        for value in row.values():
+            if isinstance(value, float):
+                value = round(value, 2)
+                if value.is_integer():
+                    value = int(value)
+            values.append(value)
+        signature[tuple(values)] += 1
+    return signature
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """Returns the p50/p95/p99 of `samples` in milliseconds."""
+    if not samples:
+        return {"count": 0, "p50_ms": None, "p95_ms": None, "p99_ms": None}
+    if len(samples) == 1:
+        cut_points = samples * 99
+    else:
+        cut_points = statistics.quantiles(samples, n=100, method="inclusive")
+    return {
+        "count": len(samples),
+        "p50_ms": round(cut_points[49] * 1000, 3),
+        "p95_ms": round(cut_points[94] * 1000, 3),
+        "p99_ms": round(cut_points[98] * 1000, 3),
+    }
+
+
+class _TimedModel:
+    """Wraps a model and records the latency of each call into the running case's timings."""
+
+    def __init__(self, model):
+        self.model = model
+
+    async def generate_content_async(self, prompt: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await self.model.generate_content_async(prompt, **kwargs)
+        finally:
+            _case_timings.get()["llm"].append(time.perf_counter() - start)
+
+
+async def run_case(case: Dict, connector: DatabaseConnector, semaphore: asyncio.Semaphore) -> Dict:
+    """Runs one eval case through the pipeline and compares its result with the gold result."""
+    # Imported here so the app's import-time setup picks up the harness configuration
+    from src.server.app import generate_and_execute_with_retries
+
+    timings: Dict[str, List[float]] = defaultdict(list)
+    _case_timings.set(timings)
+
+    async def execute(sql: str) -> List[Dict]:
+        start = time.perf_counter()
+        try:
+            return await connector.execute_query_async(sql)
+        finally:
+            timings["execute"].append(time.perf_counter() - start)
+
+    async with semaphore:
+        expected = await connector.execute_query_async(case["sql"])
+        start = time.perf_counter()
+        try:
+            sql, results = await generate_and_execute_with_retries(case["question"], execute)
+            error = None
+        except Exception as e:
+            sql, results = None, None
+            error = getattr(e, "detail", str(e))
+        timings["total"].append(time.perf_counter() - start)
+
+    return {
+        "question": case["question"],
+        "sql": sql,
+        "match": results is not None and result_signature(results) == result_signature(expected),
+        "llm_calls": len(timings["llm"]),
+        "retries": max(len(timings["llm"]) - 1, 0),
+        "error": error,
+        "timings": timings,
+    }
+
+
+async def run_eval(
+    cases: List[Dict],
+    model,
+    engine: Engine,
+    concurrency: int = 4,
+) -> Dict:
+    """Runs all cases concurrently against `engine` with `model` and returns the report."""
+    # Fresh caches so every case exercises generation and execution; the app's model, SQL
+    # cache and connector are restored afterwards
+    from src.server import app
+
+    app.sql_cache.memory.clear()
+    disk_cache, app.sql_cache.disk = app.sql_cache.disk, None
+    llm = GenerativeModelWrapper(model_name=config.LLM_MODEL_NAME, model=_TimedModel(model))
+    connector = DatabaseConnector(engine=engine, result_cache_bytes=0, executor_workers=concurrency)
+    # Checks such as the speculative EXPLAIN go through the app's connector
+    app_connector, app.db_connector = app.db_connector, connector
+    semaphore = asyncio.Semaphore(concurrency)
+
+    start = time.perf_counter()
+    try:
+        with use_llm(llm):
+            outcomes = await asyncio.gather(
+                *(run_case(case, connector, semaphore) for case in cases)
+            )
+    finally:
+        app.db_connector = app_connector
+        app.sql_cache.memory.clear()
+        app.sql_cache.disk = disk_cache
+        connector.close()
+    elapsed = time.perf_counter() - start
+
+    stage_samples = defaultdict(list)
+    for outcome in outcomes:
+        for stage, samples in outcome.pop("timings").items():
+            stage_samples[stage].extend(samples)
+    retries = [outcome["retries"] for outcome in outcomes]
+    matched = sum(outcome["match"] for outcome in outcomes)
+    return {
+        "cases": len(cases),
+        "matched": matched,
+        "accuracy": round(matched / len(cases), 4) if cases else None,
+        "failed": sum(outcome["error"] is not None for outcome in outcomes),
+        "retries": {
+            "total": sum(retries),
+            "cases_with_retries": sum(1 for count in retries if count),
+            "max": max(retries, default=0),
+        },
+        "latency": {stage: percentiles(stage_samples[stage]) for stage in STAGES},
+        "wall_seconds": round(elapsed, 3),
+        "concurrency": concurrency,
+        "results": outcomes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the offline eval benchmark.")
+    parser.add_argument("--eval", default=os.path.join(config.DATA_DIR, "eval.csv"))
+    parser.add_argument("--data-dir", default=config.DATA_DIR)
+    parser.add_argument("--cassette", help="recorded model responses to replay (or record to)")
+    parser.add_argument(
+        "--record", action="store_true", help="call the real model and save its responses"
+    )
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+    if args.record and not args.cassette:
+        parser.error("--record needs --cassette")
+
+    cases = load_cases(args.eval)
+    if args.record:
+        model = CassetteModel(inner=GenerativeModelWrapper(config.LLM_MODEL_NAME).model)
+        for case in cases:
+            model.add_question(case["question"])
+    elif args.cassette:
+        model = CassetteModel.from_file(args.cassette)
+    else:
+        model = CassetteModel(gold_cassette(cases))
+
+    engine = load_sqlite(args.data_dir)
+    try:
+        report = asyncio.run(run_eval(cases, model, engine, args.concurrency))
+    finally:
+        engine.dispose()
+        os.remove(engine.url.database)
+    if args.record:
+        model.save(args.cassette)
+
+    output = json.dumps(report, indent=2, default=str)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
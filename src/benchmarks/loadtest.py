@@ -0,0 +1,345 @@
+"""
+HTTP load test of POST /chat.
+
+Serves the app in process through httpx with the fake LLM in place of the model: it answers
+every eval question with its gold SQL after `--llm-latency` seconds (plus up to
+`--llm-jitter`) and fails with `--llm-failure-rate` chance. The database is SQLite (default)
+or embedded DuckDB loaded from DATA_DIR, or the configured one with --database env.
+
+`--concurrency` clients send `--requests` requests back to back. The request mix is a list of
+weighted kinds:
+- unique: an eval question made unique per request, so it misses the SQL cache
+- repeat: an eval question verbatim, served from the caches once answered
+- invalid: a question answered with broken SQL, which goes through every correction attempt
+
+Questions, kinds and fake LLM latencies and failures come from generators seeded with
+`--seed`, so runs with the same settings send the same requests. The JSON report has
+requests/s, latency percentiles (overall, per kind and per pipeline stage from the
+Server-Timing headers), outcomes and event-loop lag, along with the settings and git commit
+it was measured with. --baseline adds the change against an earlier report.
+
+Usage: python -m src.benchmarks.loadtest [--requests N] [--concurrency N]
+                                         [--mix unique=7,repeat=2,invalid=1]
+                                         [--llm-latency S] [--llm-failure-rate P]
+                                         [--database sqlite|duckdb|env] [--baseline PATH]
+                                         [--output PATH]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+from src.benchmarks.eval_harness import load_cases, load_sqlite, percentiles
+from src.config import config
+from src.core.fake_llm import FakeGenerativeModel
+from src.core.llm import GenerativeModelWrapper, set_llm
+from src.utils.database_utils import DatabaseConnector
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../"))
+
+REQUEST_KINDS = ("unique", "repeat", "invalid")
+DEFAULT_MIX = "unique=7,repeat=2,invalid=1"
+INVALID_QUESTION = "Load test question without an answer"
+INVALID_SQL = "SELECT missing_column FROM missing_table"
+
+_NO_RESULTS_RE = re.compile(r'<div class="no-results">\s*<p>(.*?)</p>', re.DOTALL)
+_SERVER_TIMING_RE = re.compile(r"([\w-]+);dur=([\d.]+)")
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """Parses a request mix such as "unique=7,repeat=2,invalid=1" into weights per kind."""
+    weights = {}
+    for part in mix.split(","):
+        kind, _, weight = part.partition("=")
+        kind = kind.strip()
+        if kind not in REQUEST_KINDS:
+            raise ValueError(f"Unknown request kind: {kind}")
+        weights[kind] = float(weight or 1)
+    if not any(weights.values()):
+        raise ValueError("The request mix needs a positive weight")
+    return weights
+
+
+def build_requests(
+    cases: List[Dict], mix: Dict[str, float], count: int, seed: int = 0
+) -> List[Tuple[str, str]]:
+    """Returns `count` (kind, question) requests drawn from the eval cases by `mix`."""
+    rng = random.Random(seed)
+    kinds = rng.choices(list(mix), weights=list(mix.values()), k=count)
+    requests = []
+    for index, kind in enumerate(kinds):
+        if kind == "invalid":
+            question = f"{INVALID_QUESTION} {index}"
+        else:
+            question = rng.choice(cases)["question"]
+            if kind == "unique":
+                question = f"{question.rstrip('?.! ')} (load test request {index})"
+        requests.append((kind, question))
+    return requests
+
+
+def fake_model(cases: List[Dict], latency: float, jitter: float, failure_rate: float, seed: int):
+    """Builds the fake LLM: gold SQL for the eval questions, broken SQL for invalid ones."""
+    responses = {case["question"]: case["sql"] for case in cases}
+    responses[INVALID_QUESTION] = INVALID_SQL
+    return FakeGenerativeModel(
+        responses=responses,
+        latency=latency,
+        jitter=jitter,
+        failure_rate=failure_rate,
+        seed=seed,
+    )
+
+
+def git_commit() -> Dict:
+    """Returns the checked-out commit and whether the working tree has changes."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        status = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+    return {"commit": commit, "dirty": bool(status.strip())}
+
+
+def classify(status_code: int, body: str) -> str:
+    """Returns the outcome of a /chat response: ok, empty, error or http_<status>."""
+    if status_code != 200:
+        return f"http_{status_code}"
+    match = _NO_RESULTS_RE.search(body)
+    if match is None:
+        return "ok"
+    return "empty" if "No results found" in match.group(1) else "error"
+
+
+def parse_server_timing(header: str) -> Dict[str, float]:
+    """Parses a Server-Timing header into seconds per stage."""
+    return {stage: float(ms) / 1000 for stage, ms in _SERVER_TIMING_RE.findall(header or "")}
+
+
+async def monitor_loop_lag(samples: List[float], interval: float) -> None:
+    """Records how late the event loop wakes up from `interval`-second sleeps until cancelled."""
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(max(time.perf_counter() - start - interval, 0.0))
+
+
+async def drive(
+    requests: List[Tuple[str, str]], concurrency: int, warmup: int = 0
+) -> Tuple[List[Dict], float]:
+    """
+    Sends the requests to /chat from `concurrency` clients and returns one record per measured
+    request (the first `warmup` are left out) and the measured wall time.
+    """
+    import httpx
+
+    from src.server.app import app
+
+    records: List[Dict] = []
+    pending = iter(enumerate(requests))
+    measure_start = [time.perf_counter()]
+
+    async def client_loop(client: "httpx.AsyncClient") -> None:
+        for index, (kind, question) in pending:
+            if index == warmup:
+                measure_start[0] = time.perf_counter()
+            start = time.perf_counter()
+            response = await client.post("/chat", data={"text": question})
+            elapsed = time.perf_counter() - start
+            if index >= warmup:
+                records.append(
+                    {
+                        "kind": kind,
+                        "seconds": elapsed,
+                        "outcome": classify(response.status_code, response.text),
+                        "stages": parse_server_timing(response.headers.get("Server-Timing")),
+                    }
+                )
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://loadtest", timeout=None
+    ) as client:
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+    return records, time.perf_counter() - measure_start[0]
+
+
+def _connector(
+    database: str, data_dir: str, workers: int
+) -> Tuple[DatabaseConnector, Optional[str]]:
+    """Returns the connector for `database` and the temporary file to remove afterwards."""
+    if database == "sqlite":
+        engine = load_sqlite(data_dir)
+        return DatabaseConnector(engine=engine, executor_workers=workers), engine.url.database
+    if database == "duckdb":
+        from src.db.embedded import create_embedded_engine
+
+        engine, _ = create_embedded_engine(data_dir=data_dir)
+        return DatabaseConnector(engine=engine, executor_workers=workers), None
+    if database == "env":
+        return DatabaseConnector(executor_workers=workers), None
+    raise ValueError(f"Unknown database: {database}")
+
+
+async def run_load(settings: Dict, cases: List[Dict], connector: DatabaseConnector) -> Dict:
+    """Runs the load test described by `settings` against the app and returns the report."""
+    from src.server import app as server
+
+    model = fake_model(
+        cases,
+        settings["llm_latency"],
+        settings["llm_jitter"],
+        settings["llm_failure_rate"],
+        settings["seed"],
+    )
+    set_llm(GenerativeModelWrapper(model_name=config.LLM_MODEL_NAME, model=model))
+    # Start from empty caches so every run measures the same work
+    server.sql_cache.memory.clear()
+    server.sql_cache.disk = None
+    app_connector, server.db_connector = server.db_connector, connector
+    total = settings["requests"] + settings["warmup"]
+    requests = build_requests(cases, parse_mix(settings["mix"]), total, settings["seed"])
+
+    lag: List[float] = []
+    try:
+        async with server.app.router.lifespan_context(server.app):
+            monitor = asyncio.ensure_future(monitor_loop_lag(lag, settings["lag_interval"]))
+            try:
+                records, elapsed = await drive(
+                    requests, settings["concurrency"], settings["warmup"]
+                )
+            finally:
+                monitor.cancel()
+    finally:
+        server.db_connector = app_connector
+
+    by_kind = defaultdict(list)
+    by_stage = defaultdict(list)
+    for record in records:
+        by_kind[record["kind"]].append(record["seconds"])
+        for stage, seconds in record["stages"].items():
+            by_stage[stage].append(seconds)
+    return {
+        **git_commit(),
+        "python": platform.python_version(),
+        "settings": settings,
+        "requests": len(records),
+        "wall_seconds": round(elapsed, 3),
+        "requests_per_second": round(len(records) / elapsed, 2) if elapsed > 0 else None,
+        "outcomes": dict(Counter(record["outcome"] for record in records)),
+        "latency": percentiles([record["seconds"] for record in records]),
+        "latency_by_kind": {
+            kind: percentiles(samples) for kind, samples in sorted(by_kind.items())
+        },
+        "stages": {stage: percentiles(samples) for stage, samples in sorted(by_stage.items())},
+        "event_loop_lag": {
+            **percentiles(lag),
+            "max_ms": round(max(lag, default=0.0) * 1000, 3),
+        },
+        "llm": {"calls": model.calls, "failures": model.failures},
+    }
+
+
+def compare(report: Dict, baseline: Dict) -> Dict:
+    """Returns the change of throughput and latency against a baseline report."""
+
+    def change(current, previous):
+        if current is None or not previous:
+            return None
+        return round((current - previous) / previous * 100, 1)
+
+    metrics = {
+        "requests_per_second": (report["requests_per_second"], baseline["requests_per_second"])
+    }
+    for section in ("latency", "event_loop_lag"):
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            metrics[f"{section}_{key}"] = (report[section][key], baseline[section][key])
+    return {
+        "baseline_commit": baseline.get("commit"),
+        "same_settings": report["settings"] == baseline.get("settings"),
+        "metrics": {
+            name: {
+                "baseline": previous,
+                "current": current,
+                "change_percent": change(current, previous),
+            }
+            for name, (current, previous) in metrics.items()
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test /chat with a fake LLM.")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=0, help="requests sent before measuring")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="weighted request kinds")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="seconds per LLM call")
+    parser.add_argument("--llm-jitter", type=float, default=0.0, help="extra random seconds")
+    parser.add_argument("--llm-failure-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--database", choices=("sqlite", "duckdb", "env"), default="sqlite")
+    parser.add_argument("--data-dir", default=config.DATA_DIR)
+    parser.add_argument("--eval", default=os.path.join(config.DATA_DIR, "eval.csv"))
+    parser.add_argument(
+        "--lag-interval", type=float, default=0.01, help="seconds between event-loop lag probes"
+    )
+    parser.add_argument("--baseline", help="earlier report to compare against")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+    try:
+        parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+
+    settings = {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "warmup": args.warmup,
+        "mix": args.mix,
+        "llm_latency": args.llm_latency,
+        "llm_jitter": args.llm_jitter,
+        "llm_failure_rate": args.llm_failure_rate,
+        "seed": args.seed,
+        "database": args.database,
+        "lag_interval": args.lag_interval,
+    }
+    cases = load_cases(args.eval)
+    connector, temporary = _connector(args.database, args.data_dir, config.DB_EXECUTOR_WORKERS)
+    try:
+        report = asyncio.run(run_load(settings, cases, connector))
+    finally:
+        if temporary:
+            os.remove(temporary)
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["comparison"] = compare(report, json.load(f))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
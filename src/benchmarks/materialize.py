@@ -0,0 +1,94 @@
+"""
+Micro-benchmark of the query result materializers.
+
+Runs the same SELECT through `DatabaseConnector` with the pandas and the plain records
+materializer on in-memory SQLite tables of 10, 1k and 100k rows and prints the median time
+after a warm-up run.
+
+Usage: python -m src.benchmarks.materialize [--repeat N]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+from sqlalchemy import create_engine, text
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+from src.utils.database_utils import DatabaseConnector
+
+ROW_COUNTS = [10, 1_000, 100_000]
+
+
+def build_engine(rows: int):
+    """Creates an in-memory SQLite database with a flights-like table of `rows` rows."""
+    engine = create_engine("sqlite:///:memory:")
+    rng = random.Random(42)
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "CREATE TABLE flights (id INTEGER, airline TEXT, departure_delay REAL, "
+                "distance INTEGER, cancellation_reason TEXT)"
+            )
+        )
+        conn.execute(
+            text(
+                "INSERT INTO flights VALUES "
+                "(:id, :airline, :departure_delay, :distance, :cancellation_reason)"
+            ),
+            [
+                {
+                    "id": index,
+                    "airline": rng.choice(["AA", "UA", "WN", "DL"]),
+                    "departure_delay": None if index % 10 == 0 else rng.uniform(-20, 200),
+                    "distance": rng.randint(50, 3000),
+                    "cancellation_reason": rng.choice([None, None, None, "A", "B"]),
+                }
+                for index in range(rows)
+            ],
+        )
+    return engine
+
+
+def time_materializer(rows: int, materializer: str, repeat: int) -> float:
+    """
+    Returns the median time of `repeat` runs on a fresh table of `rows` rows. A warm-up run
+    comes first, so imports and first-use setup are not timed. Closing the connector disposes
+    its engine, which drops the in-memory table, so each materializer builds its own.
+    """
+    engine = build_engine(rows)
+    connector = DatabaseConnector(
+        engine=engine, result_cache_bytes=0, executor_workers=1, materializer=materializer
+    )
+    try:
+        connector.execute_query("SELECT * FROM flights")
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            connector.execute_query("SELECT * FROM flights")
+            timings.append(time.perf_counter() - start)
+        return statistics.median(timings)
+    finally:
+        connector.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'pandas (ms)':>12} {'records (ms)':>13} {'speedup':>8}")
+    for rows in ROW_COUNTS:
+        pandas_time = time_materializer(rows, "pandas", args.repeat)
+        records_time = time_materializer(rows, "records", args.repeat)
+        print(
+            f"{rows:>8} {pandas_time * 1000:>12.2f} {records_time * 1000:>13.2f} "
+            f"{pandas_time / records_time:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
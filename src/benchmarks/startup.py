@@ -0,0 +1,165 @@
+"""
+Cold start benchmark of the web app.
+
+Each run starts a fresh interpreter. Two things are measured:
+1. Import time of `src.server.app`, taken from `python -X importtime`, along with its slowest
+   direct imports.
+2. Time to first request: importing the app, running its lifespan start-up (which includes the
+   warm-up), then serving GET /readyz and GET / in process through httpx.
+
+By default it runs offline against an in-memory SQLite database and the fake LLM. --use-env
+keeps the configured database and model instead. The JSON report has the median and minimum
+of every measurement, in milliseconds.
+
+Usage: python -m src.benchmarks.startup [--runs N] [--top N] [--use-env] [--output PATH]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../"))
+
+_FIRST_REQUEST = """
+import asyncio, json, time
+start = time.perf_counter()
+import httpx
+from src.server.app import app
+imported = time.perf_counter()
+
+async def main():
+    async with app.router.lifespan_context(app):
+        started = time.perf_counter()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://startup") as client:
+            ready = await client.get("/readyz")
+            await client.get("/")
+        done = time.perf_counter()
+    return {
+        "import_ms": (imported - start) * 1000,
+        "startup_ms": (started - imported) * 1000,
+        "first_request_ms": (done - started) * 1000,
+        "ready": ready.status_code == 200,
+    }
+
+print(json.dumps(asyncio.run(main())))
+"""
+
+
+def _environment(use_env: bool) -> Dict[str, str]:
+    env = dict(os.environ)
+    if not use_env:
+        env.update({"DATABASE_URL": "sqlite://", "LLM_BACKEND": "fake"})
+    return env
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """Parses `-X importtime` output into (module, depth, self_us, cumulative_us) records."""
+    records = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|", 2)
+        if not self_us.strip().isdigit():
+            continue  # the header line
+        records.append(
+            {
+                "module": name.strip(),
+                "depth": (len(name) - len(name.lstrip())) // 2,
+                "self_us": int(self_us),
+                "cumulative_us": int(cumulative_us),
+            }
+        )
+    return records
+
+
+def measure_import(env: Dict[str, str]) -> List[Dict]:
+    """Imports the app in a fresh interpreter and returns its import time records."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import src.server.app"],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return parse_importtime(result.stderr)
+
+
+def measure_first_request(env: Dict[str, str]) -> Dict:
+    """Starts the app in a fresh interpreter and returns its time to first request."""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", _FIRST_REQUEST],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    # Includes interpreter start-up and shutdown
+    timings["process_ms"] = (time.perf_counter() - start) * 1000
+    return timings
+
+
+def _summary(samples: List[float]) -> Dict:
+    return {"median_ms": round(statistics.median(samples), 1), "min_ms": round(min(samples), 1)}
+
+
+def run(runs: int = 5, top: int = 10, use_env: bool = False) -> Dict:
+    """Runs the import and first-request measurements `runs` times and returns the report."""
+    env = _environment(use_env)
+    imports = [measure_import(env) for _ in range(runs)]
+    first_requests = [measure_first_request(env) for _ in range(runs)]
+
+    totals = [
+        next(r["cumulative_us"] for r in records if r["module"] == "src.server.app") / 1000
+        for records in imports
+    ]
+    # Slowest direct imports of the app in the median run, by cumulative time
+    median_run = sorted(zip(totals, imports), key=lambda item: item[0])[len(imports) // 2][1]
+    direct = [r for r in median_run if r["depth"] == 1]
+    slowest = sorted(direct, key=lambda r: r["cumulative_us"], reverse=True)[:top]
+    return {
+        "runs": runs,
+        "import": {
+            **_summary(totals),
+            "slowest": [
+                {"module": r["module"], "cumulative_ms": round(r["cumulative_us"] / 1000, 1)}
+                for r in slowest
+            ],
+        },
+        "first_request": {
+            stage: _summary([timings[stage] for timings in first_requests])
+            for stage in ("import_ms", "startup_ms", "first_request_ms", "process_ms")
+        },
+        "ready": all(timings["ready"] for timings in first_requests),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the app's cold start.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="slowest imports to report")
+    parser.add_argument(
+        "--use-env", action="store_true", help="use the configured database and LLM"
+    )
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    output = json.dumps(run(args.runs, args.top, args.use_env), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
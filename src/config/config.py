@@ -10,5 +10,120 @@ DB_PASS = os.getenv("PASS")
 DB_NAME = os.getenv("DATABASE")
 DB_USER = os.getenv("USER")
 DB_HOST = os.getenv("HOST")
+# "postgresql" (or any SQLAlchemy dialect), or "duckdb" for the embedded engine over DATA_DIR
 DB_CLIENT = os.getenv("DATABASE_CLIENT")
 DB_PORT = os.getenv("PORT")
+# Full SQLAlchemy URL, overrides the individual connection settings above when set
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+# NL->SQL cache
+SQL_CACHE_SIZE = int(os.getenv("SQL_CACHE_SIZE", "1024"))
+SQL_CACHE_TTL = float(os.getenv("SQL_CACHE_TTL", "3600"))
+SQL_CACHE_PATH = os.getenv("SQL_CACHE_PATH")
+
+# Executed-SQL result cache
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RESULT_CACHE_VERSION_CHECK = float(os.getenv("RESULT_CACHE_VERSION_CHECK", "1.0"))
+
+# Database execution thread pool used by the async query path
+DB_EXECUTOR_WORKERS = int(os.getenv("DB_EXECUTOR_WORKERS", "8"))
+
+# Primary connection pool: size (0 = one connection per DB_EXECUTOR_WORKERS thread), extra
+# connections under load, seconds before a connection is replaced and liveness check on checkout
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "0"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+# Comma-separated SQLAlchemy URLs of read replicas that serve the generated SELECTs
+DATABASE_REPLICA_URLS = [
+    url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()
+]
+# Replica pools, configured like the primary's unless set
+DB_REPLICA_POOL_SIZE = int(os.getenv("DB_REPLICA_POOL_SIZE", str(DB_POOL_SIZE)))
+DB_REPLICA_MAX_OVERFLOW = int(os.getenv("DB_REPLICA_MAX_OVERFLOW", str(DB_MAX_OVERFLOW)))
+DB_REPLICA_POOL_RECYCLE = int(os.getenv("DB_REPLICA_POOL_RECYCLE", str(DB_POOL_RECYCLE)))
+DB_REPLICA_POOL_PRE_PING = (
+    os.getenv("DB_REPLICA_POOL_PRE_PING", str(DB_POOL_PRE_PING)).lower() in ("1", "true", "yes")
+)
+# Replica choice ("least_busy" or "round_robin"), and how many connection failures in a row
+# take a replica out of rotation for DB_REPLICA_EJECT_SECONDS
+DB_REPLICA_BALANCING = os.getenv("DB_REPLICA_BALANCING", "least_busy")
+DB_REPLICA_MAX_FAILURES = int(os.getenv("DB_REPLICA_MAX_FAILURES", "3"))
+DB_REPLICA_EJECT_SECONDS = float(os.getenv("DB_REPLICA_EJECT_SECONDS", "30"))
+
+# LLM backend: "gemini" for the Google API, "fake" for the offline stand-in
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+LLM_MODEL_NAME = os.getenv("LLM_MODEL_NAME", "gemini-2.0-flash")
+FAKE_LLM_RESPONSES = os.getenv("FAKE_LLM_RESPONSES")
+# Admission control for LLM calls: calls in flight, waiting calls (more get a 503), calls per
+# second (0 disables) with bursts of up to LLM_RATE_BURST, and the longest wait in the queue
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_QUEUE_SIZE = int(os.getenv("LLM_QUEUE_SIZE", "64"))
+LLM_RATE_LIMIT = float(os.getenv("LLM_RATE_LIMIT", "0"))
+LLM_RATE_BURST = int(os.getenv("LLM_RATE_BURST", "10"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "30"))
+# Open a database connection, create the LLM client and compile templates before reporting ready
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "true").lower() in ("1", "true", "yes")
+# Seconds /readyz waits for the database to answer
+READINESS_TIMEOUT = float(os.getenv("READINESS_TIMEOUT", "2.0"))
+# Speculative generation: request this many candidate SQLs at once (1 disables), at these
+# temperatures, with at most SPECULATIVE_MAX_CONCURRENCY LLM calls in flight per request
+SPECULATIVE_CANDIDATES = int(os.getenv("SPECULATIVE_CANDIDATES", "1"))
+SPECULATIVE_TEMPERATURES = [
+    float(value) for value in os.getenv("SPECULATIVE_TEMPERATURES", "0.0,0.4,0.8").split(",")
+]
+SPECULATIVE_MAX_CONCURRENCY = int(os.getenv("SPECULATIVE_MAX_CONCURRENCY", "3"))
+# Upper bound for a single LLM call in seconds
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "600"))
+DB_STREAM_FETCH_SIZE = int(os.getenv("DB_STREAM_FETCH_SIZE", "1000"))
+# Row materializer for query results: "records" (plain DB-API rows) or "pandas"
+DB_MATERIALIZER = os.getenv("DB_MATERIALIZER", "records")
+
+# Directory holding the CSV datasets
+DATA_DIR = os.getenv("DATA_DIR", "data")
+# Typed Parquet copies of the datasets, used by the loaders once converted
+PARQUET_DIR = os.getenv("PARQUET_DIR", os.path.join(DATA_DIR, "parquet"))
+# Rows per Parquet row group, the unit readers skip using column statistics
+PARQUET_ROW_GROUP_ROWS = int(os.getenv("PARQUET_ROW_GROUP_ROWS", "131072"))
+# DuckDB database file for DATABASE_CLIENT=duckdb; unset keeps the data in memory
+DUCKDB_PATH = os.getenv("DUCKDB_PATH")
+# PostgreSQL layout of flights: partitioned by (year, month), and an optional flight_date
+# column derived from year/month/day so date-range filters skip partitions too
+FLIGHTS_PARTITIONED = os.getenv("FLIGHTS_PARTITIONED", "true").lower() in ("1", "true", "yes")
+FLIGHT_DATE_COLUMN = os.getenv("FLIGHT_DATE_COLUMN", "false").lower() in ("1", "true", "yes")
+
+# JSONL log of generated SQL that executed successfully, replayed by the index advisor
+SQL_LOG_PATH = os.getenv("SQL_LOG_PATH")
+
+# Send only the tables and columns relevant to each question in the prompt
+PROMPT_PRUNING = os.getenv("PROMPT_PRUNING", "true").lower() in ("1", "true", "yes")
+PROMPT_PRUNE_MIN_COLUMNS = int(os.getenv("PROMPT_PRUNE_MIN_COLUMNS", "10"))
+
+# Check generated SQL locally (single SELECT, known tables/columns/functions) before executing it
+SQL_VALIDATION = os.getenv("SQL_VALIDATION", "true").lower() in ("1", "true", "yes")
+# Cost guard: generated SQL is planned with EXPLAIN first, and when the estimated result rows
+# or total cost exceed these limits (0 disables either) it is rejected, given a LIMIT of
+# COST_GUARD_MAX_ROWS ("limit") or made to read a sample of its largest table ("sample")
+COST_GUARD_MAX_ROWS = int(os.getenv("COST_GUARD_MAX_ROWS", "100000"))
+COST_GUARD_MAX_COST = float(os.getenv("COST_GUARD_MAX_COST", "1000000"))
+COST_GUARD_ACTION = os.getenv("COST_GUARD_ACTION", "limit")
+# Row limit of the cost guard for /chat/stream, which streams its rows in batches (0 disables)
+COST_GUARD_STREAM_MAX_ROWS = int(os.getenv("COST_GUARD_STREAM_MAX_ROWS", "0"))
+
+# Time budget for a whole request in seconds, shared by every LLM call and query (0 disables)
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "120"))
+# How often a running request checks whether its client has disconnected
+DISCONNECT_POLL_INTERVAL = float(os.getenv("DISCONNECT_POLL_INTERVAL", "0.5"))
+
+# /batch limits: questions per request and LLM calls / database queries in flight per batch
+BATCH_MAX_QUESTIONS = int(os.getenv("BATCH_MAX_QUESTIONS", "1000"))
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "8"))
+BATCH_DB_CONCURRENCY = int(os.getenv("BATCH_DB_CONCURRENCY", "4"))
+
+# Result snapshots paged through /results/{id}: lifetime, in-memory budget, optional directory
+# for gzipped on-disk copies, and page sizes
+RESULT_SNAPSHOT_TTL = float(os.getenv("RESULT_SNAPSHOT_TTL", "3600"))
+RESULT_SNAPSHOT_MAX_BYTES = int(os.getenv("RESULT_SNAPSHOT_MAX_BYTES", str(256 * 1024 * 1024)))
+RESULT_SNAPSHOT_DIR = os.getenv("RESULT_SNAPSHOT_DIR")
+RESULT_PAGE_SIZE = int(os.getenv("RESULT_PAGE_SIZE", "15"))
+RESULT_PAGE_MAX_SIZE = int(os.getenv("RESULT_PAGE_MAX_SIZE", "1000"))
@@ -1,3 +1,3 @@
-from .llm import GenerativeModelWrapper
+from .llm import SQL, GenerativeModelWrapper, get_llm, set_llm
 
-__all__ = ["GenerativeModelWrapper", "SQL"]
+__all__ = ["GenerativeModelWrapper", "SQL", "get_llm", "set_llm"]
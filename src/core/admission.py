@@ -0,0 +1,233 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import math
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator, List, Optional
+
+from fastapi import HTTPException
+
+from src.config import config
+from src.core.deadline import bounded_timeout, check_deadline
+from src.utils.metrics import (
+    LLM_ADMISSION_REJECTIONS,
+    LLM_IN_FLIGHT,
+    LLM_QUEUE_DEPTH,
+    LLM_QUEUE_WAIT_SECONDS,
+)
+
+# Lower values are admitted first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BATCH: "batch"}
+
+# Priority of the LLM calls made by the current request
+_priority: contextvars.ContextVar[int] = contextvars.ContextVar(
+    "priority", default=PRIORITY_INTERACTIVE
+)
+
+
+@contextmanager
+def request_priority(priority: int) -> Iterator[None]:
+    """Sets the admission priority of the LLM calls made by the enclosed work."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class TokenBucket:
+    """Allows `rate` operations per second on average, in bursts of up to `burst`."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = float(self.burst)
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def time_until(self, count: int = 1) -> float:
+        """Seconds until `count` tokens are available; 0 when the bucket is unlimited."""
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        return max(count - self.tokens, 0.0) / self.rate
+
+    def take(self) -> None:
+        if self.rate > 0:
+            self._refill()
+            self.tokens -= 1
+
+
+class AdmissionController:
+    """
+    Admits at most `max_concurrency` calls at a time and at most `rate` per second. Calls
+    over the limit wait in a priority queue of `max_queue` entries for up to `max_wait`
+    seconds (less if the request deadline is sooner). A full queue is refused at once with
+    a 503, and a call that could not get a rate token in time with a 429; both carry a
+    Retry-After estimate.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        max_queue: int,
+        rate: float = 0,
+        burst: int = 1,
+        max_wait: float = 30.0,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.bucket = TokenBucket(rate, burst)
+        self.active = 0
+        # Heap of [priority, arrival order, future] waiting for a slot
+        self._queue: List[list] = []
+        self._arrivals = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # Moving average of how long admitted calls hold their slot, for Retry-After
+        self._service_seconds = 1.0
+
+    @classmethod
+    def from_config(cls) -> "AdmissionController":
+        return cls(
+            max_concurrency=config.LLM_MAX_CONCURRENCY,
+            max_queue=config.LLM_QUEUE_SIZE,
+            rate=config.LLM_RATE_LIMIT,
+            burst=config.LLM_RATE_BURST,
+            max_wait=config.LLM_QUEUE_TIMEOUT,
+        )
+
+    @asynccontextmanager
+    async def admit(self, priority: int = None) -> AsyncIterator[None]:
+        """Holds an admission slot for the enclosed call, waiting for one if needed."""
+        priority = _priority.get() if priority is None else priority
+        await self._acquire(priority)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self._service_seconds += 0.2 * (time.monotonic() - start - self._service_seconds)
+            self._release()
+
+    def stats(self) -> dict:
+        return {"active": self.active, "queued": len(self._queue)}
+
+    async def _acquire(self, priority: int) -> None:
+        label = PRIORITY_NAMES.get(priority, str(priority))
+        if not self._queue and self.active < self.max_concurrency and not self.bucket.time_until():
+            self.bucket.take()
+            self._admitted()
+            LLM_QUEUE_WAIT_SECONDS.observe(0.0, priority=label)
+            return
+        if len(self._queue) >= self.max_queue:
+            self._reject("queue_full", 503, "Too many questions are waiting for the LLM")
+        if self.bucket.time_until(len(self._queue) + 1) > self.max_wait:
+            self._reject("rate_limited", 429, "The LLM rate limit is exhausted")
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        entry = [priority, next(self._arrivals), future]
+        heapq.heappush(self._queue, entry)
+        LLM_QUEUE_DEPTH.set(len(self._queue))
+        start = time.monotonic()
+        expiry = loop.call_later(bounded_timeout(self.max_wait), self._expire, entry)
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                # Admitted just as the caller gave up: hand the slot back
+                self._release()
+            else:
+                self._withdraw(entry)
+            raise
+        except HTTPException:
+            # Timed out in the queue; a passed deadline is reported as such
+            check_deadline()
+            raise
+        finally:
+            expiry.cancel()
+        LLM_QUEUE_WAIT_SECONDS.observe(time.monotonic() - start, priority=label)
+
+    def _admitted(self) -> None:
+        self.active += 1
+        LLM_IN_FLIGHT.set(self.active)
+
+    def _release(self) -> None:
+        self.active -= 1
+        LLM_IN_FLIGHT.set(self.active)
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Admits waiting calls in priority order while slots and rate tokens are available."""
+        while self._queue and self.active < self.max_concurrency:
+            wait = self.bucket.time_until()
+            if wait > 0:
+                if self._timer is None:
+                    self._timer = asyncio.get_running_loop().call_later(wait, self._on_timer)
+                break
+            _, _, future = heapq.heappop(self._queue)
+            if future.done():
+                continue
+            self.bucket.take()
+            self._admitted()
+            future.set_result(None)
+        LLM_QUEUE_DEPTH.set(len(self._queue))
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._dispatch()
+
+    def _withdraw(self, entry: list) -> None:
+        try:
+            self._queue.remove(entry)
+        except ValueError:
+            return
+        heapq.heapify(self._queue)
+        LLM_QUEUE_DEPTH.set(len(self._queue))
+
+    def _expire(self, entry: list) -> None:
+        future = entry[2]
+        if future.done():
+            return
+        self._withdraw(entry)
+        LLM_ADMISSION_REJECTIONS.inc(reason="timeout")
+        future.set_exception(self._error(503, "Timed out waiting for the LLM"))
+
+    def _retry_after(self) -> int:
+        """Estimates the seconds until a call arriving now would be admitted."""
+        waiting = len(self._queue) + 1
+        by_rate = self.bucket.time_until(waiting)
+        by_slots = self._service_seconds * waiting / max(self.max_concurrency, 1)
+        return max(math.ceil(max(by_rate, by_slots)), 1)
+
+    def _error(self, status_code: int, message: str) -> HTTPException:
+        retry_after = self._retry_after()
+        return HTTPException(
+            status_code=status_code,
+            detail=f"{message}; please retry in {retry_after}s.",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+    def _reject(self, reason: str, status_code: int, message: str) -> None:
+        LLM_ADMISSION_REJECTIONS.inc(reason=reason)
+        raise self._error(status_code, message)
+
+
+_llm_admission: Optional[AdmissionController] = None
+
+
+def get_llm_admission() -> AdmissionController:
+    """Returns the process-wide admission controller for LLM calls, created on first use."""
+    global _llm_admission
+    if _llm_admission is None:
+        _llm_admission = AdmissionController.from_config()
+    return _llm_admission
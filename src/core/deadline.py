@@ -0,0 +1,48 @@
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from fastapi import HTTPException
+
+# Absolute time.monotonic() by which the current request must finish
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar(
+    "deadline", default=None
+)
+
+
+@contextmanager
+def request_deadline(seconds: Optional[float]) -> Iterator[None]:
+    """
+    Sets a deadline `seconds` from now for the enclosed work, shared by every LLM call and
+    query it makes. A deadline that is already set and earlier is kept; None or 0 sets none.
+    """
+    current = _deadline.get()
+    deadline = time.monotonic() + seconds if seconds else None
+    if current is not None and (deadline is None or current < deadline):
+        deadline = current
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Returns the seconds left until the current deadline, or None when there is none."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return max(deadline - time.monotonic(), 0.0)
+
+
+def bounded_timeout(limit: float) -> float:
+    """Returns `limit` capped by the time left until the current deadline."""
+    left = remaining()
+    return limit if left is None else min(left, limit)
+
+
+def check_deadline() -> None:
+    """Raises a 504 HTTPException when the current deadline has passed."""
+    if remaining() == 0.0:
+        raise HTTPException(status_code=504, detail="Request deadline exceeded.")
@@ -0,0 +1,118 @@
+import asyncio
+import json
+import random
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+from src.utils.cache_utils import normalize_question
+
+
+class FakeGenerativeModel:
+    """
+    Offline stand-in for `genai.GenerativeModel` used by tests, local runs and load tests.
+    `responses` maps a question (or any fragment of the prompt) to the SQL to return;
+    prompts that match nothing get `default_sql`. Each call takes `latency` seconds plus up to
+    `jitter` more, and fails with a `failure_rate` chance; both are drawn from a generator
+    seeded with `seed`, so a run is reproducible.
+    """
+
+    def __init__(
+        self,
+        responses: Optional[Dict[str, str]] = None,
+        default_sql: str = "SELECT 'Hello, I am Text2SQL assitant, I am only trained to answer flight related query;'",
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        failure_rate: float = 0.0,
+        seed: int = 0,
+    ):
+        self.responses = {
+            normalize_question(key): sql for key, sql in (responses or {}).items()
+        }
+        self.default_sql = default_sql
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self.calls = 0
+        self.failures = 0
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "FakeGenerativeModel":
+        """Builds a fake model from a JSON file mapping questions to SQL."""
+        with open(path) as f:
+            return cls(responses=json.load(f), **kwargs)
+
+    def add_response(self, question: str, sql: str) -> None:
+        self.responses[normalize_question(question)] = sql
+
+    def lookup(self, prompt: str) -> str:
+        normalized = normalize_question(prompt)
+        if normalized in self.responses:
+            return self.responses[normalized]
+        for key, sql in self.responses.items():
+            if key in normalized:
+                return sql
+        return self.default_sql
+
+    async def generate_content_async(self, prompt: str, **kwargs) -> SimpleNamespace:
+        self.calls += 1
+        # Drawn before sleeping so the sequence does not depend on how calls interleave
+        latency = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+        fails = self.failure_rate > 0 and self._random.random() < self.failure_rate
+        if latency:
+            await asyncio.sleep(latency)
+        if fails:
+            self.failures += 1
+            raise RuntimeError("Fake LLM failure")
+        return SimpleNamespace(text=json.dumps({"sql": self.lookup(prompt)}))
+
+
+class CassetteModel:
+    """
+    Record/replay model for offline benchmarks. A cassette maps each question to the raw
+    responses the model returned for it, in call order, so correction attempts replay too.
+
+    In replay mode the n-th call for a question returns its n-th recorded response (the last
+    one once they run out). When `inner` is given, calls are forwarded to it and recorded.
+    """
+
+    def __init__(self, cassette: Optional[Dict[str, List[str]]] = None, inner=None):
+        self.cassette = {
+            normalize_question(question): list(responses)
+            for question, responses in (cassette or {}).items()
+        }
+        self.inner = inner
+        self.calls: Dict[str, int] = {}
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "CassetteModel":
+        with open(path) as f:
+            return cls(cassette=json.load(f), **kwargs)
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.cassette, f, indent=2)
+
+    def add_question(self, question: str) -> None:
+        """Registers a question to record responses for."""
+        self.cassette.setdefault(normalize_question(question), [])
+
+    def _question_for(self, prompt: str) -> str:
+        normalized = normalize_question(prompt)
+        matches = [question for question in self.cassette if question in normalized]
+        if not matches:
+            raise KeyError(f"No cassette entry for prompt: {prompt[:200]!r}")
+        return max(matches, key=len)
+
+    async def generate_content_async(self, prompt: str, **kwargs) -> SimpleNamespace:
+        question = self._question_for(prompt)
+        call = self.calls.get(question, 0)
+        self.calls[question] = call + 1
+        responses = self.cassette[question]
+        if self.inner is not None:
+            result = await self.inner.generate_content_async(prompt, **kwargs)
+            responses.append(result.text)
+            return result
+        if not responses:
+            raise KeyError(f"No recorded responses for question: {question!r}")
+        return SimpleNamespace(text=responses[min(call, len(responses) - 1)])
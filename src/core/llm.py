@@ -1,11 +1,14 @@
-from typing import TypedDict
+from contextlib import contextmanager
+from typing import Dict, Iterator, TypedDict
+import asyncio
 import os
 import sys
 
-import google.generativeai as genai
-
 from src.utils.prompts import sql_generation_system_prompt
+from src.config import config
 from src.config.config import GOOGLE_API_KEY
+from src.core.admission import AdmissionController, get_llm_admission
+from src.core.deadline import bounded_timeout
 
 # sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
 
@@ -14,26 +17,98 @@ class SQL(TypedDict):
     results: str
 
 
-genai.configure(api_key=GOOGLE_API_KEY)
+_genai = None
+
+
+def load_genai():
+    """Imports and configures google.generativeai on first use; it is slow to import."""
+    global _genai
+    if _genai is None:
+        import google.generativeai as genai
+
+        genai.configure(api_key=GOOGLE_API_KEY)
+        _genai = genai
+    return _genai
 
 
 class GenerativeModelWrapper:
-    def __init__(self, model_name: str = "gemini-2.0-flash"):
-        self.model = genai.GenerativeModel(
+    def __init__(
+        self,
+        model_name: str = "gemini-2.0-flash",
+        model=None,
+        admission: AdmissionController = None,
+    ):
+        self.model_name = model_name
+        # Limits the calls in flight and their rate; the process-wide controller by default
+        self.admission = admission
+        # Any object exposing `generate_content_async`, e.g. FakeGenerativeModel for offline runs
+        self.model = model or load_genai().GenerativeModel(
             model_name=model_name, system_instruction=sql_generation_system_prompt
         )
 
-    async def generate_sql(self, prompt: str) -> SQL:
-        result = await self.model.generate_content_async(
+    async def generate_sql(self, prompt: str, temperature: float = None) -> SQL:
+        async with (self.admission or get_llm_admission()).admit():
+            return await self._generate_sql(prompt, temperature)
+
+    async def _generate_sql(self, prompt: str, temperature: float = None) -> SQL:
+        # Never wait past the request deadline, and never longer than the API's own limit
+        timeout = bounded_timeout(config.LLM_TIMEOUT_SECONDS)
+        # A plain mapping is accepted as generation config and spares importing the SDK types
+        generation_config = {
+            "response_mime_type": "application/json",
+            "response_schema": {
+                "type": "object",
+                "properties": {"sql": {"type": "string"}},
+                "required": ["sql"],
+            },
+        }
+        if temperature is not None:
+            generation_config["temperature"] = temperature
+        call = self.model.generate_content_async(
             prompt,
-            generation_config=genai.GenerationConfig(
-                response_mime_type="application/json",
-                response_schema={
-                    "type": "object",
-                    "properties": {"sql": {"type": "string"}},
-                    "required": ["sql"],
-                },
-            ),
-            request_options={"timeout": 600},
+            generation_config=generation_config,
+            request_options={"timeout": timeout},
         )
+        result = await asyncio.wait_for(call, timeout)
         return result.text
+
+
+_llm_clients: Dict[str, GenerativeModelWrapper] = {}
+
+
+def get_llm(model_name: str = None) -> GenerativeModelWrapper:
+    """Returns the process-wide model client for `model_name`, creating it on first use."""
+    model_name = model_name or config.LLM_MODEL_NAME
+    llm = _llm_clients.get(model_name)
+    if llm is None:
+        model = None
+        if config.LLM_BACKEND == "fake":
+            from src.core.fake_llm import FakeGenerativeModel
+
+            model = (
+                FakeGenerativeModel.from_file(config.FAKE_LLM_RESPONSES)
+                if config.FAKE_LLM_RESPONSES
+                else FakeGenerativeModel()
+            )
+        llm = GenerativeModelWrapper(model_name=model_name, model=model)
+        _llm_clients[model_name] = llm
+    return llm
+
+
+def set_llm(llm: GenerativeModelWrapper) -> None:
+    """Registers `llm` as the shared client for its model name, e.g. to plug in a fake backend."""
+    _llm_clients[llm.model_name] = llm
+
+
+@contextmanager
+def use_llm(llm: GenerativeModelWrapper) -> Iterator[GenerativeModelWrapper]:
+    """Registers `llm` like `set_llm` for the enclosed block, then restores the previous client."""
+    previous = _llm_clients.get(llm.model_name)
+    set_llm(llm)
+    try:
+        yield llm
+    finally:
+        if previous is None:
+            _llm_clients.pop(llm.model_name, None)
+        else:
+            _llm_clients[llm.model_name] = previous
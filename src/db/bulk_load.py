@@ -0,0 +1,232 @@
+import csv
+import io
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Set
+
+from sqlalchemy import Boolean, Integer, Table
+from sqlalchemy.engine import Engine
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+from src.config import config
+from src.db.create_table import (
+    Airline,
+    Airport,
+    Base,
+    PARTITION_COLUMNS,
+    Flight,
+    bump_data_versions,
+    clear_load_manifest,
+    create_partitions,
+    is_partitioned,
+    loaded_columns,
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# CSV file backing each table, relative to config.DATA_DIR
+TABLE_SOURCES = {
+    Airline.__table__: "airlines.csv",
+    Airport.__table__: "airports.csv",
+    Flight.__table__: "flights.csv",
+}
+
+
+def _parse_integer(value: str) -> str:
+    # pandas writes nullable integers as floats, e.g. "1335.0"
+    if "." in value:
+        return str(int(float(value)))
+    return value
+
+
+def _parse_boolean(value: str) -> str:
+    return "t" if value.strip().lower() in ("1", "1.0", "t", "true") else "f"
+
+
+def _column_parser(column) -> Optional[Callable[[str], str]]:
+    if isinstance(column.type, Boolean):
+        return _parse_boolean
+    if isinstance(column.type, Integer):
+        return _parse_integer
+    return None
+
+
+def copy_columns(table: Table, header: List[str]) -> List[str]:
+    """Returns the table columns present in the CSV header, in header order."""
+    table_columns = {column.name for column in loaded_columns(table)}
+    return [name for name in header if name in table_columns]
+
+
+def iter_copy_chunks(
+    path: str,
+    table: Table,
+    chunk_rows: int = 50_000,
+    slice_columns: Sequence[str] = (),
+    slices: Set[tuple] = None,
+) -> Iterator[tuple]:
+    """
+    Streams a CSV file and yields (columns, row count, CSV text) chunks ready for COPY FROM STDIN.
+    Header names are lower-cased to match the model, values are coerced to the column types
+    declared on the model and empty fields are sent as NULL. With `slices`, only rows whose
+    coerced `slice_columns` values form one of those tuples are kept.
+    """
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        header = [name.strip().lower() for name in next(reader)]
+        columns = copy_columns(table, header)
+        positions = [header.index(name) for name in columns]
+        parsers = [_column_parser(table.columns[name]) for name in columns]
+        slice_positions = [columns.index(name) for name in slice_columns]
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        rows = 0
+        for record in reader:
+            values = []
+            for position, parse in zip(positions, parsers):
+                value = record[position]
+                values.append(parse(value) if parse and value != "" else value)
+            if slices is not None and tuple(values[i] for i in slice_positions) not in slices:
+                continue
+            writer.writerow(values)
+            rows += 1
+            if rows == chunk_rows:
+                yield columns, rows, buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+                rows = 0
+        if rows:
+            yield columns, rows, buffer.getvalue()
+
+
+def _copy_from_stdin(cursor, statement: str, data: str) -> None:
+    """Runs a COPY FROM STDIN statement with either psycopg2 or psycopg 3."""
+    if hasattr(cursor, "copy_expert"):
+        cursor.copy_expert(statement, io.StringIO(data))
+    else:
+        with cursor.copy(statement) as copy:
+            copy.write(data)
+
+
+def chunk_partitions(table: Table, columns: List[str], chunk: str) -> Set[tuple]:
+    """Returns the (year, month) partition keys of the rows in a COPY chunk."""
+    positions = [columns.index(name) for name in PARTITION_COLUMNS[table]]
+    return {
+        tuple(int(row[position]) for position in positions)
+        for row in csv.reader(io.StringIO(chunk))
+    }
+
+
+def table_chunks(table: Table, data_dir: str, chunk_rows: int) -> Iterator[tuple]:
+    """Returns the COPY chunks of a dataset, read from its Parquet copy when that is up to date."""
+    # Imported here because the Parquet module builds on this one
+    from src.db.parquet import dataset_path, iter_parquet_copy_chunks
+
+    directory = dataset_path(table, data_dir)
+    if directory is not None:
+        return iter_parquet_copy_chunks(table, directory, chunk_rows)
+    return iter_copy_chunks(os.path.join(data_dir, TABLE_SOURCES[table]), table, chunk_rows)
+
+
+def copy_table(engine: Engine, table: Table, chunks: Iterator[tuple]) -> Dict:
+    """
+    Truncates `table` and streams the (columns, row count, CSV text) `chunks` into it with COPY
+    in a single transaction. Secondary indexes are dropped for the load and rebuilt afterwards,
+    and the partitions of a partitioned table are created as the chunks need them.
+    """
+    start = time.perf_counter()
+    total_rows = 0
+    indexes = list(table.indexes)
+    partitioned = is_partitioned(table, engine.dialect.name)
+    partitions = set()
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        for index in indexes:
+            cursor.execute(f'DROP INDEX IF EXISTS "{index.name}"')
+        cursor.execute(f'TRUNCATE TABLE "{table.name}"')
+        for columns, rows, chunk in chunks:
+            if partitioned:
+                missing = chunk_partitions(table, columns, chunk) - partitions
+                create_partitions(cursor, table, missing)
+                partitions |= missing
+            column_list = ", ".join(f'"{name}"' for name in columns)
+            _copy_from_stdin(
+                cursor,
+                f'COPY "{table.name}" ({column_list}) FROM STDIN WITH (FORMAT csv)',
+                chunk,
+            )
+            total_rows += rows
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+    load_seconds = time.perf_counter() - start
+    with engine.begin() as conn:
+        for index in indexes:
+            index.create(bind=conn)
+        if partitioned:
+            # Autovacuum analyzes the partitions but never the partitioned table itself
+            conn.exec_driver_sql(f'ANALYZE "{table.name}"')
+    elapsed = time.perf_counter() - start
+    stats = {
+        "table": table.name,
+        "rows": total_rows,
+        "load_seconds": round(load_seconds, 3),
+        "index_seconds": round(elapsed - load_seconds, 3),
+        "rows_per_second": round(total_rows / load_seconds) if load_seconds else 0,
+    }
+    logger.info(
+        f"Loaded {total_rows} rows into {table.name} in {load_seconds:.2f}s "
+        f"({stats['rows_per_second']} rows/s), indexes built in {stats['index_seconds']}s"
+    )
+    return stats
+
+
+def bulk_load(
+    engine: Engine,
+    data_dir: str = None,
+    tables: List[Table] = None,
+    chunk_rows: int = 50_000,
+    recreate: bool = False,
+) -> List[Dict]:
+    """
+    Loads the datasets into the typed tables declared in create_table.py using COPY, loading
+    independent tables concurrently. Up-to-date Parquet copies are read instead of the CSVs. Returns per-table load statistics.
+    """
+    data_dir = data_dir or config.DATA_DIR
+    tables = tables or list(TABLE_SOURCES)
+    if recreate:
+        Base.metadata.drop_all(bind=engine, tables=tables)
+    Base.metadata.create_all(bind=engine, tables=tables)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(tables)) as executor:
+        futures = [
+            executor.submit(
+                copy_table,
+                engine,
+                table,
+                table_chunks(table, data_dir, chunk_rows),
+            )
+            for table in tables
+        ]
+        stats = [future.result() for future in futures]
+    elapsed = time.perf_counter() - start
+
+    bump_data_versions(engine, [table.name for table in tables])
+    # The tables now match the current files, which the incremental refresh has not hashed
+    clear_load_manifest(engine, [table.name for table in tables])
+    total_rows = sum(table_stats["rows"] for table_stats in stats)
+    logger.info(
+        f"Loaded {total_rows} rows in {elapsed:.2f}s "
+        f"({round(total_rows / elapsed) if elapsed else 0} rows/s)"
+    )
+    return stats
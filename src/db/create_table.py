@@ -1,87 +1,352 @@
 import os
+import re
 import sys
+from typing import Iterable, List, Tuple
 
 from sqlalchemy import (
     Boolean,
     Column,
+    Computed,
+    DateTime,
     Float,
+    Index,
     Integer,
+    PrimaryKeyConstraint,
     String,
+    Table,
+    func,
+    text,
 )
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.sql.functions import FunctionElement
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
-from database import create_db_connection
-
 from src.config import config
+from src.db.database import create_db_connection
 
 Base = declarative_base()
 
 
+# Table and column comments double as the schema descriptions sent to the LLM.
+# Column `info` keys used by the prompt builder:
+#   core       - always included when the table is selected
+#   references - "<table>.<column>" the column joins to
+#   hidden     - never shown to the LLM
+
+
+class utc_date(FunctionElement):
+    """Midnight UTC of the date given by year, month and day expressions."""
+
+    type = DateTime(timezone=True)
+    name = "utc_date"
+    inherit_cache = True
+
+
+@compiles(utc_date)
+def _utc_date(element, compiler, **kw):
+    # Immutable on PostgreSQL, as generated columns require; DuckDB has the same functions
+    return f"timezone('UTC', make_timestamp({compiler.process(element.clauses, **kw)}, 0, 0, 0))"
+
+
+@compiles(utc_date, "sqlite")
+def _sqlite_utc_date(element, compiler, **kw):
+    year, month, day = (compiler.process(clause, **kw) for clause in element.clauses)
+    return (
+        f"substr('000' || {year}, -4) || '-' || substr('0' || {month}, -2) || '-' || "
+        f"substr('0' || {day}, -2) || ' 00:00:00+00:00'"
+    )
+
+
 # flights table
 class Flight(Base):
     __tablename__ = "flights"
+    __table_args__ = {
+        "comment": "This table contains comprehensive details of individual flight records for the year 2015.",
+        "info": {"keywords": ["flight", "route", "trip", "cancel", "divert", "late"]},
+    }
 
-    id = Column(Integer, primary_key=True)
-    year = Column(Integer)
-    month = Column(Integer)
-    day = Column(Integer)
-    day_of_week = Column(Integer)
-    airline = Column(String)
-    flight_number = Column(Integer)
-    tail_number = Column(String)
-    origin_airport = Column(String)
-    destination_airport = Column(String)
-    scheduled_departure = Column(Integer)
-    departure_time = Column(Integer)
-    departure_delay = Column(Float)
-    taxi_out = Column(Float)
-    wheels_off = Column(Integer)
-    scheduled_time = Column(Float)
-    elapsed_time = Column(Float)
-    air_time = Column(Float)
-    distance = Column(Integer)
-    wheels_on = Column(Integer)
-    taxi_in = Column(Float)
-    scheduled_arrival = Column(Integer)
-    arrival_time = Column(Integer)
-    arrival_delay = Column(Float)
-    diverted = Column(Boolean)
-    cancelled = Column(Boolean)
-    cancellation_reason = Column(String)
-    air_system_delay = Column(Float)
-    security_delay = Column(Float)
-    airline_delay = Column(Float)
-    late_aircraft_delay = Column(Float)
-    weather_delay = Column(Float)
+    id = Column(Integer, primary_key=True, info={"hidden": True})
+    year = Column(Integer, comment="Year of the flight (2015).", info={"core": True})
+    month = Column(Integer, comment="Month of the flight (1–12).", info={"core": True})
+    day = Column(Integer, comment="Day of the month (1–31).", info={"core": True})
+    if config.FLIGHT_DATE_COLUMN:
+        flight_date = Column(
+            DateTime(timezone=True),
+            Computed(utc_date(year, month, day), persisted=True),
+            comment="Date of the flight as a timestamp at midnight UTC; use it for date ranges.",
+            info={"core": True},
+        )
+    day_of_week = Column(Integer, comment="Day of the week (1=Monday, 7=Sunday).")
+    airline = Column(
+        String,
+        comment="Two-letter IATA code of the airline.",
+        info={"core": True, "references": "airlines.iata_code"},
+    )
+    flight_number = Column(Integer, comment="Flight number.", info={"core": True})
+    tail_number = Column(String, comment="Aircraft's tail number.")
+    origin_airport = Column(
+        String,
+        comment="IATA code of the origin airport.",
+        info={"core": True, "references": "airports.iata_code"},
+    )
+    destination_airport = Column(
+        String,
+        comment="IATA code of the destination airport.",
+        info={"core": True, "references": "airports.iata_code"},
+    )
+    scheduled_departure = Column(
+        Integer, comment="Scheduled departure time (HHMM, local time)."
+    )
+    departure_time = Column(Integer, comment="Actual departure time (HHMM, local time).")
+    departure_delay = Column(
+        Float,
+        comment="Difference in minutes between scheduled and actual departure times.",
+    )
+    taxi_out = Column(Float, comment="Taxi-out time in minutes.")
+    wheels_off = Column(
+        Integer,
+        comment="Time when the aircraft's wheels leave the ground (HHMM, local time).",
+    )
+    scheduled_time = Column(Float, comment="Scheduled flight time in minutes.")
+    elapsed_time = Column(Float, comment="Actual flight time in minutes.")
+    air_time = Column(Float, comment="Time spent in the air in minutes.")
+    distance = Column(Integer, comment="Distance between airports in miles.")
+    wheels_on = Column(
+        Integer,
+        comment="Time when the aircraft's wheels touch the ground (HHMM, local time).",
+    )
+    taxi_in = Column(Float, comment="Taxi-in time in minutes.")
+    scheduled_arrival = Column(Integer, comment="Scheduled arrival time (HHMM, local time).")
+    arrival_time = Column(Integer, comment="Actual arrival time (HHMM, local time).")
+    arrival_delay = Column(
+        Float,
+        comment="Difference in minutes between scheduled and actual arrival times.",
+    )
+    diverted = Column(
+        Boolean, comment="Indicates if the flight was diverted (TRUE=yes, FALSE=no)."
+    )
+    cancelled = Column(
+        Boolean, comment="Indicates if the flight was canceled (TRUE=yes, FALSE=no)."
+    )
+    cancellation_reason = Column(
+        String,
+        comment="Reason for cancellation (A=Airline/Carrier, B=Weather, C=National Air System, D=Security).",
+    )
+    air_system_delay = Column(
+        Float, comment="Delay due to air traffic control in minutes."
+    )
+    security_delay = Column(Float, comment="Delay caused by security issues in minutes.")
+    airline_delay = Column(Float, comment="Delay caused by the airline in minutes.")
+    late_aircraft_delay = Column(
+        Float,
+        comment="Delay due to a previous flight with the same aircraft arriving late, causing the present flight to depart late in minutes.",
+    )
+    weather_delay = Column(Float, comment="Delay caused by weather conditions in minutes.")
 
 
 # airports table
 class Airport(Base):
     __tablename__ = "airports"
+    __table_args__ = {
+        "comment": "This table contains information about various airports, including their locations.",
+        "info": {"keywords": ["airport", "location", "where"]},
+    }
 
-    iata_code = Column(String, primary_key=True)
-    airport = Column(String)
-    city = Column(String)
-    state = Column(String)
-    country = Column(String)
-    latitude = Column(Float)
-    longitude = Column(Float)
+    iata_code = Column(
+        String, primary_key=True, comment="Three-letter IATA airport code."
+    )
+    airport = Column(String, comment="Name of the airport.")
+    city = Column(String, comment="City where the airport is located.")
+    state = Column(String, comment="State where the airport is located.")
+    country = Column(String, comment="Country where the airport is located.")
+    latitude = Column(Float, comment="Geographical latitude of the airport.")
+    longitude = Column(Float, comment="Geographical longitude of the airport.")
 
 
 # airlines table
 class Airline(Base):
     __tablename__ = "airlines"
+    __table_args__ = {
+        "comment": "This table provides information about airline IATA codes and their full names.",
+        "info": {"keywords": ["airline", "carrier", "company"]},
+    }
+
+    iata_code = Column(
+        String, primary_key=True, comment="Two-letter IATA code assigned to the airline."
+    )
+    airline = Column(String, comment="Full name of the airline.")
+
+
+# Default secondary indexes for the filters and joins generated queries rely on.
+# The prompt rules make the model compare text keys through lower(), so those
+# columns also get expression indexes on lower(<column>).
+Index("ix_flights_airline", Flight.airline)
+Index("ix_flights_origin_airport", Flight.origin_airport)
+Index("ix_flights_destination_airport", Flight.destination_airport)
+Index("ix_flights_year_month_day", Flight.year, Flight.month, Flight.day)
+Index("ix_flights_lower_airline", func.lower(Flight.airline))
+Index("ix_flights_lower_origin_airport", func.lower(Flight.origin_airport))
+Index("ix_flights_lower_destination_airport", func.lower(Flight.destination_airport))
+Index("ix_airports_lower_iata_code", func.lower(Airport.iata_code))
+Index("ix_airports_lower_city", func.lower(Airport.city))
+Index("ix_airlines_lower_iata_code", func.lower(Airline.iata_code))
+Index("ix_airlines_lower_airline", func.lower(Airline.airline))
+
+
+# Partition columns of each table: PostgreSQL partitions flights by range of (year, month),
+# one partition per month created as the loads meet it, and the Parquet datasets are
+# hive-partitioned the same way
+PARTITION_COLUMNS = {Flight.__table__: ["year", "month"]}
+if config.FLIGHTS_PARTITIONED:
+    Flight.__table__.dialect_kwargs["postgresql_partition_by"] = "RANGE (year, month)"
+
+_PARTITION_NAME_RE = re.compile(r"^(\w+)_\d{4}_\d{2}$")
+
+
+@compiles(PrimaryKeyConstraint, "postgresql")
+def _partitioned_primary_key(constraint, compiler, **kw):
+    # PostgreSQL requires the partition columns in the primary key of a partitioned table
+    table = constraint.table
+    if not table.dialect_options["postgresql"]["partition_by"]:
+        return compiler.visit_primary_key_constraint(constraint, **kw)
+    columns = [column.name for column in constraint.columns]
+    columns += [name for name in PARTITION_COLUMNS[table] if name not in columns]
+    return f"PRIMARY KEY ({', '.join(compiler.preparer.quote(name) for name in columns)})"
+
+
+def loaded_columns(table: Table) -> List:
+    """Returns the columns the loaders fill; computed columns are derived by the database."""
+    return [column for column in table.columns if column.computed is None]
+
+
+def is_partitioned(table: Table, dialect_name: str) -> bool:
+    """Tells whether `table` is created as a partitioned table on the given dialect."""
+    return dialect_name == "postgresql" and bool(
+        table.dialect_options["postgresql"]["partition_by"]
+    )
+
+
+def partition_name(table_name: str, year: int, month: int) -> str:
+    """Returns the name of a monthly partition, e.g. "flights_2015_03"."""
+    return f"{table_name}_{year:04d}_{month:02d}"
+
+
+def partition_parent(name: str) -> str:
+    """Returns the table a partition belongs to, or `name` itself for other tables."""
+    match = _PARTITION_NAME_RE.match(name)
+    return match.group(1) if match else name
+
+
+def partition_statement(table: Table, year: int, month: int) -> str:
+    """
+    Returns the statement creating the (year, month) partition of `table` unless it exists.
+    With the derived flight_date column the partition also checks its date range, which lets
+    the planner skip partitions for date-range predicates as well.
+    """
+    name = partition_name(table.name, year, month)
+    constraints = ""
+    if "flight_date" in table.columns:
+        start = f"{year:04d}-{month:02d}-01 00:00:00+00"
+        end = f"{year + month // 12:04d}-{month % 12 + 1:02d}-01 00:00:00+00"
+        constraints = (
+            f' (CONSTRAINT "{name}_flight_date" '
+            f"CHECK (flight_date >= '{start}' AND flight_date < '{end}'))"
+        )
+    return (
+        f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{table.name}"{constraints} '
+        f"FOR VALUES FROM ({year}, {month}) TO ({year}, {month + 1})"
+    )
+
+
+def create_partitions(cursor, table: Table, keys: Iterable[Tuple[int, int]]):
+    """Creates the missing (year, month) partitions of `table` with a DB-API cursor."""
+    for year, month in sorted(keys):
+        cursor.execute(partition_statement(table, year, month))
+
+
+# data versions table, bumped whenever a table is rewritten so result caches can invalidate
+class DataVersion(Base):
+    __tablename__ = "data_versions"
+
+    table_name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+# load manifest: content hash of each slice of a table loaded by the incremental refresh
+class LoadedSlice(Base):
+    __tablename__ = "load_manifest"
+
+    table_name = Column(String, primary_key=True)
+    # e.g. "year=2015/month=1", or "*" for a table that is not sliced
+    slice_key = Column(String, primary_key=True)
+    content_hash = Column(String, nullable=False)
+    rows = Column(Integer, nullable=False)
+    loaded_at = Column(Float, nullable=False)
+
+
+DATA_TABLES = [Flight.__tablename__, Airport.__tablename__, Airline.__tablename__]
+
+
+def bump_data_versions(engine: Engine, tables: list):
+    """Increments the stored version of each given table."""
+    DataVersion.__table__.create(bind=engine, checkfirst=True)
+    with engine.begin() as conn:
+        # Not every driver reports UPDATE row counts (DuckDB does not), so look the rows up first
+        existing = set(conn.execute(text("SELECT table_name FROM data_versions")).scalars())
+        for table_name in tables:
+            if table_name in existing:
+                conn.execute(
+                    text(
+                        "UPDATE data_versions SET version = version + 1 "
+                        "WHERE table_name = :table_name"
+                    ),
+                    {"table_name": table_name},
+                )
+            else:
+                conn.execute(
+                    text(
+                        "INSERT INTO data_versions (table_name, version) "
+                        "VALUES (:table_name, 1)"
+                    ),
+                    {"table_name": table_name},
+                )
+
+
+def clear_load_manifest(engine: Engine, tables: list):
+    """Forgets the loaded slices of the given tables, so the next refresh reloads them."""
+    LoadedSlice.__table__.create(bind=engine, checkfirst=True)
+    with engine.begin() as conn:
+        conn.execute(LoadedSlice.__table__.delete().where(LoadedSlice.table_name.in_(tables)))
+
+
+def get_data_versions(engine: Engine) -> dict:
+    """Returns a mapping of table name to its current data version."""
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT table_name, version FROM data_versions"))
+        return {table_name: version for table_name, version in rows}
+
 
-    iata_code = Column(String, primary_key=True)
-    airline = Column(String)
+def create_indexes(engine: Engine):
+    """Creates any missing default indexes on existing tables."""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
 
 
 def create_tables(password: str):
     """Drops all existing tables and creates new ones in the database."""
     engine, _ = create_db_connection(password)
-    Base.metadata.drop_all(bind=engine)  # Drop all existing tables
+    # Drop all existing tables, keeping data versions so cached results stay invalidated
+    data_tables = [
+        table
+        for table in Base.metadata.sorted_tables
+        if table is not DataVersion.__table__
+    ]
+    Base.metadata.drop_all(bind=engine, tables=data_tables)
     Base.metadata.create_all(bind=engine)  # Create new tables
+    bump_data_versions(engine, DATA_TABLES)
 
 
 if __name__ == "__main__":
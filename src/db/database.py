@@ -1,12 +1,56 @@
+from typing import Dict, List
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import sessionmaker
 
 from src.config import config
 
 
-def create_db_connection(password: str):
-    """Creates a database engine and a session factory."""
-    database_url = f"{config.DB_CLIENT}://{config.DB_USER}:{password}@{config.DB_HOST}:{config.DB_PORT}/{config.DB_NAME}"
-    engine = create_engine(database_url)
+def pool_options(pool_size: int, max_overflow: int, recycle: int, pre_ping: bool) -> Dict:
+    """Returns create_engine keyword arguments for a connection pool."""
+    return {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_recycle": recycle,
+        "pool_pre_ping": pre_ping,
+    }
+
+
+def _create_engine(database_url: str, **engine_kwargs) -> Engine:
+    url = make_url(database_url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        # In-memory SQLite keeps one connection per thread and has no overflow to configure
+        engine_kwargs.pop("max_overflow", None)
+    return create_engine(url, **engine_kwargs)
+
+
+def create_db_connection(password: str, **engine_kwargs):
+    """Creates a database engine and a session factory. Extra keyword arguments are passed to create_engine."""
+    if config.DB_CLIENT == "duckdb" and not config.DATABASE_URL:
+        # Embedded columnar engine over the local datasets; no server needed
+        from src.db.embedded import create_embedded_engine
+
+        return create_embedded_engine(**engine_kwargs)
+    database_url = config.DATABASE_URL or f"{config.DB_CLIENT}://{config.DB_USER}:{password}@{config.DB_HOST}:{config.DB_PORT}/{config.DB_NAME}"
+    engine = _create_engine(database_url, **engine_kwargs)
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
     return engine, SessionLocal
+
+
+def create_replica_engines(default_pool_size: int) -> List[Engine]:
+    """Creates an engine for each configured read replica with the replica pool settings."""
+    options = pool_options(
+        config.DB_REPLICA_POOL_SIZE or default_pool_size,
+        config.DB_REPLICA_MAX_OVERFLOW,
+        config.DB_REPLICA_POOL_RECYCLE,
+        config.DB_REPLICA_POOL_PRE_PING,
+    )
+    return [_create_engine(url, **options) for url in config.DATABASE_REPLICA_URLS]
+
+
+def escape_driver_sql(engine, query: str) -> str:
+    """Escapes literal % signs in raw SQL for drivers that use format-style parameter markers."""
+    if engine.dialect.paramstyle in ("format", "pyformat"):
+        return query.replace("%", "%%")
+    return query
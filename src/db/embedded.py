@@ -0,0 +1,139 @@
+import logging
+import os
+import time
+from typing import Dict, List
+
+import duckdb
+from duckdb_engine import ConnectionWrapper, Dialect
+from sqlalchemy import Boolean, Float, Integer, Table, create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from src.config import config
+from src.db.bulk_load import TABLE_SOURCES
+from src.db.create_table import PARTITION_COLUMNS, bump_data_versions, loaded_columns
+from src.db.parquet import dataset_path
+
+logger = logging.getLogger(__name__)
+
+_TRUE_VALUES = "('1', '1.0', 't', 'true')"
+
+
+def _column_expression(column, header: Dict[str, str]) -> str:
+    """
+    Returns the DuckDB expression that reads `column` from an all-VARCHAR CSV relation whose
+    header maps lowercase names to the names used in the file.
+    """
+    alias = f'"{column.name}"'
+    if column.name not in header:
+        if column.primary_key and isinstance(column.type, Integer):
+            return f"CAST(row_number() OVER () AS INTEGER) AS {alias}"
+        return f"NULL AS {alias}"
+    name = f'"{header[column.name]}"'
+    if isinstance(column.type, Boolean):
+        return f"lower(trim({name})) IN {_TRUE_VALUES} AS {alias}"
+    if isinstance(column.type, Integer):
+        # pandas writes nullable integers as floats, e.g. "1335.0"
+        return f"CAST(CAST({name} AS DOUBLE) AS INTEGER) AS {alias}"
+    if isinstance(column.type, Float):
+        return f"CAST({name} AS DOUBLE) AS {alias}"
+    return f"{name} AS {alias}"
+
+
+def _with_computed_columns(table: Table, query: str) -> str:
+    """Adds the computed columns of `table`, derived from its other columns, to a SELECT."""
+    computed = [column for column in table.columns if column.computed is not None]
+    if not computed:
+        return query
+    options = {"dialect": Dialect(), "compile_kwargs": {"include_table": False}}
+    expressions = ", ".join(
+        f'{column.computed.sqltext.compile(**options)} AS "{column.name}"' for column in computed
+    )
+    return f"SELECT *, {expressions} FROM ({query})"
+
+
+def dataset_query(connection: duckdb.DuckDBPyConnection, table: Table, path: str) -> str:
+    """Builds a SELECT that reads a CSV dataset with the column names and types of `table`."""
+    source = f"read_csv('{path}', header = true, all_varchar = true)"
+    names = [row[0] for row in connection.execute(f"DESCRIBE SELECT * FROM {source}").fetchall()]
+    header = {name.strip().lower(): name for name in names}
+    columns = ", ".join(_column_expression(column, header) for column in loaded_columns(table))
+    return _with_computed_columns(table, f"SELECT {columns} FROM {source}")
+
+
+def parquet_query(table: Table, directory: str) -> str:
+    """
+    Builds a SELECT over a table's Parquet dataset. DuckDB prunes the partitions, row groups
+    and columns each query does not need when scanning it.
+    """
+    partitions = PARTITION_COLUMNS.get(table, [])
+    options = "hive_partitioning = true"
+    if partitions:
+        types = ", ".join(f"'{name}': INTEGER" for name in partitions)
+        options += f", hive_types = {{{types}}}"
+    path = os.path.join(os.path.abspath(directory), "**", "*.parquet")
+    columns = ", ".join(f'"{column.name}"' for column in loaded_columns(table))
+    return _with_computed_columns(
+        table, f"SELECT {columns} FROM read_parquet('{path}', {options})"
+    )
+
+
+def load_datasets(
+    connection: duckdb.DuckDBPyConnection,
+    data_dir: str = None,
+    tables: List[Table] = None,
+    replace: bool = False,
+) -> List[str]:
+    """
+    Creates the model tables in an embedded DuckDB database from the CSV datasets, typed like
+    the models. Datasets with an up-to-date Parquet copy become views over it instead, which
+    are read on demand rather than held in memory. Existing tables are kept unless `replace`
+    is set. Returns the tables loaded.
+    """
+    data_dir = data_dir or config.DATA_DIR
+    existing = {row[0] for row in connection.execute("SHOW TABLES").fetchall()}
+    loaded = []
+    for table in tables or list(TABLE_SOURCES):
+        if table.name in existing and not replace:
+            continue
+        start = time.perf_counter()
+        directory = dataset_path(table, data_dir)
+        connection.execute(f'DROP VIEW IF EXISTS "{table.name}"')
+        connection.execute(f'DROP TABLE IF EXISTS "{table.name}"')
+        if directory is not None:
+            connection.execute(f'CREATE VIEW "{table.name}" AS {parquet_query(table, directory)}')
+        else:
+            path = os.path.join(data_dir, TABLE_SOURCES[table])
+            query = dataset_query(connection, table, path)
+            connection.execute(f'CREATE TABLE "{table.name}" AS {query}')
+        rows = connection.execute(f'SELECT COUNT(*) FROM "{table.name}"').fetchone()[0]
+        logger.info(
+            f"Loaded {rows} rows into embedded {table.name} in {time.perf_counter() - start:.2f}s"
+        )
+        loaded.append(table.name)
+    return loaded
+
+
+def create_embedded_engine(
+    path: str = None, data_dir: str = None, replace: bool = False, **engine_kwargs
+):
+    """
+    Opens an in-process DuckDB database (in memory unless `path` is given), loads the datasets
+    into it if they are missing (or always with `replace`) and returns an engine and a session
+    factory over it.
+
+    Every pooled connection is a cursor on the same database, so worker threads share one copy
+    of the data and each can be interrupted on its own.
+    """
+    database = duckdb.connect(path or config.DUCKDB_PATH or ":memory:")
+    loaded = load_datasets(database, data_dir, replace=replace)
+    engine = create_engine(
+        "duckdb://",
+        creator=lambda: ConnectionWrapper(database.cursor()),
+        poolclass=QueuePool,
+        **engine_kwargs,
+    )
+    if loaded:
+        bump_data_versions(engine, loaded)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    return engine, SessionLocal
@@ -0,0 +1,193 @@
+"""
+Index advisor for generated SQL.
+
+Replays the generated SQL logged by the server (SQL_LOG_PATH) through EXPLAIN, reports the
+sequential scans each query needs and proposes indexes for the columns those scans filter on.
+
+Usage: python src/db/index_advisor.py [--log PATH] [--min-table-rows N]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from collections import Counter
+from typing import Dict, Iterator, List, Set, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+from src.config import config
+from src.db.create_table import Base, partition_parent
+from src.db.database import create_db_connection, escape_driver_sql
+from src.utils.cache_utils import fingerprint_sql
+
+_LOWER_COLUMN_RE = re.compile(r"lower\(\(?(\w+)\)?(?:::[\w ]+)?\)")
+_COMPARED_COLUMN_RE = re.compile(
+    r"\(?\b(\w+)\)?(?:::[\w ]+)?\s*(?:=|<>|<=|>=|<|>|~~\*?|!~~)\s"
+)
+
+
+def read_logged_sql(path: str) -> List[str]:
+    """Reads the JSONL SQL log and returns the distinct queries in first-seen order."""
+    queries, seen = [], set()
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            sql = json.loads(line)["sql"]
+            fingerprint = fingerprint_sql(sql)
+            if fingerprint not in seen:
+                seen.add(fingerprint)
+                queries.append(sql)
+    return queries
+
+
+def find_seq_scans(plan: Dict) -> Iterator[Dict]:
+    """Walks an EXPLAIN (FORMAT JSON) plan tree and yields its sequential scan nodes."""
+    if plan.get("Node Type") == "Seq Scan":
+        yield plan
+    for child in plan.get("Plans", []):
+        yield from find_seq_scans(child)
+
+
+def candidate_indexes(filter_expression: str, columns: Set[str]) -> List[str]:
+    """
+    Extracts index expressions from a scan filter, e.g. "lower(origin_airport)" for a
+    case-insensitive comparison or "year" for a plain one. Only real table columns are returned.
+    """
+    candidates = []
+    lowered = set()
+    for column in _LOWER_COLUMN_RE.findall(filter_expression):
+        if column in columns and column not in lowered:
+            lowered.add(column)
+            candidates.append(f"lower({column})")
+    without_lower = _LOWER_COLUMN_RE.sub("", filter_expression)
+    for column in _COMPARED_COLUMN_RE.findall(without_lower):
+        if column in columns and column not in candidates:
+            candidates.append(column)
+    return candidates
+
+
+def existing_index_expressions(engine: Engine) -> Set[Tuple[str, str]]:
+    """Returns (table, leading index expression) pairs for the indexes in the database."""
+    expressions = set()
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT tablename, indexdef FROM pg_indexes"))
+        for table_name, indexdef in rows:
+            match = re.search(r"USING \w+ \((.*)\)", indexdef)
+            if not match:
+                continue
+            leading = re.sub(r"::\w+", "", match.group(1).split(",")[0].strip())
+            lowered = re.fullmatch(r"lower\(+(\w+)\)+", leading)
+            if lowered:
+                leading = f"lower({lowered.group(1)})"
+            expressions.add((table_name, leading.strip("()")))
+    return expressions
+
+
+def table_row_estimates(engine: Engine) -> Dict[str, float]:
+    """Returns the planner's row count estimate for every table."""
+    with engine.connect() as conn:
+        rows = conn.execute(
+            text("SELECT relname, reltuples FROM pg_class WHERE relkind IN ('r', 'p')")
+        )
+        return {name: reltuples for name, reltuples in rows}
+
+
+def advise(engine: Engine, queries: List[str], min_table_rows: int = 1000) -> Dict:
+    """Explains each query and returns the sequential scans found and the proposed indexes."""
+    table_columns = {
+        table.name: set(table.columns.keys()) for table in Base.metadata.sorted_tables
+    }
+    existing = existing_index_expressions(engine)
+    row_estimates = table_row_estimates(engine)
+    proposals: Counter = Counter()
+    report = []
+
+    for sql in queries:
+        try:
+            with engine.connect() as conn:
+                plan = conn.exec_driver_sql(
+                    escape_driver_sql(engine, f"EXPLAIN (FORMAT JSON) {sql}")
+                ).scalar()
+        except Exception as e:
+            report.append({"sql": sql, "error": str(e).splitlines()[0]})
+            continue
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+
+        scans = []
+        # Partitions of a table each get a scan node; propose indexes on the table once
+        query_proposals = set()
+        for node in find_seq_scans(plan[0]["Plan"]):
+            table_name = partition_parent(node.get("Relation Name"))
+            if row_estimates.get(table_name, 0) < min_table_rows:
+                continue
+            filter_expression = node.get("Filter", "")
+            candidates = candidate_indexes(
+                filter_expression, table_columns.get(table_name, set())
+            )
+            scans.append(
+                {
+                    "table": table_name,
+                    "filter": filter_expression,
+                    "total_cost": node.get("Total Cost"),
+                    "candidates": candidates,
+                }
+            )
+            for expression in candidates:
+                if (table_name, expression) not in existing:
+                    query_proposals.add((table_name, expression))
+        proposals.update(query_proposals)
+        report.append({"sql": sql, "seq_scans": scans})
+
+    statements = []
+    for (table_name, expression), count in proposals.most_common():
+        name = re.sub(r"\W+", "_", f"ix_{table_name}_{expression}").strip("_")
+        statements.append(
+            {
+                "statement": f"CREATE INDEX IF NOT EXISTS {name} ON {table_name} ({expression});",
+                "queries": count,
+            }
+        )
+    return {"queries": report, "proposed_indexes": statements}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Propose indexes from logged generated SQL.")
+    parser.add_argument("--log", default=config.SQL_LOG_PATH, help="JSONL SQL log to replay")
+    parser.add_argument(
+        "--min-table-rows",
+        type=int,
+        default=1000,
+        help="ignore sequential scans on tables smaller than this",
+    )
+    args = parser.parse_args()
+    if not args.log:
+        parser.error("no SQL log given; pass --log or set SQL_LOG_PATH")
+
+    engine, _ = create_db_connection(config.DB_PASS)
+    result = advise(engine, read_logged_sql(args.log), args.min_table_rows)
+
+    for entry in result["queries"]:
+        if "error" in entry:
+            print(f"[error] {entry['sql']}\n    {entry['error']}")
+            continue
+        for scan in entry["seq_scans"]:
+            print(f"[seq scan] {scan['table']} (cost {scan['total_cost']}): {entry['sql']}")
+            if scan["filter"]:
+                print(f"    filter: {scan['filter']}")
+
+    print("\nProposed indexes:")
+    if not result["proposed_indexes"]:
+        print("    none")
+    for proposal in result["proposed_indexes"]:
+        print(f"    {proposal['statement']}  -- {proposal['queries']} queries")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,37 +1,67 @@
+import argparse
 import os
 import sys
 
-from sqlalchemy import create_engine
-
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
 
-import pandas as pd
-
 from src.config import config
+from src.db.bulk_load import bulk_load
+from src.db.database import create_db_connection
+from src.db.parquet import convert_datasets
+
+
+def refresh_data(chunk_rows: int = 50_000, parquet: bool = True):
+    """Loads only the (year, month) slices and tables whose CSV content changed."""
+    from src.db.refresh import refresh
+
+    try:
+        if parquet:
+            # Changed slices are then found and read in the Parquet partitions
+            for table_stats in convert_datasets():
+                print(f"{table_stats['table']}: converted to Parquet in {table_stats['seconds']}s")
+
+        engine, _ = create_db_connection(config.DB_PASS)
+        report = refresh(engine, chunk_rows=chunk_rows)
+        for table_stats in report["tables"]:
+            if table_stats["source"] is None:
+                print(f"{table_stats['table']}: file unchanged")
+                continue
+            print(
+                f"{table_stats['table']}: {len(table_stats['changed'])} of "
+                f"{table_stats['slices']} slices loaded, {len(table_stats['removed'])} removed, "
+                f"{table_stats['rows']} rows in {table_stats['seconds']}s"
+            )
+        print(f"Changed tables: {', '.join(report['changed_tables']) or 'none'}")
+    except Exception as e:
+        print(f"Error refreshing data: {e}")
 
 
-def load_data():
+def load_data(chunk_rows: int = 50_000, recreate: bool = False, parquet: bool = True):
     """Loads data from CSV files into the PostgreSQL database."""
     try:
-        # Create SQLAlchemy engine
-        engine = create_engine(
-            f"postgresql://{config.DB_USER}:{config.DB_PASS}@{config.DB_HOST}:{config.DB_PORT}/{config.DB_NAME}"
-        )
-
-        # Load airlines data
-        airlines_df = pd.read_csv("data/airlines.csv")
-        airlines_df.columns = airlines_df.columns.str.lower()
-        airlines_df.to_sql("airlines", engine, if_exists="replace", index=False)
-
-        # Load airports data
-        airports_df = pd.read_csv("data/airports.csv")
-        airports_df.columns = airports_df.columns.str.lower()
-        airports_df.to_sql("airports", engine, if_exists="replace", index=False)
-
-        # Load flights data
-        flights_df = pd.read_csv("data/flights.csv")
-        flights_df.columns = flights_df.columns.str.lower()
-        flights_df.to_sql("flights", engine, if_exists="replace", index=False)
+        if parquet:
+            # Typed Parquet copies make later loads skip CSV parsing; only stale ones are redone
+            for table_stats in convert_datasets():
+                print(f"{table_stats['table']}: converted to Parquet in {table_stats['seconds']}s")
+
+        if config.DB_CLIENT == "duckdb" and not config.DATABASE_URL:
+            # The embedded engine reads the CSVs itself; this only refreshes a DUCKDB_PATH file
+            from src.db.embedded import create_embedded_engine
+
+            engine, _ = create_embedded_engine(replace=recreate)
+            engine.dispose()
+            print("Data loaded successfully!")
+            return
+
+        engine, _ = create_db_connection(config.DB_PASS)
+
+        # Stream each CSV into its typed table with COPY, tables in parallel
+        stats = bulk_load(engine, chunk_rows=chunk_rows, recreate=recreate)
+        for table_stats in stats:
+            print(
+                f"{table_stats['table']}: {table_stats['rows']} rows "
+                f"({table_stats['rows_per_second']} rows/s)"
+            )
 
         print("Data loaded successfully!")
 
@@ -40,4 +70,21 @@ def load_data():
 
 
 if __name__ == "__main__":
-    load_data()
+    parser = argparse.ArgumentParser(description="Load the CSV datasets into PostgreSQL.")
+    parser.add_argument("--chunk-rows", type=int, default=50_000)
+    parser.add_argument(
+        "--recreate", action="store_true", help="drop and recreate the tables first"
+    )
+    parser.add_argument(
+        "--no-parquet", action="store_true", help="load straight from the CSVs"
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="load only the changed (year, month) slices and tables",
+    )
+    args = parser.parse_args()
+    if args.incremental:
+        refresh_data(chunk_rows=args.chunk_rows, parquet=not args.no_parquet)
+    else:
+        load_data(chunk_rows=args.chunk_rows, recreate=args.recreate, parquet=not args.no_parquet)
@@ -0,0 +1,244 @@
+"""
+Converts the CSV datasets into typed, zstd-compressed Parquet datasets and reads them back.
+
+Each table becomes a directory under PARQUET_DIR with the column types of its model; flights
+is hive-partitioned by year/month, so filters on those columns skip whole files and the row
+group statistics let readers skip the rest. A conversion is only redone when the CSV changed.
+
+Usage: python src/db/parquet.py [--force]
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import shutil
+import sys
+import time
+from typing import Dict, Iterator, List, Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.dataset as ds
+from pyarrow import fs
+from sqlalchemy import Boolean, Float, Integer, Table
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+from src.config import config
+from src.db.bulk_load import TABLE_SOURCES, copy_columns
+from src.db.create_table import PARTITION_COLUMNS, loaded_columns
+
+logger = logging.getLogger(__name__)
+
+# Records which CSV a dataset was converted from, to tell when it is stale
+_SOURCE_FILE = "_source.json"
+_TRUE_VALUES = pa.array(["1", "1.0", "t", "true"])
+
+
+def arrow_type(column) -> pa.DataType:
+    """Returns the Arrow type matching a model column's SQL type."""
+    if isinstance(column.type, Boolean):
+        return pa.bool_()
+    if isinstance(column.type, Integer):
+        return pa.int32()
+    if isinstance(column.type, Float):
+        return pa.float64()
+    return pa.string()
+
+
+def arrow_schema(table: Table) -> pa.Schema:
+    """Returns the Arrow schema of a model table."""
+    return pa.schema(
+        [pa.field(column.name, arrow_type(column)) for column in loaded_columns(table)]
+    )
+
+
+def _partitioning(table: Table) -> Optional[ds.Partitioning]:
+    names = PARTITION_COLUMNS.get(table)
+    if not names:
+        return None
+    schema = arrow_schema(table)
+    return ds.partitioning(pa.schema([schema.field(name) for name in names]), flavor="hive")
+
+
+def _convert_column(column, values: pa.Array) -> pa.Array:
+    if isinstance(column.type, Boolean):
+        # Same truth values as the COPY loader; empty fields stay NULL
+        matched = pc.is_in(pc.utf8_lower(pc.utf8_trim_whitespace(values)), value_set=_TRUE_VALUES)
+        return pc.if_else(pc.is_null(values), pa.scalar(None, pa.bool_()), matched)
+    if isinstance(column.type, Integer):
+        # pandas writes nullable integers as floats, e.g. "1335.0"
+        return pc.cast(pc.trunc(values), pa.int32())
+    return values
+
+
+def _csv_batches(table: Table, path: str) -> Iterator[pa.RecordBatch]:
+    """Streams a CSV dataset as record batches typed like `table`."""
+    with open(path, newline="") as f:
+        names = next(csv.reader(f))
+    header = {name.strip().lower(): name for name in names}
+    columns = copy_columns(table, list(header))
+    column_types = {
+        header[name]: pa.float64()
+        if isinstance(table.columns[name].type, (Integer, Float))
+        else pa.string()
+        for name in columns
+    }
+    reader = pacsv.open_csv(
+        path,
+        read_options=pacsv.ReadOptions(block_size=1 << 22),
+        convert_options=pacsv.ConvertOptions(
+            column_types=column_types,
+            include_columns=[header[name] for name in columns],
+            strings_can_be_null=True,
+        ),
+    )
+    schema = arrow_schema(table)
+    # An integer primary key missing from the CSV gets the ids a fresh serial column would
+    next_id = 1
+    for batch in reader:
+        arrays = []
+        for field in schema:
+            column = table.columns[field.name]
+            if field.name in columns:
+                arrays.append(_convert_column(column, batch.column(header[field.name])))
+            elif column.primary_key and isinstance(column.type, Integer):
+                arrays.append(pa.array(range(next_id, next_id + batch.num_rows), pa.int32()))
+            else:
+                arrays.append(pa.nulls(batch.num_rows, field.type))
+        next_id += batch.num_rows
+        yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def source_stamp(path: str) -> Dict:
+    stat = os.stat(path)
+    return {"file": os.path.basename(path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def dataset_path(table: Table, data_dir: str = None, parquet_dir: str = None) -> Optional[str]:
+    """Returns the Parquet dataset directory of `table`, or None when it is missing or stale."""
+    data_dir = data_dir or config.DATA_DIR
+    directory = os.path.join(parquet_dir or config.PARQUET_DIR, table.name)
+    try:
+        with open(os.path.join(directory, _SOURCE_FILE)) as f:
+            stamp = json.load(f)
+        current = source_stamp(os.path.join(data_dir, TABLE_SOURCES[table]))
+    except (OSError, ValueError):
+        return None
+    return directory if stamp == current else None
+
+
+def convert_table(
+    table: Table,
+    data_dir: str = None,
+    parquet_dir: str = None,
+    row_group_rows: int = None,
+) -> Dict:
+    """Writes one CSV dataset to Parquet, replacing any earlier conversion of it."""
+    data_dir = data_dir or config.DATA_DIR
+    parquet_dir = parquet_dir or config.PARQUET_DIR
+    row_group_rows = row_group_rows or config.PARQUET_ROW_GROUP_ROWS
+    source = os.path.join(data_dir, TABLE_SOURCES[table])
+    directory = os.path.join(parquet_dir, table.name)
+    temporary = directory + ".tmp"
+    shutil.rmtree(temporary, ignore_errors=True)
+
+    start = time.perf_counter()
+    stamp = source_stamp(source)
+    schema = arrow_schema(table)
+    ds.write_dataset(
+        pa.RecordBatchReader.from_batches(schema, _csv_batches(table, source)),
+        temporary,
+        format="parquet",
+        partitioning=_partitioning(table),
+        basename_template="part-{i}.parquet",
+        file_options=ds.ParquetFileFormat().make_write_options(compression="zstd"),
+        min_rows_per_group=min(row_group_rows, 1 << 14),
+        max_rows_per_group=row_group_rows,
+    )
+    with open(os.path.join(temporary, _SOURCE_FILE), "w") as f:
+        json.dump(stamp, f)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(temporary, directory)
+
+    elapsed = time.perf_counter() - start
+    rows = open_dataset(table, directory).count_rows()
+    logger.info(f"Converted {rows} rows of {table.name} to Parquet in {elapsed:.2f}s")
+    return {"table": table.name, "rows": rows, "seconds": round(elapsed, 3)}
+
+
+def convert_datasets(
+    data_dir: str = None,
+    parquet_dir: str = None,
+    tables: List[Table] = None,
+    force: bool = False,
+) -> List[Dict]:
+    """Converts every dataset whose Parquet copy is missing or stale. Returns per-table stats."""
+    return [
+        convert_table(table, data_dir, parquet_dir)
+        for table in tables or list(TABLE_SOURCES)
+        if force or dataset_path(table, data_dir, parquet_dir) is None
+    ]
+
+
+def open_dataset(table: Table, directory: str) -> ds.Dataset:
+    """Opens a table's Parquet dataset with memory-mapped reads."""
+    return ds.dataset(
+        directory,
+        schema=arrow_schema(table),
+        format="parquet",
+        partitioning=_partitioning(table),
+        filesystem=fs.LocalFileSystem(use_mmap=True),
+        exclude_invalid_files=False,
+        ignore_prefixes=[".", "_"],
+    )
+
+
+def scan_batches(
+    table: Table,
+    directory: str,
+    columns: List[str] = None,
+    filter: ds.Expression = None,
+    batch_rows: int = 50_000,
+) -> Iterator[pa.RecordBatch]:
+    """
+    Streams a table's Parquet dataset, reading only `columns` and skipping the partitions and
+    row groups that `filter` rules out.
+    """
+    scanner = open_dataset(table, directory).scanner(
+        columns=columns, filter=filter, batch_size=batch_rows
+    )
+    yield from scanner.to_batches()
+
+
+def iter_parquet_copy_chunks(
+    table: Table, directory: str, chunk_rows: int = 50_000, filter: ds.Expression = None
+) -> Iterator[tuple]:
+    """
+    Streams a table's Parquet dataset as (columns, row count, CSV text) chunks for COPY FROM
+    STDIN, only the rows matching `filter` if given. Serial keys are left to the database's
+    sequence, as in the CSV load.
+    """
+    columns = [
+        column.name
+        for column in loaded_columns(table)
+        if not (column.primary_key and isinstance(column.type, Integer) and column.autoincrement)
+    ]
+    options = pacsv.WriteOptions(include_header=False)
+    batches = scan_batches(table, directory, columns=columns, filter=filter, batch_rows=chunk_rows)
+    for batch in batches:
+        if batch.num_rows:
+            buffer = pa.BufferOutputStream()
+            pacsv.write_csv(batch, buffer, write_options=options)
+            yield columns, batch.num_rows, buffer.getvalue().to_pybytes().decode()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Convert the CSV datasets to Parquet.")
+    parser.add_argument("--force", action="store_true", help="convert even if up to date")
+    args = parser.parse_args()
+    for table_stats in convert_datasets(force=args.force):
+        print(f"{table_stats['table']}: {table_stats['rows']} rows in {table_stats['seconds']}s")
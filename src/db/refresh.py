@@ -0,0 +1,334 @@
+"""
+Incremental refresh of the loaded datasets.
+
+Each table is split into slices: flights by (year, month), the small tables as a whole. The
+load manifest kept in the database records the size and modification time of each table's
+CSV file and a hash of every slice. Tables whose file is unchanged are skipped without reading
+it. For the others the slices are hashed, from the up-to-date Parquet dataset when there is
+one and from the CSV otherwise, and compared with the manifest; the two sources hash
+differently, so switching between them reloads a table once. Only new or changed slices are
+deleted and loaded again,
+and slices that disappeared from the files are deleted, all in one transaction per table. The
+manifest is updated in the same transaction. Afterwards the changed tables are analyzed and
+their data versions bumped, so result caches drop only the results that read them.
+
+Usage: python src/db/load_data.py --incremental
+"""
+
+import csv
+import hashlib
+import io
+import json
+import logging
+import os
+import sys
+import time
+from functools import reduce
+from typing import Dict, List, Tuple
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+from sqlalchemy import Boolean, Float, Integer, Table, and_, select
+from sqlalchemy.engine import Connection, Engine
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+from src.config import config
+from src.db.bulk_load import (
+    TABLE_SOURCES,
+    _column_parser,
+    _copy_from_stdin,
+    chunk_partitions,
+    iter_copy_chunks,
+)
+from src.db.create_table import (
+    PARTITION_COLUMNS,
+    Base,
+    LoadedSlice,
+    bump_data_versions,
+    create_partitions,
+    is_partitioned,
+)
+from src.db.parquet import dataset_path, iter_parquet_copy_chunks, open_dataset, source_stamp
+
+logger = logging.getLogger(__name__)
+
+# Slice key of a table that is loaded as a whole
+WHOLE_TABLE = "*"
+# Manifest key holding the stamp of the CSV file a table was last refreshed from
+SOURCE_KEY = "#source"
+
+
+def slice_key(columns: List[str], values: Tuple[str, ...]) -> str:
+    """Returns the manifest key of a slice, e.g. "year=2015/month=1"."""
+    if not columns:
+        return WHOLE_TABLE
+    return "/".join(f"{column}={value}" for column, value in zip(columns, values))
+
+
+def slice_hashes(path: str, table: Table) -> Dict[str, Dict]:
+    """
+    Reads a CSV dataset once and returns, per slice key, the slice's values, row count and a
+    hash of its rows.
+    """
+    columns = PARTITION_COLUMNS.get(table, [])
+    slices: Dict[str, Dict] = {}
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        header = [name.strip().lower() for name in next(reader)]
+        positions = [header.index(name) for name in columns]
+        parsers = [_column_parser(table.columns[name]) for name in columns]
+        for record in reader:
+            # Coerced like the COPY rows, so "1.0" and "1" are the same slice
+            values = tuple(
+                parse(record[position]) if parse and record[position] != "" else record[position]
+                for position, parse in zip(positions, parsers)
+            )
+            key = slice_key(columns, values)
+            entry = slices.get(key)
+            if entry is None:
+                entry = slices[key] = {"values": values, "rows": 0, "hash": hashlib.sha256()}
+            entry["rows"] += 1
+            entry["hash"].update("\x1f".join(record).encode())
+            entry["hash"].update(b"\n")
+    for entry in slices.values():
+        entry["hash"] = entry["hash"].hexdigest()
+    return slices
+
+
+def parquet_slice_hashes(table: Table, directory: str) -> Dict[str, Dict]:
+    """
+    Returns the same per-slice values, row counts and hashes as `slice_hashes`, read from the
+    table's Parquet dataset: each hive partition is one slice. Rows are hashed in sorted order,
+    since the conversion writes them in no particular order, and without the serial key,
+    which depends on the position of the row in the whole file.
+    """
+    columns = PARTITION_COLUMNS.get(table, [])
+    hashed = [
+        column.name
+        for column in table.columns
+        if not (column.primary_key and isinstance(column.type, Integer) and column.autoincrement)
+        and column.computed is None
+        and column.name not in columns
+    ]
+    fragments: Dict[str, List] = {}
+    values_by_key: Dict[str, Tuple[str, ...]] = {}
+    for fragment in open_dataset(table, directory).get_fragments():
+        keys = ds.get_partition_keys(fragment.partition_expression)
+        values = tuple(str(keys[name]) for name in columns)
+        key = slice_key(columns, values)
+        values_by_key[key] = values
+        fragments.setdefault(key, []).append(fragment)
+
+    slices: Dict[str, Dict] = {}
+    for key, parts in fragments.items():
+        data = pa.concat_tables(part.to_table(columns=hashed) for part in parts)
+        data = data.sort_by([(name, "ascending") for name in hashed]).combine_chunks()
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, data.schema) as writer:
+            writer.write_table(data)
+        slices[key] = {
+            "values": values_by_key[key],
+            "rows": data.num_rows,
+            "hash": hashlib.sha256(sink.getvalue().to_pybytes()).hexdigest(),
+        }
+    return slices
+
+
+def _parquet_filter(table: Table, columns: List[str], wanted) -> ds.Expression:
+    return reduce(
+        lambda left, right: left | right,
+        (
+            reduce(
+                lambda left, right: left & right,
+                (
+                    ds.field(name) == _typed_value(table.columns[name], value)
+                    for name, value in zip(columns, values)
+                ),
+            )
+            for values in wanted
+        ),
+    )
+
+
+def _typed_value(column, value: str):
+    if value == "":
+        return None
+    if isinstance(column.type, Boolean):
+        # "t" from the CSV chunks, "true" from the Parquet ones
+        return value in ("t", "true")
+    if isinstance(column.type, Integer):
+        return int(value)
+    if isinstance(column.type, Float):
+        return float(value)
+    return value
+
+
+def _slice_condition(table: Table, key: str):
+    if key == WHOLE_TABLE:
+        return None
+    conditions = []
+    for part in key.split("/"):
+        name, _, value = part.partition("=")
+        column = table.columns[name]
+        value = _typed_value(column, value)
+        conditions.append(column.is_(None) if value is None else column == value)
+    return and_(*conditions)
+
+
+def _load_chunks(conn: Connection, table: Table, chunks) -> int:
+    """
+    Writes COPY chunks into `table` on `conn`: COPY on PostgreSQL, creating missing partitions
+    first, and INSERTs elsewhere.
+    """
+    rows = 0
+    postgresql = conn.engine.dialect.name == "postgresql"
+    partitioned = is_partitioned(table, conn.engine.dialect.name)
+    cursor = conn.connection.cursor() if postgresql else None
+    for columns, count, chunk in chunks:
+        if partitioned:
+            create_partitions(cursor, table, chunk_partitions(table, columns, chunk))
+        if postgresql:
+            column_list = ", ".join(f'"{name}"' for name in columns)
+            _copy_from_stdin(
+                cursor,
+                f'COPY "{table.name}" ({column_list}) FROM STDIN WITH (FORMAT csv)',
+                chunk,
+            )
+        else:
+            records = [
+                {
+                    name: _typed_value(table.columns[name], value)
+                    for name, value in zip(columns, row)
+                }
+                for row in csv.reader(io.StringIO(chunk))
+            ]
+            conn.execute(table.insert(), records)
+        rows += count
+    return rows
+
+
+def refresh_table(
+    engine: Engine,
+    table: Table,
+    data_dir: str = None,
+    chunk_rows: int = 50_000,
+    parquet_dir: str = None,
+) -> Dict:
+    """Reloads the slices of `table` whose content changed since the last refresh."""
+    start = time.perf_counter()
+    data_dir = data_dir or config.DATA_DIR
+    path = os.path.join(data_dir, TABLE_SOURCES[table])
+    stamp = json.dumps(source_stamp(path), sort_keys=True)
+    manifest = LoadedSlice.__table__
+    with engine.connect() as conn:
+        loaded = dict(
+            conn.execute(
+                select(manifest.c.slice_key, manifest.c.content_hash).where(
+                    manifest.c.table_name == table.name
+                )
+            ).all()
+        )
+    loaded_stamp = loaded.pop(SOURCE_KEY, None)
+    stats = {
+        "table": table.name,
+        "source": None,
+        "slices": len(loaded),
+        "changed": [],
+        "removed": [],
+        "rows": 0,
+    }
+    if loaded_stamp == stamp:
+        stats["seconds"] = round(time.perf_counter() - start, 3)
+        return stats
+
+    directory = dataset_path(table, data_dir, parquet_dir)
+    if directory is not None:
+        stats["source"] = "parquet"
+        current = parquet_slice_hashes(table, directory)
+    else:
+        stats["source"] = "csv"
+        current = slice_hashes(path, table)
+    changed = [key for key, entry in current.items() if loaded.get(key) != entry["hash"]]
+    removed = [key for key in loaded if key not in current]
+    stats.update(slices=len(current), changed=changed, removed=removed)
+
+    stale = changed + removed
+    with engine.begin() as conn:
+        for key in stale:
+            condition = _slice_condition(table, key)
+            conn.execute(table.delete() if condition is None else table.delete().where(condition))
+        if changed:
+            columns = PARTITION_COLUMNS.get(table, [])
+            wanted = {current[key]["values"] for key in changed}
+            if directory is not None:
+                rows_filter = _parquet_filter(table, columns, wanted) if columns else None
+                chunks = iter_parquet_copy_chunks(table, directory, chunk_rows, rows_filter)
+            else:
+                chunks = iter_copy_chunks(
+                    path, table, chunk_rows, columns, wanted if columns else None
+                )
+            stats["rows"] = _load_chunks(conn, table, chunks)
+        conn.execute(
+            manifest.delete().where(
+                and_(
+                    manifest.c.table_name == table.name,
+                    manifest.c.slice_key.in_(stale + [SOURCE_KEY]),
+                )
+            )
+        )
+        now = time.time()
+        entries = [
+            {
+                "table_name": table.name,
+                "slice_key": key,
+                "content_hash": current[key]["hash"],
+                "rows": current[key]["rows"],
+                "loaded_at": now,
+            }
+            for key in changed
+        ]
+        entries.append(
+            {
+                "table_name": table.name,
+                "slice_key": SOURCE_KEY,
+                "content_hash": stamp,
+                "rows": sum(entry["rows"] for entry in current.values()),
+                "loaded_at": now,
+            }
+        )
+        conn.execute(manifest.insert(), entries)
+    if stale:
+        # Fresh planner statistics for the table that changed, not the whole database
+        with engine.begin() as conn:
+            conn.exec_driver_sql(f'ANALYZE "{table.name}"')
+
+    stats["seconds"] = round(time.perf_counter() - start, 3)
+    logger.info(
+        f"Refreshed {len(changed)} and removed {len(removed)} of {len(current)} slices of "
+        f"{table.name} from {stats['source']} ({stats['rows']} rows) in {stats['seconds']}s"
+    )
+    return stats
+
+
+def refresh(
+    engine: Engine,
+    data_dir: str = None,
+    tables: List[Table] = None,
+    chunk_rows: int = 50_000,
+    parquet_dir: str = None,
+) -> Dict:
+    """
+    Brings the tables up to date with the CSV datasets, loading only the slices that changed.
+    Returns per-table statistics and the names of the tables that changed, whose data
+    versions were bumped.
+    """
+    tables = tables or list(TABLE_SOURCES)
+    Base.metadata.create_all(bind=engine, tables=tables + [LoadedSlice.__table__])
+    stats = [
+        refresh_table(engine, table, data_dir, chunk_rows, parquet_dir) for table in tables
+    ]
+    changed_tables = [entry["table"] for entry in stats if entry["changed"] or entry["removed"]]
+    if changed_tables:
+        bump_data_versions(engine, changed_tables)
+    return {"changed_tables": changed_tables, "tables": stats}
+
@@ -0,0 +1,89 @@
+import itertools
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+BALANCING_STRATEGIES = ("least_busy", "round_robin")
+
+
+class Replica:
+    """A read replica's engine with its load and health."""
+
+    def __init__(self, name: str, engine: Engine):
+        self.name = name
+        self.engine = engine
+        self.in_flight = 0
+        self.failures = 0
+        self.ejected_until = 0.0
+
+    def healthy(self, now: float) -> bool:
+        return self.ejected_until <= now
+
+
+class ReplicaRouter:
+    """
+    Picks the read replica for each query, either the one with the fewest queries in flight
+    (`least_busy`) or each in turn (`round_robin`). A replica whose connections fail
+    `max_failures` times in a row is left out for `eject_seconds`, then tried again.
+    """
+
+    def __init__(
+        self,
+        engines: List[Engine],
+        balancing: str = "least_busy",
+        max_failures: int = 3,
+        eject_seconds: float = 30.0,
+    ):
+        if balancing not in BALANCING_STRATEGIES:
+            raise ValueError(f"Unknown replica balancing: {balancing}")
+        self.replicas = [Replica(f"replica-{index}", engine) for index, engine in enumerate(engines)]
+        self.balancing = balancing
+        self.max_failures = max(max_failures, 1)
+        self.eject_seconds = eject_seconds
+        self._turns = itertools.count()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> Optional[Replica]:
+        """Returns the replica to run a query on and counts it as busy, or None if none is healthy."""
+        now = time.monotonic()
+        with self._lock:
+            healthy = [replica for replica in self.replicas if replica.healthy(now)]
+            if not healthy:
+                return None
+            if self.balancing == "round_robin":
+                replica = healthy[next(self._turns) % len(healthy)]
+            else:
+                replica = min(healthy, key=lambda candidate: candidate.in_flight)
+            replica.in_flight += 1
+            return replica
+
+    def release(self, replica: Replica) -> None:
+        with self._lock:
+            replica.in_flight -= 1
+
+    def record_success(self, replica: Replica) -> None:
+        with self._lock:
+            replica.failures = 0
+
+    def record_failure(self, replica: Replica) -> None:
+        """Counts a connection failure and ejects the replica after too many in a row."""
+        with self._lock:
+            replica.failures += 1
+            if replica.failures >= self.max_failures:
+                replica.ejected_until = time.monotonic() + self.eject_seconds
+                replica.failures = 0
+                logger.warning(
+                    f"Ejecting {replica.name} for {self.eject_seconds}s after connection failures"
+                )
+
+    def stats(self) -> List[Dict]:
+        now = time.monotonic()
+        return [
+            {"name": replica.name, "healthy": replica.healthy(now), "in_flight": replica.in_flight}
+            for replica in self.replicas
+        ]
@@ -1,31 +1,87 @@
+import asyncio
+import csv
+import io
 import json
 import logging
 import os
 import sys
-from typing import Dict, Tuple
+import time
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
 
-import markdown2
 from fastapi import FastAPI, Form, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from pydantic import BaseModel
 
 # Add the project root to the Python path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
-from src.core.llm import GenerativeModelWrapper
-from src.utils.common_utils import clean_generation_result
+from src.config import config
+from src.core.admission import PRIORITY_BATCH, request_priority
+from src.core.deadline import check_deadline, request_deadline
+from src.core.llm import GenerativeModelWrapper, get_llm
+from src.core.singleflight import SingleFlight
+from src.utils.cache_utils import SQLCache, normalize_question, prompt_fingerprint
+from src.utils.common_utils import clean_generation_result, log_generated_sql
+from src.utils.cost_guard import CostGuard, cost_guard_notice
 from src.utils.database_utils import DatabaseConnector
-from src.utils.prompts import sql_correction_prompt
+from src.utils.metrics import (
+    ATTEMPT_FAILURES,
+    ATTEMPTS_PER_REQUEST,
+    CACHE_LOOKUPS,
+    COST_GUARD_ACTIONS,
+    GENERATION_ATTEMPTS,
+    PROMPT_CHARS,
+    REGISTRY,
+    REQUEST_FAILURES,
+    RESULT_ROWS,
+    ROWS_RETURNED,
+    SPECULATIVE_CANDIDATES,
+    server_timing_header,
+    span,
+    start_request_timings,
+)
+from src.utils.prompts import (
+    JSON_SQL_RULES,
+    sql_correction_prompt,
+    sql_generation_system_prompt,
+    sql_generation_user_prompt,
+)
+from src.utils.result_snapshots import ResultSnapshot, SnapshotStore
+from src.utils.schema_utils import SchemaSelector, render_schema_prompt
+from src.utils.sql_validator import SQLValidator, format_validation_errors
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Creates the clients and warms them up before serving; closes the database on shutdown."""
+    await start_up()
+    try:
+        yield
+    finally:
+        if db_connector is not None:
+            db_connector.close()
+
+
 # Create FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 templates = Jinja2Templates(directory="src/server/templates/")
-templates.env.filters["markdown"] = markdown2.markdown
+
+
+def render_markdown(text: str) -> str:
+    """Jinja filter for Markdown; markdown2 is imported when a page first needs it."""
+    import markdown2
+
+    return markdown2.markdown(text)
+
+
+templates.env.filters["markdown"] = render_markdown
 app.mount("/static", StaticFiles(directory="src/server/static"), name="static")
 
 app.add_middleware(
@@ -36,66 +92,353 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize database connector
-db_connector = DatabaseConnector()
+
+@app.middleware("http")
+async def server_timing(request: Request, call_next):
+    """Collects per-stage timings for the request and reports them in a Server-Timing header."""
+    timings = start_request_timings()
+    start = time.perf_counter()
+    response = await call_next(request)
+    timings["total"] = time.perf_counter() - start
+    header = server_timing_header(timings)
+    response.headers["Server-Timing"] = header
+    logger.info(f"{request.method} {request.url.path} {response.status_code} {header}")
+    return response
+
+# Shared database connector, created at startup (or on first use outside the lifespan)
+db_connector: Optional[DatabaseConnector] = None
+# Whether start-up and warm-up finished, as reported by /readyz
+startup_state: Dict = {"ready": False, "seconds": None, "error": None}
+
+
+def get_db_connector() -> DatabaseConnector:
+    """Returns the shared database connector, connecting on first use."""
+    global db_connector
+    if db_connector is None:
+        db_connector = DatabaseConnector()
+    return db_connector
+
+
+async def warm_up() -> None:
+    """Opens a database connection, creates the LLM client and compiles the page templates."""
+    await get_db_connector().ping_async()
+    get_llm()
+    for name in ("index.html", "chat_response.html", "results_table.html"):
+        templates.get_template(name)
+
+
+async def start_up() -> None:
+    """Creates the shared clients off the event loop and, if enabled, warms them up."""
+    start = time.perf_counter()
+    try:
+        await asyncio.to_thread(get_db_connector)
+        if config.STARTUP_WARMUP:
+            await warm_up()
+    except Exception as e:
+        # Keep serving /healthz; /readyz reports the failure until a restart
+        startup_state["error"] = str(e)
+        logger.exception("Start-up failed")
+        return
+    startup_state["seconds"] = round(time.perf_counter() - start, 3)
+    startup_state["ready"] = True
+    logger.info(f"Ready in {startup_state['seconds']}s")
+
+# Cache of questions to SQL that executed successfully
+sql_cache = SQLCache(
+    maxsize=config.SQL_CACHE_SIZE, ttl=config.SQL_CACHE_TTL, path=config.SQL_CACHE_PATH
+)
+# Picks the part of the schema each question needs
+schema_selector = SchemaSelector(min_columns=config.PROMPT_PRUNE_MIN_COLUMNS)
+# Rejects unsafe or invalid SQL before it reaches the database
+sql_validator = SQLValidator()
+# Limits, rewrites or rejects generated SQL the planner expects to be too large or expensive
+cost_guard = CostGuard(
+    max_rows=config.COST_GUARD_MAX_ROWS,
+    max_cost=config.COST_GUARD_MAX_COST,
+    action=config.COST_GUARD_ACTION,
+)
+# /chat/stream sends rows in batches, so it has its own row limit and a cut-off export is opt-in
+stream_cost_guard = CostGuard(
+    max_rows=config.COST_GUARD_STREAM_MAX_ROWS,
+    max_cost=config.COST_GUARD_MAX_COST,
+    action=config.COST_GUARD_ACTION,
+)
+SYSTEM_PROMPT_HASH = prompt_fingerprint(
+    sql_generation_system_prompt
+    + sql_generation_user_prompt
+    + render_schema_prompt()
+    + str(config.PROMPT_PRUNING)
+)
+
+# Executed results kept for paging through /results/{id} without re-running the question
+result_snapshots = SnapshotStore(
+    ttl=config.RESULT_SNAPSHOT_TTL,
+    max_bytes=config.RESULT_SNAPSHOT_MAX_BYTES,
+    directory=config.RESULT_SNAPSHOT_DIR,
+)
+
+# Concurrent requests for the same question share one generation and execution
+inflight_questions = SingleFlight()
+
+
+# Failures that end a request at once instead of prompting for a corrected query: the client
+# went away (499), the deadline passed (504) or the LLM is overloaded (429, 503)
+TERMINAL_STATUS_CODES = (429, 499, 503, 504)
+
+
+def build_schema_prompt(user_query: str) -> Tuple[str, str]:
+    """Returns the schema section and any extra rules to send along with the question."""
+    if not config.PROMPT_PRUNING:
+        return render_schema_prompt(), ""
+    selection = schema_selector.select(user_query)
+    extra_rules = JSON_SQL_RULES if schema_selector.has_json_columns(selection) else ""
+    return render_schema_prompt(selection), extra_rules
 
 
 async def generate_sql(
-    user_query: str, llm: GenerativeModelWrapper, prompt: str = None
+    user_query: str,
+    llm: GenerativeModelWrapper,
+    prompt: str = None,
+    temperature: float = None,
 ) -> str:
     """Generates SQL query using the LLM."""
+    prompt = prompt or user_query
+    PROMPT_CHARS.observe(len(prompt))
     try:
-        response = await llm.generate_sql(prompt or user_query)
-        cleaned_response = clean_generation_result(response)
-        parsed = json.loads(cleaned_response)
+        with span("llm"):
+            response = await llm.generate_sql(prompt, temperature=temperature)
+        with span("clean"):
+            cleaned_response = clean_generation_result(response)
+        with span("parse"):
+            parsed = json.loads(cleaned_response)
         generated_sql = parsed.get("sql", "")
         return generated_sql
+    except HTTPException:
+        # e.g. refused by admission control
+        raise
     except (json.JSONDecodeError, KeyError) as e:
         logger.error(f"LLM response parsing error: {e}")
         raise HTTPException(status_code=500, detail="Failed to parse LLM response.")
+    except asyncio.TimeoutError:
+        logger.error("LLM call timed out")
+        raise HTTPException(status_code=504, detail="Timed out waiting for the LLM.")
     except Exception:
         logger.exception("Unexpected error during SQL generation")
         raise HTTPException(status_code=500, detail="Error generating SQL.")
 
 
-async def generate_and_execute_with_retries(user_query: str) -> Tuple[str, Dict]:
+def validate_generated_sql(sql: str) -> None:
+    """Raises a 422 HTTPException describing the problems found by the local SQL validator."""
+    if not config.SQL_VALIDATION:
+        return
+    with span("validate"):
+        validation_errors = sql_validator.validate(sql)
+    if validation_errors:
+        raise HTTPException(status_code=422, detail=format_validation_errors(validation_errors))
+
+
+async def guard_query_cost(sql: str, guard: CostGuard = None) -> str:
     """
-    Attempts to generate a corrected SQL query and execute it up to 3 times.
-    If all attempts fail, an HTTPException is raised.
+    Plans the SQL with EXPLAIN and applies `guard` (the shared cost guard by default). Returns
+    the SQL to run, which may have been given a LIMIT or a sampled scan; raises a 422
+    HTTPException explaining why the query was rejected.
+    """
+    guard = guard or cost_guard
+    connector = get_db_connector()
+    with span("explain"):
+        cost = await connector.estimate_cost_async(sql)
+    decision = guard.check(sql, cost, connector.engine.dialect.name)
+    COST_GUARD_ACTIONS.inc(action=decision.action)
+    if decision.action == "reject":
+        raise HTTPException(status_code=422, detail=decision.reason)
+    if decision.action != "allow":
+        logger.warning(f"Cost guard: {decision.reason}")
+    return decision.sql
+
+
+async def generate_speculative_candidates(
+    user_query: str,
+    llm: GenerativeModelWrapper,
+    prompt: str,
+    execute: Callable[[str], Awaitable[List]],
+    candidates: int,
+    guard: CostGuard = None,
+) -> Tuple[Optional[List], str, str]:
+    """
+    Requests `candidates` SQL candidates concurrently at varied temperatures, with at most
+    SPECULATIVE_MAX_CONCURRENCY LLM calls in flight. Each is checked locally and, when the
+    cost guard is enabled, with EXPLAIN; the first one that passes is executed and the others
+    are cancelled.
+
+    Returns (results, sql, error_message). Results are None when no candidate succeeded, in
+    which case sql and error_message describe a failed candidate for the correction prompt.
+    """
+    semaphore = asyncio.Semaphore(config.SPECULATIVE_MAX_CONCURRENCY)
+    temperatures = config.SPECULATIVE_TEMPERATURES
+    guard = guard or cost_guard
+
+    async def check_candidate(index: int) -> Tuple[str, Optional[str]]:
+        """Returns the SQL to run (or the candidate SQL) and the error that rejected it, if any."""
+        sql = ""
+        try:
+            async with semaphore:
+                sql = await generate_sql(
+                    user_query, llm, prompt, temperature=temperatures[index % len(temperatures)]
+                )
+            validate_generated_sql(sql)
+            # Like the main loop, skip the EXPLAIN round-trip when the guard is off
+            guarded_sql = await guard_query_cost(sql, guard) if guard.enabled else sql
+        except HTTPException as http_ex:
+            # A candidate refused by admission control just loses the race
+            if http_ex.status_code in (499, 504):
+                raise
+            return sql, http_ex.detail
+        return guarded_sql, None
+
+    tasks = [asyncio.ensure_future(check_candidate(index)) for index in range(candidates)]
+    failed_sql, error_message = "", ""
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            sql, error = await next_done
+            if error is not None:
+                SPECULATIVE_CANDIDATES.inc(outcome="failed")
+                # Prefer a candidate that produced SQL: its error makes a better correction prompt
+                if sql or not failed_sql:
+                    failed_sql, error_message = sql, error
+                continue
+
+            SPECULATIVE_CANDIDATES.inc(outcome="won")
+            for task in tasks:
+                if not task.done():
+                    SPECULATIVE_CANDIDATES.inc(outcome="cancelled")
+                    task.cancel()
+            logger.info("Executing the first valid speculative candidate")
+            try:
+                return await execute(sql), sql, ""
+            except HTTPException as http_ex:
+                if http_ex.status_code in TERMINAL_STATUS_CODES:
+                    raise
+                return None, sql, http_ex.detail
+        return None, failed_sql, error_message
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def record_success(cache_key: str, user_query: str, sql: str, attempts: int) -> None:
+    """Caches and logs SQL that executed successfully; the log is appended on a worker thread."""
+    ATTEMPTS_PER_REQUEST.observe(attempts)
+    sql_cache.set(cache_key, sql)
+    if config.SQL_LOG_PATH:
+        await asyncio.to_thread(log_generated_sql, config.SQL_LOG_PATH, user_query, sql)
+
+
+async def generate_and_execute_with_retries(
+    user_query: str,
+    execute: Callable[[str], Awaitable[List]] = None,
+    llm: GenerativeModelWrapper = None,
+    guard: CostGuard = None,
+) -> Tuple[str, Dict]:
+    """
+    Attempts to generate a corrected SQL query and execute it up to 3 times, all within the
+    current request deadline. If all attempts fail or the deadline passes, an HTTPException is raised.
+    With SPECULATIVE_CANDIDATES > 1 the first attempt races that many candidates instead.
+    `execute` runs the SQL and defaults to the connector's async query path; `llm` defaults
+    to the shared client and `guard` to the shared cost guard.
     Returns a tuple of (corrected SQL query string, query results).
     """
+    execute = execute or get_db_connector().execute_query_async
+    guard = guard or cost_guard
     max_attempts = 3
     attempt = 0
     error_message = ""
     generated_sql = ""
 
-    llm = GenerativeModelWrapper()
+    llm = llm or get_llm()
+    schema, extra_rules = build_schema_prompt(user_query)
+
+    # The cached SQL is the guarded SQL, so it is only reused under the same guard settings
+    cache_key = sql_cache.make_key(
+        user_query, llm.model_name, f"{SYSTEM_PROMPT_HASH}:{guard.fingerprint}"
+    )
+    check_deadline()
+    cached_sql = sql_cache.get(cache_key)
+    CACHE_LOOKUPS.inc(cache="sql", result="hit" if cached_sql else "miss")
+    if cached_sql:
+        try:
+            logger.info("Executing cached SQL")
+            results = await execute(cached_sql)
+            ATTEMPTS_PER_REQUEST.observe(0)
+            return cached_sql, results
+        except HTTPException as http_ex:
+            if http_ex.status_code in TERMINAL_STATUS_CODES:
+                raise
+            logger.warning(f"Cached SQL failed, regenerating: {http_ex.detail}")
+            sql_cache.delete(cache_key)
+
+    if config.SPECULATIVE_CANDIDATES > 1:
+        attempt += 1
+        GENERATION_ATTEMPTS.inc()
+        prompt = sql_generation_user_prompt.format(
+            schema=schema, extra_rules=extra_rules, user_query=user_query
+        )
+        results, generated_sql, error_message = await generate_speculative_candidates(
+            user_query, llm, prompt, execute, config.SPECULATIVE_CANDIDATES, guard
+        )
+        if results is not None:
+            await record_success(cache_key, user_query, generated_sql, attempt)
+            return generated_sql, results
+        ATTEMPT_FAILURES.inc(reason="speculation")
+        logger.warning(f"All speculative candidates failed: {error_message}")
 
     while attempt < max_attempts:
+        check_deadline()
         attempt += 1
+        GENERATION_ATTEMPTS.inc()
+        stage = "generation"
         try:
             logger.info("Generating SQL")
             if attempt == 1:
-                generated_sql = await generate_sql(user_query, llm)
+                prompt = sql_generation_user_prompt.format(
+                    schema=schema, extra_rules=extra_rules, user_query=user_query
+                )
+                generated_sql = await generate_sql(user_query, llm, prompt)
             else:
                 prompt = sql_correction_prompt.format(
+                    schema=schema,
                     user_query=user_query,
                     generated_sql=generated_sql,
                     error_message=error_message,
                 )
                 generated_sql = await generate_sql(user_query, llm, prompt)
+            stage = "validation"
+            validate_generated_sql(generated_sql)
+            guarded_sql = generated_sql
+            if guard.enabled:
+                stage = "cost"
+                guarded_sql = await guard_query_cost(generated_sql, guard)
             logger.info("Executing SQL")
-            results = db_connector.execute_query(generated_sql)
+            stage = "execution"
+            results = await execute(guarded_sql)
             logger.info(f"Attempt {attempt}: Query executed successfully.")
-            return generated_sql, results
+            await record_success(cache_key, user_query, guarded_sql, attempt)
+            return guarded_sql, results
 
         except HTTPException as http_ex:
+            ATTEMPT_FAILURES.inc(reason=stage)
+            if http_ex.status_code in TERMINAL_STATUS_CODES:
+                # Out of time, cancelled or shed: another attempt cannot succeed
+                REQUEST_FAILURES.inc()
+                raise
             error_message = http_ex.detail
             logger.warning(f"Attempt {attempt} failed: {error_message}")
         except Exception as e:
             error_message = str(e)
+            ATTEMPT_FAILURES.inc(reason=stage)
             logger.exception(f"Attempt {attempt} failed with unexpected error")
 
+    ATTEMPTS_PER_REQUEST.observe(max_attempts)
+    REQUEST_FAILURES.inc()
     logger.error("SQL query execution failed after 3 attempts.")
     raise HTTPException(
         status_code=500, detail="SQL query execution failed after 3 attempts."
@@ -104,7 +447,316 @@ async def generate_and_execute_with_retries(user_query: str) -> Tuple[str, Dict]
 
 @app.get("/", response_class=HTMLResponse)
 async def read_root(request: Request):
-    return templates.TemplateResponse("index.html", {"request": request})
+    return templates.TemplateResponse(request=request, name="index.html")
+
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and serving requests."""
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: start-up finished and the database answers; 503 otherwise."""
+    if not startup_state["ready"]:
+        return JSONResponse(status_code=503, content={"status": "starting", **startup_state})
+    try:
+        await asyncio.wait_for(get_db_connector().ping_async(), config.READINESS_TIMEOUT)
+    except Exception as e:
+        return JSONResponse(status_code=503, content={"status": "unavailable", "error": str(e)})
+    return {"status": "ready", "startup_seconds": startup_state["seconds"]}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Exposes the process metrics in the Prometheus text format."""
+    if db_connector is not None:
+        db_connector.update_pool_metrics()
+    return PlainTextResponse(
+        REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Returns hit/miss counters of the NL->SQL and query result caches."""
+    return {
+        "sql_cache": sql_cache.memory.stats(),
+        "result_cache": get_db_connector().cache_stats(),
+    }
+
+
+def _ndjson_stream(batches: Iterator[List[Dict]]) -> Iterator[str]:
+    """Formats result batches as newline-delimited JSON, reporting mid-stream errors as a final line."""
+    try:
+        for batch in batches:
+            ROWS_RETURNED.inc(len(batch))
+            yield "".join(json.dumps(row, default=str) + "\n" for row in batch)
+    except Exception as e:
+        detail = e.detail if isinstance(e, HTTPException) else str(e)
+        logger.error(f"NDJSON stream failed after it started: {detail}")
+        yield json.dumps({"error": detail}, default=str) + "\n"
+
+
+def _csv_stream(batches: Iterator[List[Dict]]) -> Iterator[str]:
+    """
+    Formats result batches as CSV with a header row taken from the first batch. The status
+    line has already been sent when a batch fails, so a mid-stream error ends the file with a
+    `# error: ...` line instead of leaving it silently truncated.
+    """
+    buffer = io.StringIO()
+    writer = None
+    try:
+        for batch in batches:
+            if not batch:
+                continue
+            ROWS_RETURNED.inc(len(batch))
+            if writer is None:
+                writer = csv.DictWriter(buffer, fieldnames=list(batch[0].keys()))
+                writer.writeheader()
+            writer.writerows(batch)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    except Exception as e:
+        detail = e.detail if isinstance(e, HTTPException) else str(e)
+        logger.error(f"CSV stream failed after it started: {detail}")
+        yield "# error: " + " ".join(str(detail).split()) + "\n"
+
+
+@app.post("/chat/stream")
+async def chat_stream(
+    request: Request,
+    text: str = Form(...),
+    format: str = Form("ndjson"),
+    fetch_size: int = Form(None),
+):
+    """Generates SQL for the question and streams the full result as chunked NDJSON or CSV."""
+    if format not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'csv'.")
+    if not text.strip():
+        raise HTTPException(status_code=400, detail="No query entered.")
+
+    # Validate the SQL without fetching rows; the stream runs it once for real
+    with request_deadline(config.REQUEST_DEADLINE_SECONDS):
+        sql, _ = await cancel_on_disconnect(
+            request,
+            generate_and_execute_with_retries(
+                text, execute=get_db_connector().probe_query_async, guard=stream_cost_guard
+            ),
+        )
+    batches = get_db_connector().stream_query_batches(sql, fetch_size)
+    # Why the cost guard limited or sampled the query, if it did
+    notice = cost_guard_notice(sql)
+    headers = {"X-Query-Notice": notice} if notice else {}
+    if format == "csv":
+        headers["Content-Disposition"] = 'attachment; filename="results.csv"'
+        return StreamingResponse(_csv_stream(batches), media_type="text/csv", headers=headers)
+    return StreamingResponse(
+        _ndjson_stream(batches), media_type="application/x-ndjson", headers=headers
+    )
+
+
+async def cancel_on_disconnect(request: Request, awaitable: Awaitable):
+    """
+    Awaits `awaitable` while polling the client connection; if the client goes away the work is
+    cancelled, which also cancels its in-flight LLM call and database query.
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=config.DISCONNECT_POLL_INTERVAL)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                logger.info("Client disconnected, cancelling the request")
+                task.cancel()
+                raise HTTPException(status_code=499, detail="Client disconnected.")
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+
+
+def render_template(
+    name: str, context: Dict, status_code: int = 200, headers: Dict = None
+) -> HTMLResponse:
+    """Renders a template response, timing the render as its own stage."""
+    with span("render"):
+        return templates.TemplateResponse(
+            request=context["request"],
+            name=name,
+            context=context,
+            status_code=status_code,
+            headers=headers,
+        )
+
+
+class BatchRequest(BaseModel):
+    questions: List[str]
+
+
+class _BoundedLLM:
+    """Wraps an LLM client so its calls share a concurrency limit and queue behind interactive ones."""
+
+    def __init__(self, llm: GenerativeModelWrapper, semaphore: asyncio.Semaphore):
+        self.llm = llm
+        self.model_name = llm.model_name
+        self.semaphore = semaphore
+
+    async def generate_sql(self, prompt: str, temperature: float = None):
+        async with self.semaphore:
+            with request_priority(PRIORITY_BATCH):
+                return await self.llm.generate_sql(prompt, temperature=temperature)
+
+
+async def answer_batch_question(
+    index: int,
+    question: str,
+    llm: _BoundedLLM,
+    execute: Callable[[str], Awaitable[List]],
+    slots: asyncio.Semaphore,
+) -> Dict:
+    """
+    Runs one batch question through the pipeline and returns its result line. The question
+    waits for one of `slots` first, and its deadline starts only once it has one, so time
+    spent queued behind the rest of the batch does not count against it.
+    """
+    timings = start_request_timings()
+    start = time.perf_counter()
+    item = {
+        "index": index,
+        "question": question,
+        "sql": None,
+        "rows": [],
+        "notice": None,
+        "error": None,
+    }
+    try:
+        async with slots:
+            with request_deadline(config.REQUEST_DEADLINE_SECONDS):
+                # Own key space: an interactive request must not wait on a batch-priority call
+                item["sql"], item["rows"] = await inflight_questions.do(
+                    f"batch:{normalize_question(question)}",
+                    lambda: generate_and_execute_with_retries(question, execute=execute, llm=llm),
+                )
+        item["notice"] = cost_guard_notice(item["sql"])
+        ROWS_RETURNED.inc(len(item["rows"]))
+    except HTTPException as http_ex:
+        item["error"] = http_ex.detail
+    except Exception as e:
+        logger.exception(f"Unexpected error answering batch question {index}")
+        item["error"] = str(e)
+    timings["total"] = time.perf_counter() - start
+    item["timings_ms"] = {stage: round(seconds * 1000, 3) for stage, seconds in timings.items()}
+    return item
+
+
+@app.post("/batch")
+async def batch(payload: BatchRequest):
+    """
+    Answers a list of questions and streams one NDJSON line per question as each completes,
+    with its index, SQL, rows, per-stage timings and error. Questions and LLM calls are
+    limited to BATCH_LLM_CONCURRENCY and database queries to BATCH_DB_CONCURRENCY at a time.
+    """
+    questions = payload.questions
+    if not questions:
+        raise HTTPException(status_code=400, detail="No questions given.")
+    if len(questions) > config.BATCH_MAX_QUESTIONS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {config.BATCH_MAX_QUESTIONS} questions per batch.",
+        )
+
+    llm = _BoundedLLM(get_llm(), asyncio.Semaphore(config.BATCH_LLM_CONCURRENCY))
+    slots = asyncio.Semaphore(config.BATCH_LLM_CONCURRENCY)
+    db_semaphore = asyncio.Semaphore(config.BATCH_DB_CONCURRENCY)
+
+    async def execute(sql: str) -> List:
+        async with db_semaphore:
+            return await get_db_connector().execute_query_async(sql)
+
+    async def lines():
+        tasks = [
+            asyncio.ensure_future(answer_batch_question(index, question, llm, execute, slots))
+            for index, question in enumerate(questions)
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield json.dumps(await next_done, default=str) + "\n"
+        finally:
+            # The client went away or the stream failed: stop the remaining questions
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+def results_page_context(
+    snapshot: ResultSnapshot,
+    offset: int = 0,
+    limit: int = None,
+    sort: str = None,
+    order: str = "asc",
+) -> Dict:
+    """
+    Returns the template context for one page of a result snapshot. A snapshot that was not
+    stored has no ID, and its page links nowhere.
+    """
+    limit = limit or config.RESULT_PAGE_SIZE
+    return {
+        "snapshot_id": snapshot.id,
+        "columns": snapshot.columns,
+        "rows": snapshot.page(offset, limit, sort, descending=order == "desc"),
+        "total": snapshot.total,
+        "offset": offset,
+        "limit": limit,
+        "sort": sort,
+        "order": order,
+    }
+
+
+@app.get("/results/{snapshot_id}")
+async def result_page(
+    request: Request,
+    snapshot_id: str,
+    offset: int = 0,
+    limit: int = None,
+    sort: str = None,
+    order: str = "asc",
+    format: str = "json",
+):
+    """
+    Returns a page of a stored result without asking the question again, optionally sorted
+    by one column. `format=html` returns the table fragment used by the chat page.
+    """
+    # A snapshot evicted from memory is read back from disk
+    snapshot = await asyncio.to_thread(result_snapshots.get, snapshot_id)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Result not found or expired.")
+    if offset < 0 or (limit is not None and not 0 < limit <= config.RESULT_PAGE_MAX_SIZE):
+        raise HTTPException(
+            status_code=400,
+            detail=f"offset must be >= 0 and limit between 1 and {config.RESULT_PAGE_MAX_SIZE}.",
+        )
+    if sort is not None and sort not in snapshot.columns:
+        raise HTTPException(status_code=400, detail=f"Unknown sort column: {sort}")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order must be 'asc' or 'desc'.")
+
+    page = results_page_context(snapshot, offset, limit, sort, order)
+    if format == "html":
+        return render_template("results_table.html", {"request": request, **page})
+    return {
+        "id": snapshot.id,
+        "sql": snapshot.sql,
+        "columns": page["columns"],
+        "rows": page["rows"],
+        "total": page["total"],
+        "offset": offset,
+        "limit": page["limit"],
+        "next_offset": offset + page["limit"] if offset + page["limit"] < snapshot.total else None,
+    }
 
 
 @app.post("/chat", response_class=HTMLResponse)
@@ -114,11 +766,11 @@ async def chat(request: Request, text: str = Form(...)):
         user_query = text
 
         if not user_query.strip():
-            return templates.TemplateResponse(
+            return render_template(
                 "chat_response.html",
                 {
                     "request": request,
-                    "results": [],
+                    "rows": [],
                     "text": user_query,
                     "sql": "No query entered.",
                 },
@@ -126,51 +778,71 @@ async def chat(request: Request, text: str = Form(...)):
         logger.info(f"User Query: {user_query}")
         logger.info("Invoking LLM")
 
-        sql, results = await generate_and_execute_with_retries(user_query)
+        with request_deadline(config.REQUEST_DEADLINE_SECONDS):
+            sql, results = await cancel_on_disconnect(
+                request,
+                inflight_questions.do(
+                    normalize_question(user_query),
+                    lambda: generate_and_execute_with_retries(user_query),
+                ),
+            )
+        RESULT_ROWS.observe(len(results))
+        ROWS_RETURNED.inc(len(results))
 
         if not results:
-            return templates.TemplateResponse(
+            return render_template(
                 "chat_response.html",
                 {
                     "request": request,
-                    "results": [],
+                    "rows": [],
                     "text": user_query,
                     "sql": sql,
+                    "notice": cost_guard_notice(sql),
                     "error_message": "No results found for this query.",
                 },
             )
 
-        return templates.TemplateResponse(
+        # Serializing the result and writing it to disk would block the event loop
+        # Page from the new snapshot itself: an unstored one or a concurrent eviction would
+        # make a lookup by ID miss
+        snapshot = await asyncio.to_thread(result_snapshots.create, user_query, sql, results)
+        page = results_page_context(snapshot, limit=config.RESULT_PAGE_SIZE)
+        return render_template(
             "chat_response.html",
             {
                 "request": request,
-                "results": results,
                 "text": user_query,
                 "sql": f"{sql};",
+                "notice": cost_guard_notice(sql),
+                **page,
             },
         )
 
     except HTTPException as http_ex:
-        # Handle exceptions raised during SQL generation or execution
-        return templates.TemplateResponse(
+        # Handle exceptions raised during SQL generation or execution. Overload and deadline
+        # failures keep their status and Retry-After, so clients and proxies can back off
+        terminal = http_ex.status_code in TERMINAL_STATUS_CODES
+        return render_template(
             "chat_response.html",
             {
                 "request": request,
-                "results": [],
+                "rows": [],
                 "text": text,
                 "sql": "",
                 "error_message": http_ex.detail,
             },
+            status_code=http_ex.status_code if terminal else 200,
+            headers=http_ex.headers if terminal else None,
         )
     except Exception as e:
         # Handle unexpected exceptions
         error_message = "An unexpected error occurred while processing your request. Please try again later."
         logger.exception(f"Unexpected error: {e}")
-        return templates.TemplateResponse(
+        return render_template(
             "chat_response.html",
             {
                 "request": request,
-                "results": [],
+                "rows": [],
                 "text": text,
                 "sql": "",
                 "error_message": error_message,
@@ -1,5 +1,46 @@
 import os
 import sys
 
+import pytest
+
 # Add project root to Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from src.benchmarks.eval_harness import load_sqlite
+from src.config import config
+from src.core import llm as llm_module
+from src.core.fake_llm import FakeGenerativeModel
+from src.core.llm import GenerativeModelWrapper
+from src.utils.database_utils import DatabaseConnector
+
+
+@pytest.fixture(scope="session")
+def sqlite_engine(tmp_path_factory):
+    """SQLite database holding the CSV datasets, shared by the whole test session."""
+    return load_sqlite("data", str(tmp_path_factory.mktemp("data") / "flights.sqlite"))
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    """Registers an offline model as the app's LLM; map questions with `add_response`."""
+    fake = FakeGenerativeModel()
+    monkeypatch.setitem(
+        llm_module._llm_clients,
+        config.LLM_MODEL_NAME,
+        GenerativeModelWrapper(model_name=config.LLM_MODEL_NAME, model=fake),
+    )
+    return fake
+
+
+@pytest.fixture
+def server(monkeypatch, sqlite_engine, fake_llm):
+    """The app module wired to the SQLite datasets and the fake LLM, with empty caches."""
+    # Importing the app connects nowhere; the connector is normally created in its lifespan
+    from src.server import app
+
+    connector = DatabaseConnector(engine=sqlite_engine, result_cache_bytes=0, executor_workers=2)
+    monkeypatch.setattr(app, "db_connector", connector)
+    monkeypatch.setattr(app.sql_cache, "disk", None)
+    app.sql_cache.memory.clear()
+    yield app
+    connector.close()
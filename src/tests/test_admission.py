@@ -0,0 +1,137 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from src.core import admission as admission_module
+from src.core.admission import (
+    PRIORITY_BATCH,
+    PRIORITY_INTERACTIVE,
+    AdmissionController,
+    request_priority,
+)
+from src.core.deadline import request_deadline
+
+
+async def _hold(controller, admitted, name, release, priority=None):
+    async with controller.admit(priority):
+        admitted.append(name)
+        await release.wait()
+
+
+@pytest.mark.asyncio
+async def test_interactive_calls_are_admitted_before_batch_calls():
+    controller = AdmissionController(max_concurrency=1, max_queue=10)
+    admitted, release = [], asyncio.Event()
+    first = asyncio.ensure_future(_hold(controller, admitted, "first", release))
+    await asyncio.sleep(0)
+    with request_priority(PRIORITY_BATCH):
+        batch = asyncio.ensure_future(_hold(controller, admitted, "batch", release))
+    await asyncio.sleep(0)
+    interactive = asyncio.ensure_future(
+        _hold(controller, admitted, "interactive", release, PRIORITY_INTERACTIVE)
+    )
+    await asyncio.sleep(0)
+
+    assert controller.stats() == {"active": 1, "queued": 2}
+    release.set()
+    await asyncio.gather(first, batch, interactive)
+
+    assert admitted == ["first", "interactive", "batch"]
+    assert controller.stats() == {"active": 0, "queued": 0}
+
+
+@pytest.mark.asyncio
+async def test_full_queue_is_refused_with_retry_after():
+    controller = AdmissionController(max_concurrency=1, max_queue=0)
+    release = asyncio.Event()
+    holder = asyncio.ensure_future(_hold(controller, [], "holder", release))
+    await asyncio.sleep(0)
+
+    with pytest.raises(HTTPException) as excinfo:
+        async with controller.admit():
+            pass
+
+    assert excinfo.value.status_code == 503
+    assert int(excinfo.value.headers["Retry-After"]) >= 1
+    release.set()
+    await holder
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_refuses_calls_that_cannot_get_a_token_in_time():
+    controller = AdmissionController(max_concurrency=10, max_queue=10, rate=1, burst=1, max_wait=0.1)
+    async with controller.admit():
+        pass
+
+    with pytest.raises(HTTPException) as excinfo:
+        async with controller.admit():
+            pass
+
+    assert excinfo.value.status_code == 429
+    assert excinfo.value.headers["Retry-After"] == "1"
+
+
+@pytest.mark.asyncio
+async def test_queued_calls_time_out_or_hit_the_deadline():
+    controller = AdmissionController(max_concurrency=1, max_queue=10, max_wait=0.05)
+    release = asyncio.Event()
+    holder = asyncio.ensure_future(_hold(controller, [], "holder", release))
+    await asyncio.sleep(0)
+
+    with pytest.raises(HTTPException) as timed_out:
+        async with controller.admit():
+            pass
+    with request_deadline(0.01), pytest.raises(HTTPException) as deadline:
+        async with controller.admit():
+            pass
+
+    assert timed_out.value.status_code == 503
+    assert deadline.value.status_code == 504
+    assert controller.stats()["queued"] == 0
+    release.set()
+    await holder
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiters_leave_the_queue():
+    controller = AdmissionController(max_concurrency=1, max_queue=10)
+    release = asyncio.Event()
+    holder = asyncio.ensure_future(_hold(controller, [], "holder", release))
+    await asyncio.sleep(0)
+    waiter = asyncio.ensure_future(_hold(controller, [], "waiter", release))
+    await asyncio.sleep(0)
+
+    waiter.cancel()
+    await asyncio.gather(waiter, return_exceptions=True)
+
+    assert controller.stats() == {"active": 1, "queued": 0}
+    release.set()
+    await holder
+    assert controller.stats() == {"active": 0, "queued": 0}
+
+
+def test_overloaded_llm_fails_fast_without_retries(server, fake_llm, monkeypatch):
+    monkeypatch.setattr(admission_module, "_llm_admission", AdmissionController(0, 0))
+    fake_llm.add_response("How many airlines are there?", "SELECT COUNT(*) FROM airlines")
+
+    response = TestClient(server.app).post(
+        "/chat/stream", data={"text": "How many airlines are there?"}
+    )
+
+    assert response.status_code == 503
+    assert "Retry-After" in response.headers
+    assert fake_llm.calls == 0
+
+
+def test_overloaded_llm_keeps_status_and_retry_after_on_chat(server, fake_llm, monkeypatch):
+    monkeypatch.setattr(admission_module, "_llm_admission", AdmissionController(0, 0))
+    fake_llm.add_response("How many airlines are there?", "SELECT COUNT(*) FROM airlines")
+
+    response = TestClient(server.app).post("/chat", data={"text": "How many airlines are there?"})
+
+    assert response.status_code == 503
+    assert "Retry-After" in response.headers
+    assert "retry" in response.text
+    assert fake_llm.calls == 0
@@ -0,0 +1,68 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from src.config import config
+from src.core.singleflight import SingleFlight
+
+
+def test_batch_streams_one_line_per_question(server, fake_llm):
+    fake_llm.add_response("How many airlines are there?", "SELECT COUNT(*) AS total FROM airlines")
+    fake_llm.add_response("List airline codes", "SELECT iata_code FROM airlines ORDER BY iata_code")
+    fake_llm.add_response("Broken question", "SELECT nothing FROM nowhere")
+    client = TestClient(server.app)
+
+    response = client.post(
+        "/batch",
+        json={"questions": ["How many airlines are there?", "List airline codes", "Broken question"]},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = {line["index"]: line for line in map(json.loads, response.text.splitlines())}
+    assert lines[0]["rows"] == [{"total": 14}]
+    assert lines[0]["error"] is None
+    assert "llm" in lines[0]["timings_ms"] and "execute" in lines[0]["timings_ms"]
+    assert len(lines[1]["rows"]) == 14
+    assert lines[2]["sql"] is None
+    assert lines[2]["error"] == "SQL query execution failed after 3 attempts."
+
+
+def test_batch_rejects_empty_requests(server):
+    response = TestClient(server.app).post("/batch", json={"questions": []})
+
+    assert response.status_code == 400
+
+
+def test_batch_questions_are_not_shared_with_interactive_requests(server, fake_llm, monkeypatch):
+    keys = []
+
+    class RecordingSingleFlight(SingleFlight):
+        async def do(self, key, fn):
+            keys.append(key)
+            return await super().do(key, fn)
+
+    monkeypatch.setattr(server, "inflight_questions", RecordingSingleFlight())
+    fake_llm.add_response("How many airlines are there?", "SELECT COUNT(*) AS total FROM airlines")
+    client = TestClient(server.app)
+
+    client.post("/batch", json={"questions": ["How many airlines are there?"]})
+    client.post("/chat", data={"text": "How many airlines are there?"})
+
+    assert len(keys) == 2
+    assert keys[0] != keys[1]
+
+
+def test_queued_batch_questions_get_their_full_deadline(server, fake_llm, monkeypatch):
+    monkeypatch.setattr(config, "REQUEST_DEADLINE_SECONDS", 0.5)
+    monkeypatch.setattr(config, "BATCH_LLM_CONCURRENCY", 1)
+    fake_llm.latency = 0.1
+    questions = [f"How many airlines have code number {index}?" for index in range(8)]
+    for question in questions:
+        fake_llm.add_response(question, "SELECT COUNT(*) AS total FROM airlines")
+
+    response = TestClient(server.app).post("/batch", json={"questions": questions})
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == 8
+    assert [line["error"] for line in lines] == [None] * 8
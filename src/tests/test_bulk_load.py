@@ -0,0 +1,28 @@
+import csv
+import io
+
+from src.db.bulk_load import iter_copy_chunks
+from src.db.create_table import Flight
+
+
+def test_iter_copy_chunks_coerces_model_types(tmp_path):
+    path = tmp_path / "flights.csv"
+    path.write_text(
+        "YEAR,MONTH,DAY,AIRLINE,DEPARTURE_TIME,DEPARTURE_DELAY,DIVERTED,CANCELLATION_REASON\n"
+        "2015,4,7,EV,1335.0,-5.0,0,\n"
+        "2015,1,24,AS,,-12.0,1,B\n"
+        "2015,2,1,AA,905.0,3.0,0,\n"
+    )
+
+    chunks = list(iter_copy_chunks(str(path), Flight.__table__, chunk_rows=2))
+
+    assert [rows for _, rows, _ in chunks] == [2, 1]
+    columns = chunks[0][0]
+    assert columns == [
+        "year", "month", "day", "airline", "departure_time",
+        "departure_delay", "diverted", "cancellation_reason",
+    ]
+    rows = [row for _, _, chunk in chunks for row in csv.reader(io.StringIO(chunk))]
+    assert rows[0] == ["2015", "4", "7", "EV", "1335", "-5.0", "f", ""]
+    assert rows[1] == ["2015", "1", "24", "AS", "", "-12.0", "t", "B"]
+    assert rows[2][4] == "905"
@@ -0,0 +1,51 @@
+import time
+
+from src.utils.cache_utils import SQLCache, TTLCache, normalize_question
+
+
+def test_normalize_question():
+    assert normalize_question("  How many   FLIGHTS? ") == "how many flights"
+    assert normalize_question("How many flights") == normalize_question(
+        "how many flights?"
+    )
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_ttl_cache_expires_entries():
+    cache = TTLCache(maxsize=2, ttl=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+
+    assert cache.get("a") is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_sql_cache_key_depends_on_model_and_prompt():
+    key = SQLCache.make_key("How many flights?", "gemini-2.0-flash", "abc")
+
+    assert key == SQLCache.make_key("how many flights", "gemini-2.0-flash", "abc")
+    assert key != SQLCache.make_key("how many flights", "gemini-1.5-pro", "abc")
+    assert key != SQLCache.make_key("how many flights", "gemini-2.0-flash", "def")
+
+
+def test_sql_cache_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "sql_cache.db")
+    cache = SQLCache(maxsize=8, ttl=60, path=path)
+    cache.set("key", "SELECT 1")
+    cache.disk.close()
+
+    restarted = SQLCache(maxsize=8, ttl=60, path=path)
+
+    assert restarted.get("key") == "SELECT 1"
+    assert restarted.memory.get("key") == "SELECT 1"
@@ -0,0 +1,191 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from src.db.embedded import create_embedded_engine
+from src.utils.cost_guard import (
+    CostGuard,
+    QueryCost,
+    cost_guard_notice,
+    outer_limit,
+    parse_postgres_plan,
+    sample_sql,
+)
+from src.utils.database_utils import DatabaseConnector
+
+CROSS_JOIN = "SELECT * FROM flights f CROSS JOIN airports a"
+
+
+def test_parse_postgres_plan_reads_root_estimates_and_scans():
+    plan = [
+        {
+            "Plan": {
+                "Node Type": "Nested Loop",
+                "Total Cost": 20300.03,
+                "Plan Rows": 1610000,
+                "Plans": [
+                    {"Node Type": "Seq Scan", "Relation Name": "flights", "Plan Rows": 5000},
+                    {
+                        "Node Type": "Materialize",
+                        "Plan Rows": 322,
+                        "Plans": [
+                            {"Node Type": "Seq Scan", "Relation Name": "airports", "Plan Rows": 322}
+                        ],
+                    },
+                ],
+            }
+        }
+    ]
+
+    cost = parse_postgres_plan(plan)
+
+    assert (cost.rows, cost.cost) == (1610000, 20300.03)
+    assert cost.scans == {"flights": 5000, "airports": 322}
+
+
+def test_duckdb_estimates_multiply_cross_joins():
+    engine, _ = create_embedded_engine()
+    connector = DatabaseConnector(engine=engine, result_cache_bytes=0)
+    try:
+        cost = connector.estimate_cost(CROSS_JOIN)
+        limited = connector.estimate_cost("SELECT * FROM flights LIMIT 10")
+    finally:
+        connector.close()
+
+    assert cost.rows == 5000 * 322
+    assert cost.scans == {"flights": 5000, "airports": 322}
+    assert limited.rows == 10
+
+
+def test_sqlite_reports_no_estimates(sqlite_engine):
+    assert DatabaseConnector(engine=sqlite_engine, result_cache_bytes=0).estimate_cost(CROSS_JOIN) is None
+
+
+def test_outer_limit_ignores_subqueries():
+    assert outer_limit("SELECT * FROM (SELECT * FROM flights LIMIT 5) AS t LIMIT 20") == 20
+    assert outer_limit("SELECT * FROM (SELECT * FROM flights LIMIT 5) AS t") is None
+
+
+@pytest.mark.parametrize(
+    "sql,expected",
+    [
+        (
+            "SELECT * FROM flights f, airports a;",
+            "SELECT * FROM flights f TABLESAMPLE SYSTEM (5), airports a",
+        ),
+        (
+            "SELECT * FROM airports JOIN flights AS f ON f.origin_airport = airports.iata_code",
+            "SELECT * FROM airports JOIN flights AS f TABLESAMPLE SYSTEM (5) "
+            "ON f.origin_airport = airports.iata_code",
+        ),
+        (
+            "SELECT COUNT(*) FROM public.flights WHERE flights.year = 2015",
+            "SELECT COUNT(*) FROM public.flights TABLESAMPLE SYSTEM (5) WHERE flights.year = 2015",
+        ),
+        ("SELECT flights FROM airports", None),
+    ],
+)
+def test_sample_sql_samples_the_table_reference(sql, expected):
+    assert sample_sql(sql, "flights", 5, "postgresql") == expected
+
+
+def test_sample_sql_needs_a_sampling_dialect():
+    assert sample_sql(CROSS_JOIN, "flights", 5, "sqlite") is None
+
+
+def test_guard_allows_queries_within_limits():
+    decision = CostGuard(max_rows=1000, max_cost=100).check(CROSS_JOIN, QueryCost(10, 5), "postgresql")
+
+    assert (decision.action, decision.sql) == ("allow", CROSS_JOIN)
+
+
+def test_guard_limits_large_results_and_explains_why():
+    cost = QueryCost(rows=1_610_000, cost=20_000, scans={"flights": 5000})
+
+    decision = CostGuard(max_rows=1000, max_cost=10**6).check(CROSS_JOIN, cost, "postgresql")
+
+    assert decision.action == "limit"
+    assert decision.sql.endswith(f"(\n{CROSS_JOIN}\n) AS guarded LIMIT 1000")
+    assert cost_guard_notice(decision.sql) == decision.reason
+    assert "1,610,000 rows" in decision.reason
+
+
+def test_guard_samples_the_largest_scanned_table():
+    cost = QueryCost(rows=1_610_000, cost=20_000, scans={"flights": 5000, "airports": 322})
+
+    decision = CostGuard(max_rows=16_100, action="sample").check(CROSS_JOIN, cost, "postgresql")
+
+    assert decision.action == "sample"
+    assert "flights f TABLESAMPLE SYSTEM (1) CROSS JOIN airports a" in decision.sql
+    assert "1% sample of flights" in cost_guard_notice(decision.sql)
+    assert "not scaled up" in cost_guard_notice(decision.sql)
+
+
+def test_guard_rejects_expensive_queries_a_limit_cannot_fix():
+    cost = QueryCost(rows=1, cost=500_000, scans={"flights": 5000})
+
+    decision = CostGuard(max_rows=1000, max_cost=1000).check(CROSS_JOIN, cost, "postgresql")
+
+    assert decision.action == "reject"
+    assert decision.sql == CROSS_JOIN
+    assert "cost of 500,000" in decision.reason
+
+
+def test_guard_rejects_instead_of_rewriting_when_configured():
+    cost = QueryCost(rows=1_610_000, scans={"flights": 5000})
+
+    assert CostGuard(max_rows=1000, action="reject").check(CROSS_JOIN, cost, "duckdb").action == "reject"
+
+
+def _estimates(rows_by_sql):
+    def estimate_cost(sql):
+        return QueryCost(rows=rows_by_sql.get(sql, 1), cost=1.0, scans={"flights": 5000})
+
+    return estimate_cost
+
+
+def test_rejection_reason_reaches_the_correction_prompt(server, fake_llm, monkeypatch):
+    prompts = []
+    lookup = fake_llm.lookup
+    monkeypatch.setattr(fake_llm, "lookup", lambda prompt: prompts.append(prompt) or lookup(prompt))
+    fake_llm.add_response("too expensive to run", "SELECT COUNT(*) AS total FROM flights")
+    fake_llm.add_response("Pair every flight with every airport", CROSS_JOIN)
+    monkeypatch.setattr(server, "cost_guard", CostGuard(max_rows=1000, action="reject"))
+    monkeypatch.setattr(server.db_connector, "estimate_cost", _estimates({CROSS_JOIN: 1_610_000}))
+
+    response = TestClient(server.app).post("/chat", data={"text": "Pair every flight with every airport"})
+
+    assert response.status_code == 200
+    assert len(prompts) == 2
+    assert "1,610,000 rows" in prompts[1]
+    assert "SELECT COUNT(*) AS total FROM flights" in response.text
+
+
+def test_limited_query_is_reported_to_the_user(server, fake_llm, monkeypatch):
+    fake_llm.add_response("Pair every flight with every airport", CROSS_JOIN)
+    monkeypatch.setattr(server, "cost_guard", CostGuard(max_rows=1000))
+    monkeypatch.setattr(server.db_connector, "estimate_cost", _estimates({CROSS_JOIN: 1_610_000}))
+
+    response = TestClient(server.app).post(
+        "/batch", json={"questions": ["Pair every flight with every airport"]}
+    )
+
+    line = response.json()
+    assert len(line["rows"]) == 1000
+    assert line["notice"] == cost_guard_notice(line["sql"])
+    assert "only the first 1,000 rows" in line["notice"]
+
+
+def test_streamed_export_has_its_own_row_limit(server, fake_llm, monkeypatch):
+    question = "Pair every flight with every airport"
+    fake_llm.add_response(question, CROSS_JOIN)
+    monkeypatch.setattr(server, "cost_guard", CostGuard(max_rows=2))
+    monkeypatch.setattr(server.db_connector, "estimate_cost", _estimates({CROSS_JOIN: 1_610_000}))
+    client = TestClient(server.app)
+    limited = client.post("/batch", json={"questions": [question]}).json()
+
+    response = client.post("/chat/stream", data={"text": question, "format": "csv"})
+
+    total = server.db_connector.execute_query(f"SELECT COUNT(*) AS n FROM ({CROSS_JOIN}) AS pairs")
+    assert len(limited["rows"]) == 2
+    assert "X-Query-Notice" not in response.headers
+    assert len(response.text.splitlines()) == total[0]["n"] + 1 > 3
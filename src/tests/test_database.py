@@ -1,7 +1,16 @@
+import asyncio
+import json
+import threading
+from decimal import Decimal
+
 import pytest
-from sqlalchemy import create_engine
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 
+from src.utils.database_utils import DatabaseConnector
+from src.utils.materializers import records_from_rows
+
 
 @pytest.fixture
 def test_db():
@@ -23,3 +32,106 @@ def test_create_db_connection(test_db):
     
     # Clean up
     test_session.close()
+
+
+@pytest.mark.asyncio
+async def test_execute_query_async_runs_off_event_loop(test_db, mocker):
+    engine, _ = test_db
+    connector = DatabaseConnector(engine=engine, result_cache_bytes=0, executor_workers=2)
+    threads = []
+
+    def fake_execute(query):
+        threads.append(threading.current_thread().name)
+        return [{"value": 1}]
+
+    mocker.patch.object(connector, "execute_query", side_effect=fake_execute)
+
+    results = await asyncio.gather(
+        connector.execute_query_async("SELECT 1"),
+        connector.execute_query_async("SELECT 1"),
+    )
+
+    assert results == [[{"value": 1}], [{"value": 1}]]
+    assert all(name.startswith("db-query") for name in threads)
+    connector.close()
+
+
+def test_stream_query_matches_execute_query(test_db):
+    engine, _ = test_db
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE flights (id INTEGER, delay REAL, tail TEXT)"))
+        conn.execute(
+            text(
+                "INSERT INTO flights VALUES "
+                "(1, 1.234, 'N1'), (2, NULL, 'N2'), (3, 5.678, NULL), (4, 2.0, 'N4'), (5, 3.333, 'N5')"
+            )
+        )
+    connector = DatabaseConnector(engine=engine, result_cache_bytes=0)
+
+    batches = list(connector.stream_query_batches("SELECT * FROM flights", fetch_size=2))
+    rows = list(connector.stream_query("SELECT * FROM flights", fetch_size=2))
+
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert rows == connector.execute_query("SELECT * FROM flights")
+    assert rows[0]["delay"] == 1.23
+    assert rows[1]["delay"] == ""
+    assert rows[2]["tail"] == ""
+    connector.close()
+
+
+@pytest.mark.parametrize(
+    "format, last_line",
+    [
+        ("csv", "# error: connection lost"),
+        ("ndjson", json.dumps({"error": "connection lost"})),
+    ],
+)
+def test_stream_ends_with_an_error_line_when_a_batch_fails(
+    server, fake_llm, monkeypatch, format, last_line
+):
+    fake_llm.add_response("List airline codes", "SELECT iata_code FROM airlines")
+
+    def failing_batches(sql, fetch_size=None):
+        yield [{"iata_code": "AA"}, {"iata_code": "AS"}]
+        # An unexpected error, not an HTTPException from the connector
+        raise RuntimeError("connection lost")
+
+    monkeypatch.setattr(server.db_connector, "stream_query_batches", failing_batches)
+
+    response = TestClient(server.app).post(
+        "/chat/stream", data={"text": "List airline codes", "format": format}
+    )
+
+    lines = response.text.splitlines()
+    assert response.status_code == 200
+    assert len(lines) == (4 if format == "csv" else 3)
+    assert lines[-1] == last_line
+
+
+@pytest.mark.parametrize("materializer", ["records", "pandas"])
+def test_materializers_round_floats_and_blank_nulls(test_db, materializer):
+    engine, _ = test_db
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE airports (iata_code TEXT, latitude REAL)"))
+        conn.execute(text("INSERT INTO airports VALUES ('ABE', 40.65236), (NULL, NULL)"))
+    connector = DatabaseConnector(
+        engine=engine, result_cache_bytes=0, materializer=materializer
+    )
+
+    results = connector.execute_query("SELECT * FROM airports")
+
+    assert results == [
+        {"iata_code": "ABE", "latitude": 40.65},
+        {"iata_code": "", "latitude": ""},
+    ]
+    connector.close()
+
+
+def test_records_materializer_uses_cursor_type_codes():
+    description = [("distance", 23), ("air_time", 701), ("ratio", 1700)]
+    rows = [(128, 30.456, Decimal("0.125")), (None, None, None)]
+
+    assert records_from_rows(["distance", "air_time", "ratio"], description, rows) == [
+        {"distance": 128, "air_time": 30.46, "ratio": 0.12},
+        {"distance": "", "air_time": "", "ratio": ""},
+    ]
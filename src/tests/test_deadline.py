@@ -0,0 +1,61 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from src.core.deadline import bounded_timeout, check_deadline, remaining, request_deadline
+from src.utils.database_utils import DatabaseConnector
+
+# Recursive CTE that keeps SQLite busy for several seconds
+SLOW_QUERY = (
+    "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 100000000) "
+    "SELECT COUNT(*) AS total FROM n"
+)
+
+
+def test_nested_deadline_keeps_the_earlier_one():
+    assert remaining() is None
+    with request_deadline(10):
+        with request_deadline(60):
+            assert remaining() <= 10
+        assert bounded_timeout(600) <= 10
+    assert remaining() is None
+
+
+def test_check_deadline_raises_once_passed():
+    with request_deadline(0.001):
+        time.sleep(0.01)
+        with pytest.raises(HTTPException) as exc_info:
+            check_deadline()
+    assert exc_info.value.status_code == 504
+
+
+@pytest.mark.asyncio
+async def test_deadline_is_shared_across_attempts(server, fake_llm):
+    fake_llm.latency = 0.2
+
+    with request_deadline(0.1):
+        with pytest.raises(HTTPException) as exc_info:
+            await server.generate_and_execute_with_retries("How many airlines are there?")
+
+    assert exc_info.value.status_code == 504
+    assert fake_llm.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelling_the_caller_interrupts_the_query(sqlite_engine):
+    connector = DatabaseConnector(engine=sqlite_engine, result_cache_bytes=0, executor_workers=1)
+    try:
+        task = asyncio.ensure_future(connector.execute_query_async(SLOW_QUERY))
+        await asyncio.sleep(0.2)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        # The single worker is free again only if the slow query was interrupted
+        start = time.perf_counter()
+        assert await connector.execute_query_async("SELECT 1 AS one") == [{"one": 1}]
+        assert time.perf_counter() - start < 1
+    finally:
+        connector.close()
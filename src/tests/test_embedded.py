@@ -0,0 +1,51 @@
+import pytest
+
+from src.benchmarks.eval_harness import load_cases, result_signature
+from src.db.create_table import get_data_versions
+from src.db.embedded import create_embedded_engine
+from src.utils.database_utils import DatabaseConnector
+
+cases = load_cases("data/eval.csv")
+
+
+@pytest.fixture(scope="module")
+def duckdb_connector():
+    engine, _ = create_embedded_engine(pool_size=2)
+    connector = DatabaseConnector(engine=engine, result_cache_bytes=0)
+    yield connector
+    connector.close()
+
+
+def _signature(rows, case):
+    if "LIMIT" in case["sql"].upper():
+        # Engines may break ties under LIMIT differently; compare the ranked values only
+        rows = [{k: v for k, v in row.items() if not isinstance(v, str)} for row in rows]
+    return result_signature(rows)
+
+
+@pytest.mark.parametrize("case", cases, ids=range(len(cases)))
+def test_eval_queries_match_sqlite(duckdb_connector, sqlite_engine, case):
+    expected = DatabaseConnector(engine=sqlite_engine, result_cache_bytes=0).execute_query(case["sql"])
+
+    assert _signature(duckdb_connector.execute_query(case["sql"]), case) == _signature(expected, case)
+
+
+def test_columns_are_typed_like_the_models(duckdb_connector):
+    row = duckdb_connector.execute_query("SELECT * FROM flights WHERE id = 1")[0]
+
+    assert isinstance(row["year"], int)
+    assert isinstance(row["departure_delay"], float)
+    assert row["cancelled"] is False
+    assert row["cancellation_reason"] == ""
+
+
+def test_database_file_is_loaded_once(tmp_path):
+    path = str(tmp_path / "nl2sql.duckdb")
+    engine, _ = create_embedded_engine(path)
+    engine.dispose()
+
+    engine, _ = create_embedded_engine(path)
+    try:
+        assert get_data_versions(engine) == {"airlines": 1, "airports": 1, "flights": 1}
+    finally:
+        engine.dispose()
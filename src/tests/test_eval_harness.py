@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+from src.benchmarks.eval_harness import gold_cassette, load_cases, run_eval
+from src.core.fake_llm import CassetteModel
+from src.core.llm import get_llm
+
+
+@pytest.fixture
+def cases():
+    return load_cases("data/eval.csv")[:3]
+
+
+@pytest.mark.asyncio
+async def test_gold_cassette_matches_every_case(sqlite_engine, cases):
+    report = await run_eval(cases, CassetteModel(gold_cassette(cases)), sqlite_engine, concurrency=2)
+
+    assert report["accuracy"] == 1.0
+    assert report["retries"]["total"] == 0
+    assert report["latency"]["llm"]["count"] == 3
+    assert report["latency"]["total"]["p99_ms"] is not None
+
+
+@pytest.mark.asyncio
+async def test_cassette_replays_correction_attempts(sqlite_engine, cases):
+    cassette = gold_cassette(cases)
+    question = cases[0]["question"]
+    cassette[question].insert(0, json.dumps({"sql": "SELECT missing_column FROM flights"}))
+
+    report = await run_eval(cases, CassetteModel(cassette), sqlite_engine, concurrency=2)
+
+    assert report["accuracy"] == 1.0
+    assert report["retries"] == {"total": 1, "cases_with_retries": 1, "max": 1}
+    outcome = next(outcome for outcome in report["results"] if outcome["question"] == question)
+    assert outcome["llm_calls"] == 2
+
+
+@pytest.mark.asyncio
+async def test_run_eval_restores_the_app_model_and_sql_cache(
+    sqlite_engine, cases, fake_llm, monkeypatch
+):
+    from src.server import app
+
+    llm = get_llm()
+    disk_cache = object()
+    monkeypatch.setattr(app.sql_cache, "disk", disk_cache)
+
+    await run_eval(cases, CassetteModel(gold_cassette(cases)), sqlite_engine, concurrency=2)
+
+    assert get_llm() is llm
+    assert app.sql_cache.disk is disk_cache
@@ -0,0 +1,62 @@
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+
+from src.config import config
+from src.db.index_advisor import candidate_indexes, find_seq_scans
+from src.utils import common_utils
+
+FLIGHT_COLUMNS = {"year", "month", "airline", "origin_airport", "tail_number"}
+
+
+def test_find_seq_scans_walks_nested_plans():
+    plan = {
+        "Node Type": "Nested Loop",
+        "Plans": [
+            {"Node Type": "Seq Scan", "Relation Name": "flights"},
+            {"Node Type": "Index Scan", "Relation Name": "airlines"},
+        ],
+    }
+
+    assert [node["Relation Name"] for node in find_seq_scans(plan)] == ["flights"]
+
+
+def test_candidate_indexes_from_filter():
+    filter_expression = (
+        "((year = 2015) AND (lower((origin_airport)::text) = 'lax'::text) "
+        "AND ((tail_number)::text ~~ 'N4%'::text))"
+    )
+
+    assert candidate_indexes(filter_expression, FLIGHT_COLUMNS) == [
+        "lower(origin_airport)",
+        "year",
+        "tail_number",
+    ]
+
+
+def test_candidate_indexes_ignore_non_columns():
+    assert candidate_indexes("(lower((city)::text) = 'lax'::text)", FLIGHT_COLUMNS) == []
+
+
+def test_successful_sql_is_logged_off_the_event_loop(server, fake_llm, monkeypatch, tmp_path):
+    log_path = tmp_path / "sql.jsonl"
+    monkeypatch.setattr(config, "SQL_LOG_PATH", str(log_path))
+    on_event_loop = []
+
+    def log_generated_sql(*args):
+        try:
+            asyncio.get_running_loop()
+            on_event_loop.append(True)
+        except RuntimeError:
+            on_event_loop.append(False)
+        common_utils.log_generated_sql(*args)
+
+    monkeypatch.setattr(server, "log_generated_sql", log_generated_sql)
+    fake_llm.add_response("How many airlines are there?", "SELECT COUNT(*) AS total FROM airlines")
+
+    TestClient(server.app).post("/chat", data={"text": "How many airlines are there?"})
+
+    entry = json.loads(log_path.read_text())
+    assert entry["sql"] == "SELECT COUNT(*) AS total FROM airlines"
+    assert on_event_loop == [False]
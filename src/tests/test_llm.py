@@ -0,0 +1,88 @@
+import asyncio
+import json
+
+import pytest
+
+from src.core.fake_llm import FakeGenerativeModel
+from src.core.llm import GenerativeModelWrapper, get_llm, set_llm
+from src.core.singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_fake_backend_returns_mapped_sql():
+    fake = FakeGenerativeModel(responses={"How many airlines?": "SELECT COUNT(*) FROM airlines"})
+    llm = GenerativeModelWrapper(model_name="fake-model", model=fake)
+
+    response = await llm.generate_sql("how many airlines")
+
+    assert json.loads(response) == {"sql": "SELECT COUNT(*) FROM airlines"}
+    assert fake.calls == 1
+
+
+def test_get_llm_returns_shared_client():
+    llm = GenerativeModelWrapper(model_name="shared-model", model=FakeGenerativeModel())
+    set_llm(llm)
+
+    assert get_llm("shared-model") is llm
+    assert get_llm("shared-model") is get_llm("shared-model")
+
+
+@pytest.mark.asyncio
+async def test_single_flight_coalesces_identical_keys():
+    inflight = SingleFlight()
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    results = await asyncio.gather(*(inflight.do("same", work) for _ in range(5)))
+
+    assert results == [1] * 5
+    assert calls == 1
+    assert inflight.coalesced == 4
+    assert len(inflight) == 0
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_exceptions():
+    inflight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(
+        inflight.do("same", work), inflight.do("same", work), return_exceptions=True
+    )
+
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_single_flight_cancels_work_only_when_every_caller_is_gone():
+    inflight = SingleFlight()
+    started = asyncio.Event()
+    cancelled = asyncio.Event()
+
+    async def work():
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    first = asyncio.ensure_future(inflight.do("same", work))
+    second = asyncio.ensure_future(inflight.do("same", work))
+    await started.wait()
+
+    first.cancel()
+    await asyncio.sleep(0.01)
+    assert not cancelled.is_set()
+
+    second.cancel()
+    await asyncio.wait_for(cancelled.wait(), 1)
+    assert len(inflight) == 0
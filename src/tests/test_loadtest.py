@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from src.benchmarks.eval_harness import load_cases
+from src.benchmarks.loadtest import build_requests, compare, parse_mix, run_load
+from src.core.fake_llm import FakeGenerativeModel
+from src.utils.database_utils import DatabaseConnector
+
+
+@pytest.fixture
+def cases():
+    return load_cases("data/eval.csv")[:5]
+
+
+def test_requests_follow_the_mix_and_seed(cases):
+    mix = parse_mix("unique=1,invalid=1")
+
+    requests = build_requests(cases, mix, 50, seed=3)
+
+    assert requests == build_requests(cases, mix, 50, seed=3)
+    assert {kind for kind, _ in requests} == {"unique", "invalid"}
+    assert len({question for _, question in requests}) == 50
+
+
+def test_parse_mix_rejects_unknown_kinds():
+    with pytest.raises(ValueError):
+        parse_mix("unique=1,bogus=2")
+
+
+def test_fake_llm_failures_are_reproducible():
+    async def failures(seed):
+        model = FakeGenerativeModel(failure_rate=0.3, seed=seed)
+        outcomes = []
+        for _ in range(20):
+            try:
+                await model.generate_content_async("question")
+                outcomes.append(True)
+            except RuntimeError:
+                outcomes.append(False)
+        return outcomes
+
+    first = asyncio.run(failures(7))
+
+    assert first == asyncio.run(failures(7))
+    assert 0 < first.count(False) < 20
+
+
+@pytest.mark.asyncio
+async def test_load_run_reports_throughput_latency_and_loop_lag(server, sqlite_engine, cases):
+    settings = {
+        "requests": 20,
+        "concurrency": 4,
+        "warmup": 2,
+        "mix": "unique=3,repeat=1,invalid=1",
+        "llm_latency": 0.0,
+        "llm_jitter": 0.0,
+        "llm_failure_rate": 0.0,
+        "seed": 0,
+        "database": "sqlite",
+        "lag_interval": 0.005,
+    }
+    connector = DatabaseConnector(engine=sqlite_engine, executor_workers=2)
+    invalid = sum(
+        kind == "invalid"
+        for kind, _ in build_requests(cases, parse_mix(settings["mix"]), 22)[2:]
+    )
+
+    report = await run_load(settings, cases, connector)
+
+    assert report["requests"] == 20
+    assert report["outcomes"].get("error", 0) == invalid
+    assert report["outcomes"]["ok"] == 20 - invalid
+    assert report["requests_per_second"] > 0
+    assert report["latency"]["count"] == 20
+    assert "llm" in report["stages"]
+    assert report["event_loop_lag"]["count"] > 0
+    assert server.db_connector is not connector
+
+    comparison = compare(report, report)
+    assert comparison["same_settings"]
+    assert comparison["metrics"]["requests_per_second"]["change_percent"] == 0.0
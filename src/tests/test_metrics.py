@@ -0,0 +1,43 @@
+from fastapi.testclient import TestClient
+
+from src.utils.metrics import MetricsRegistry, server_timing_header
+
+
+def test_registry_renders_prometheus_text():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests.", ["route"])
+    latency = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+    requests.inc(route="/chat")
+    requests.inc(2, route="/chat")
+    latency.observe(0.5)
+
+    text = registry.render()
+
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{route="/chat"} 3' in text
+    assert 'latency_seconds_bucket{le="0.1"} 0' in text
+    assert 'latency_seconds_bucket{le="1.0"} 1' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 1' in text
+    assert "latency_seconds_count 1" in text
+
+
+def test_server_timing_header_format():
+    assert server_timing_header({"llm": 0.25, "execute": 0.0031}) == "llm;dur=250.0, execute;dur=3.1"
+
+
+def test_chat_reports_stage_timings_and_metrics(server, fake_llm):
+    fake_llm.add_response("How many airlines are there?", "SELECT COUNT(*) AS total FROM airlines")
+    client = TestClient(server.app)
+
+    response = client.post("/chat", data={"text": "How many airlines are there?"})
+
+    assert response.status_code == 200
+    stages = [entry.split(";")[0] for entry in response.headers["Server-Timing"].split(", ")]
+    for stage in ["llm", "clean", "parse", "validate", "execute", "postprocess", "render", "total"]:
+        assert stage in stages
+
+    metrics = client.get("/metrics").text
+    assert 'nl2sql_stage_duration_seconds_count{stage="llm"}' in metrics
+    assert "nl2sql_generation_attempts_total" in metrics
+    assert 'nl2sql_cache_lookups_total{cache="sql",result="miss"}' in metrics
+    assert "nl2sql_rows_returned_total" in metrics
@@ -0,0 +1,69 @@
+import os
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from src.db.create_table import Airline, Flight
+from src.db.embedded import create_embedded_engine
+from src.db.parquet import convert_datasets, dataset_path, iter_parquet_copy_chunks, scan_batches
+from src.utils.database_utils import DatabaseConnector
+
+
+def test_flights_are_typed_and_partitioned(tmp_path):
+    stats = convert_datasets(parquet_dir=str(tmp_path), tables=[Flight.__table__])
+    directory = dataset_path(Flight.__table__, parquet_dir=str(tmp_path))
+
+    assert stats[0]["rows"] == 5000
+    assert os.path.isdir(os.path.join(directory, "year=2015", "month=1"))
+    batch = next(scan_batches(Flight.__table__, directory))
+    assert batch.schema.field("month").type == pa.int32()
+    assert batch.schema.field("departure_delay").type == pa.float64()
+    assert batch.schema.field("cancelled").type == pa.bool_()
+    # Converted again only once the CSV changes
+    assert convert_datasets(parquet_dir=str(tmp_path), tables=[Flight.__table__]) == []
+
+
+def test_scans_read_only_requested_columns_and_partitions(tmp_path):
+    convert_datasets(parquet_dir=str(tmp_path), tables=[Flight.__table__])
+    directory = dataset_path(Flight.__table__, parquet_dir=str(tmp_path))
+
+    batches = list(
+        scan_batches(Flight.__table__, directory, ["month", "distance"], ds.field("month") == 1)
+    )
+
+    assert batches[0].schema.names == ["month", "distance"]
+    assert {month for batch in batches for month in batch.column("month").to_pylist()} == {1}
+
+
+def test_copy_chunks_leave_serial_keys_to_the_database(tmp_path):
+    convert_datasets(parquet_dir=str(tmp_path), tables=[Flight.__table__])
+    directory = dataset_path(Flight.__table__, parquet_dir=str(tmp_path))
+
+    columns, rows, chunk = next(iter_parquet_copy_chunks(Flight.__table__, directory))
+
+    assert "id" not in columns
+    assert len(chunk.splitlines()) == rows
+
+
+def test_embedded_engine_queries_parquet_in_place(tmp_path, monkeypatch, sqlite_engine):
+    monkeypatch.setattr("src.config.config.PARQUET_DIR", str(tmp_path))
+    convert_datasets()
+    engine, _ = create_embedded_engine(pool_size=1)
+    connector = DatabaseConnector(engine=engine, result_cache_bytes=0)
+    sql = (
+        "SELECT a.airline, COUNT(*) AS n, SUM(f.distance) AS distance FROM flights f "
+        "JOIN airlines a ON f.airline = a.iata_code WHERE f.month = 1 GROUP BY a.airline"
+    )
+    try:
+        with engine.connect() as conn:
+            kinds = dict(
+                conn.exec_driver_sql(
+                    "SELECT table_name, table_type FROM information_schema.tables"
+                ).fetchall()
+            )
+        expected = DatabaseConnector(engine=sqlite_engine, result_cache_bytes=0).execute_query(sql)
+
+        assert kinds[Airline.__tablename__] == "VIEW"
+        assert sorted(map(str, connector.execute_query(sql))) == sorted(map(str, expected))
+    finally:
+        connector.close()
@@ -0,0 +1,111 @@
+from sqlalchemy import (
+    Column,
+    Computed,
+    DateTime,
+    Integer,
+    MetaData,
+    Table,
+    create_engine,
+    select,
+)
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateTable
+
+from src.db.bulk_load import chunk_partitions, iter_copy_chunks
+from src.db.create_table import (
+    Airport,
+    Flight,
+    is_partitioned,
+    partition_parent,
+    partition_statement,
+    utc_date,
+)
+from src.utils.cost_guard import parse_postgres_plan
+
+
+def _dated_table():
+    metadata = MetaData()
+    year, month, day = Column("year", Integer), Column("month", Integer), Column("day", Integer)
+    return Table(
+        "flights",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        year,
+        month,
+        day,
+        Column("flight_date", DateTime(timezone=True), Computed(utc_date(year, month, day))),
+    )
+
+
+def test_flights_are_partitioned_by_year_and_month_on_postgresql():
+    ddl = str(CreateTable(Flight.__table__).compile(dialect=postgresql.dialect()))
+
+    assert "PARTITION BY RANGE (year, month)" in ddl
+    assert "PRIMARY KEY (id, year, month)" in ddl
+    assert is_partitioned(Flight.__table__, "postgresql")
+    assert not is_partitioned(Flight.__table__, "sqlite")
+    assert "PRIMARY KEY (iata_code)" in str(
+        CreateTable(Airport.__table__).compile(dialect=postgresql.dialect())
+    )
+
+
+def test_partition_statement_covers_one_month():
+    statement = partition_statement(Flight.__table__, 2015, 12)
+
+    assert statement.startswith('CREATE TABLE IF NOT EXISTS "flights_2015_12" PARTITION OF')
+    assert statement.endswith("FOR VALUES FROM (2015, 12) TO (2015, 13)")
+
+
+def test_partition_checks_the_derived_date_range():
+    statement = partition_statement(_dated_table(), 2015, 12)
+
+    assert (
+        "CHECK (flight_date >= '2015-12-01 00:00:00+00' AND flight_date < '2016-01-01 00:00:00+00')"
+        in statement
+    )
+
+
+def test_partition_names_map_back_to_their_table():
+    assert partition_parent("flights_2015_03") == "flights"
+    assert partition_parent("airports") == "airports"
+
+
+def test_chunk_partitions_reads_the_keys_of_each_chunk(tmp_path):
+    path = tmp_path / "flights.csv"
+    path.write_text("YEAR,MONTH,DAY,AIRLINE\n2015,4,7,EV\n2015,1,24,AS\n2015,4,1,AA\n")
+
+    keys = [
+        chunk_partitions(Flight.__table__, columns, chunk)
+        for columns, _, chunk in iter_copy_chunks(str(path), Flight.__table__, chunk_rows=2)
+    ]
+
+    assert keys == [{(2015, 4), (2015, 1)}, {(2015, 4)}]
+
+
+def test_flight_date_is_derived_on_sqlite():
+    table = _dated_table()
+    engine = create_engine("sqlite://")
+    table.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(table.insert(), [{"year": 2015, "month": 3, "day": 7}])
+        flight_date = conn.execute(select(table.c.flight_date)).scalar()
+
+    assert (flight_date.year, flight_date.month, flight_date.day) == (2015, 3, 7)
+
+
+def test_partition_scans_count_towards_their_table():
+    plan = [
+        {
+            "Plan": {
+                "Node Type": "Append",
+                "Total Cost": 40.0,
+                "Plan Rows": 800,
+                "Plans": [
+                    {"Node Type": "Seq Scan", "Relation Name": "flights_2015_01", "Plan Rows": 420},
+                    {"Node Type": "Seq Scan", "Relation Name": "flights_2015_02", "Plan Rows": 380},
+                ],
+            }
+        }
+    ]
+
+    assert parse_postgres_plan(plan).scans == {"flights": 800}
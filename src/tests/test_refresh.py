@@ -0,0 +1,123 @@
+import os
+import shutil
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from src.db import refresh as refresh_module
+from src.db.create_table import get_data_versions
+from src.db.parquet import convert_datasets
+from src.db.refresh import refresh
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    for name in ("airlines.csv", "airports.csv", "flights.csv"):
+        shutil.copy(f"data/{name}", tmp_path / name)
+    return tmp_path
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return create_engine(f"sqlite:///{tmp_path / 'refresh.sqlite'}")
+
+
+def _rewrite_flights(data_dir, keep):
+    path = data_dir / "flights.csv"
+    header, *rows = path.read_text().splitlines()
+    kept = [row for row in (keep(row) for row in rows) if row is not None]
+    path.write_text("\n".join([header, *kept]) + "\n")
+
+
+def _count(engine, where=""):
+    with engine.connect() as conn:
+        return conn.execute(text(f"SELECT COUNT(*) FROM flights {where}")).scalar()
+
+
+def test_first_refresh_loads_every_slice_and_second_changes_nothing(engine, data_dir):
+    first = refresh(engine, str(data_dir))
+    versions = get_data_versions(engine)
+
+    second = refresh(engine, str(data_dir))
+
+    assert set(first["changed_tables"]) == {"flights", "airports", "airlines"}
+    flights = next(stats for stats in first["tables"] if stats["table"] == "flights")
+    assert len(flights["changed"]) == flights["slices"] > 1
+    assert _count(engine) == flights["rows"] == 5000
+    assert second["changed_tables"] == []
+    assert get_data_versions(engine) == versions
+
+
+def test_changed_month_is_reloaded_alone(engine, data_dir):
+    refresh(engine, str(data_dir))
+    versions = get_data_versions(engine)
+    january = _count(engine, "WHERE year = 2015 AND month = 1")
+    # Cancel every January flight and drop March entirely
+    _rewrite_flights(
+        data_dir,
+        lambda row: None
+        if row.startswith("2015,3,")
+        else row.replace(",0,0,", ",0,1,", 1)
+        if row.startswith("2015,1,")
+        else row,
+    )
+
+    report = refresh(engine, str(data_dir))
+
+    flights = next(stats for stats in report["tables"] if stats["table"] == "flights")
+    assert report["changed_tables"] == ["flights"]
+    assert flights["changed"] == ["year=2015/month=1"]
+    assert flights["removed"] == ["year=2015/month=3"]
+    assert flights["rows"] == january
+    assert _count(engine, "WHERE year = 2015 AND month = 3") == 0
+    assert _count(engine, "WHERE year = 2015 AND month = 1 AND cancelled = 1") == january
+    new_versions = get_data_versions(engine)
+    assert new_versions["flights"] == versions["flights"] + 1
+    assert new_versions["airports"] == versions["airports"]
+
+
+def test_unchanged_files_are_not_read_again(engine, data_dir, monkeypatch):
+    refresh(engine, str(data_dir))
+
+    def fail(*args):
+        raise AssertionError("hashed an unchanged file")
+
+    monkeypatch.setattr(refresh_module, "slice_hashes", fail)
+    report = refresh(engine, str(data_dir))
+
+    assert report["changed_tables"] == []
+    assert {stats["source"] for stats in report["tables"]} == {None}
+
+
+def test_touched_file_is_hashed_but_not_reloaded(engine, data_dir):
+    refresh(engine, str(data_dir))
+    path = data_dir / "airlines.csv"
+    os.utime(path, ns=(os.stat(path).st_atime_ns, os.stat(path).st_mtime_ns + 10**9))
+
+    report = refresh(engine, str(data_dir))
+
+    airlines = next(stats for stats in report["tables"] if stats["table"] == "airlines")
+    assert airlines["source"] == "csv"
+    assert report["changed_tables"] == []
+
+
+def test_changed_month_is_found_in_the_parquet_partitions(engine, data_dir, tmp_path):
+    parquet_dir = str(tmp_path / "parquet")
+    convert_datasets(str(data_dir), parquet_dir)
+    first = refresh(engine, str(data_dir), parquet_dir=parquet_dir)
+    assert {stats["source"] for stats in first["tables"]} == {"parquet"}
+    march = _count(engine, "WHERE year = 2015 AND month = 3")
+    _rewrite_flights(
+        data_dir,
+        lambda row: row.replace(",0,0,", ",0,1,", 1) if row.startswith("2015,3,") else row,
+    )
+    convert_datasets(str(data_dir), parquet_dir)
+
+    report = refresh(engine, str(data_dir), parquet_dir=parquet_dir)
+
+    flights = next(stats for stats in report["tables"] if stats["table"] == "flights")
+    assert report["changed_tables"] == ["flights"]
+    assert (flights["source"], flights["changed"]) == ("parquet", ["year=2015/month=3"])
+    assert flights["rows"] == _count(engine, "WHERE year = 2015 AND month = 3") == march
+    assert _count(engine) == 5000
+    assert _count(engine, "WHERE year = 2015 AND month = 3 AND cancelled = 1") > march / 2
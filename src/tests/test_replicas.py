@@ -0,0 +1,45 @@
+from sqlalchemy import create_engine
+
+from src.db.replicas import ReplicaRouter
+from src.utils.database_utils import DatabaseConnector
+from src.utils.metrics import DB_QUERIES
+
+
+def test_round_robin_and_least_busy_balancing(sqlite_engine):
+    engines = [create_engine(sqlite_engine.url), create_engine(sqlite_engine.url)]
+    round_robin = ReplicaRouter(engines, balancing="round_robin")
+    least_busy = ReplicaRouter(engines, balancing="least_busy")
+
+    picks = []
+    for _ in range(4):
+        replica = round_robin.acquire()
+        picks.append(replica.name)
+        round_robin.release(replica)
+    busy = least_busy.acquire()
+
+    assert picks == ["replica-0", "replica-1", "replica-0", "replica-1"]
+    assert least_busy.acquire() is not busy
+
+
+def test_reads_go_to_replicas_and_skip_unreachable_ones(sqlite_engine, tmp_path):
+    broken = create_engine(f"sqlite:///{tmp_path}/missing/replica.sqlite")
+    connector = DatabaseConnector(
+        engine=sqlite_engine,
+        result_cache_bytes=0,
+        replicas=[create_engine(sqlite_engine.url), broken],
+    )
+    connector.replicas.balancing = "round_robin"
+    before = {name: DB_QUERIES.value(engine=name) for name in ("primary", "replica-0")}
+    try:
+        for _ in range(2 * connector.replicas.max_failures):
+            assert connector.execute_query("SELECT COUNT(*) AS n FROM airlines") == [{"n": 14}]
+        stats = {entry["engine"]: entry for entry in connector.pool_stats()}
+    finally:
+        connector.close()
+
+    assert stats["replica-0"]["healthy"] is True
+    assert stats["replica-1"]["healthy"] is False
+    assert "checked_out" in stats["primary"]
+    # Failed replica reads fell back to the primary
+    assert DB_QUERIES.value(engine="primary") - before["primary"] == connector.replicas.max_failures
+    assert DB_QUERIES.value(engine="replica-0") - before["replica-0"] == connector.replicas.max_failures
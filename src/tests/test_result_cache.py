@@ -0,0 +1,112 @@
+import pytest
+from sqlalchemy import create_engine, text
+
+from src.db.create_table import bump_data_versions
+from src.utils.cache_utils import ResultCache, canonicalize_sql, referenced_tables
+from src.utils.database_utils import DatabaseConnector
+
+
+@pytest.fixture
+def connector():
+    engine = create_engine("sqlite:///:memory:", echo=False)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE airlines (iata_code TEXT, airline TEXT)"))
+        conn.execute(text("INSERT INTO airlines VALUES ('AA', 'American Airlines Inc.')"))
+    bump_data_versions(engine, ["airlines"])
+    db_connector = DatabaseConnector(engine=engine, result_cache_bytes=1024 * 1024)
+    db_connector.result_cache.version_check_interval = 0
+    return db_connector
+
+
+def test_canonicalize_sql_ignores_formatting_but_not_literals():
+    assert canonicalize_sql("SELECT *\n  FROM airlines;") == canonicalize_sql(
+        "select * from AIRLINES"
+    )
+    assert canonicalize_sql("SELECT a FROM t WHERE a = 'AA'") == canonicalize_sql(
+        "select a from t where a='AA';"
+    )
+    assert canonicalize_sql("SELECT 'AA'") != canonicalize_sql("SELECT 'aa'")
+
+
+def test_canonicalize_sql_drops_comments_but_keeps_their_line_ends():
+    assert canonicalize_sql("SELECT a -- c\nFROM t") == canonicalize_sql("SELECT a /* c */ FROM t")
+    assert canonicalize_sql("SELECT a -- c\nFROM t") != canonicalize_sql("SELECT a -- c FROM t")
+    assert canonicalize_sql("SELECT a - b FROM t") == "select a - b from t"
+
+
+def test_referenced_tables_covers_comma_lists_and_quoted_and_qualified_names():
+    assert referenced_tables("SELECT * FROM flights f, airports a") == {"flights", "airports"}
+    assert referenced_tables('SELECT * FROM "flights"') == {"flights"}
+    assert referenced_tables(
+        "SELECT * FROM public.flights f JOIN (SELECT * FROM airlines) l ON f.airline = l.iata_code"
+    ) == {"flights", "airlines"}
+    assert referenced_tables("SELECT EXTRACT(YEAR FROM CURRENT_DATE)") == set()
+
+
+def test_comma_joined_and_quoted_tables_are_invalidated(connector):
+    with connector.engine.begin() as conn:
+        conn.execute(text("CREATE TABLE airports (iata_code TEXT)"))
+    connector.execute_query('SELECT COUNT(*) AS n FROM "airlines"')
+    connector.execute_query("SELECT COUNT(*) AS n FROM airports, airlines")
+    with connector.engine.begin() as conn:
+        conn.execute(text("INSERT INTO airlines VALUES ('UA', 'United Air Lines Inc.')"))
+    bump_data_versions(connector.engine, ["airlines"])
+
+    assert connector.execute_query('SELECT COUNT(*) AS n FROM "airlines"') == [{"n": 2}]
+    assert connector.execute_query("SELECT COUNT(*) AS n FROM airports, airlines") == [{"n": 0}]
+    assert connector.cache_stats()["invalidations"] == 2
+
+
+def test_queries_without_tables_are_not_cached(connector):
+    connector.execute_query("SELECT 1 AS one")
+    connector.execute_query("SELECT 1 AS one")
+
+    assert connector.cache_stats()["hits"] == 0
+
+
+def test_execute_query_hits_cache_for_equivalent_sql(connector):
+    first = connector.execute_query("SELECT * FROM airlines")
+    second = connector.execute_query("select *  from airlines;")
+
+    assert first == second == [{"iata_code": "AA", "airline": "American Airlines Inc."}]
+    assert connector.cache_stats()["hits"] == 1
+    assert connector.cache_stats()["misses"] == 1
+
+
+def test_data_version_bump_invalidates_cached_results(connector):
+    connector.execute_query("SELECT * FROM airlines")
+    with connector.engine.begin() as conn:
+        conn.execute(text("INSERT INTO airlines VALUES ('UA', 'United Air Lines Inc.')"))
+    bump_data_versions(connector.engine, ["airlines"])
+
+    results = connector.execute_query("SELECT * FROM airlines")
+
+    assert len(results) == 2
+    assert connector.cache_stats()["invalidations"] == 1
+
+
+def test_result_cache_evicts_by_size():
+    cache = ResultCache(max_bytes=60)
+    cache.set("SELECT 1", [{"value": "x" * 20}])
+    cache.set("SELECT 2", [{"value": "y" * 20}])
+
+    assert cache.get("SELECT 1") is None
+    assert cache.get("SELECT 2") == [{"value": "y" * 20}]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_unreadable_data_versions_bypass_the_cache():
+    versions = {"airlines": 1}
+
+    def version_source():
+        if versions is None:
+            raise RuntimeError("data_versions is locked")
+        return versions
+
+    cache = ResultCache(version_source=version_source, version_check_interval=0)
+    cache.set("SELECT * FROM airlines", [{"iata_code": "AA"}])
+    versions = None
+
+    assert cache.get("SELECT * FROM airlines") is None
+    cache.set("SELECT iata_code FROM airlines", [{"iata_code": "AA"}])
+    assert len(cache._data) == 1
@@ -0,0 +1,104 @@
+import re
+import time
+
+from fastapi.testclient import TestClient
+
+from src.config import config
+from src.utils.result_snapshots import SnapshotStore
+
+RECORDS = [
+    {"airline": "AA", "delay": 12.5},
+    {"airline": "UA", "delay": ""},
+    {"airline": "DL", "delay": -3.0},
+    {"airline": "WN", "delay": 40.25},
+]
+
+
+def test_snapshot_pages_and_sorts_with_nulls_last():
+    store = SnapshotStore()
+    snapshot = store.get(store.create("delays", "SELECT ...", RECORDS).id)
+
+    assert snapshot.total == 4
+    assert snapshot.page(offset=1, limit=2) == RECORDS[1:3]
+    assert [row["delay"] for row in snapshot.page(0, 4, sort="delay")] == [-3.0, 12.5, 40.25, ""]
+    assert [row["delay"] for row in snapshot.page(0, 4, "delay", descending=True)] == [40.25, 12.5, -3.0, ""]
+
+
+def test_snapshots_expire():
+    store = SnapshotStore(ttl=0.01)
+    snapshot_id = store.create("delays", "SELECT ...", RECORDS).id
+    time.sleep(0.02)
+
+    assert store.get(snapshot_id) is None
+
+
+def test_snapshots_survive_memory_eviction_on_disk(tmp_path):
+    store = SnapshotStore(max_bytes=100, directory=str(tmp_path))
+    first = store.create("delays", "SELECT 1", RECORDS).id
+    store.create("more delays", "SELECT 2", RECORDS)
+
+    assert store.stats()["entries"] == 1
+    assert store.get(first).page(0, 4) == RECORDS
+    assert SnapshotStore(directory=str(tmp_path)).get(first).sql == "SELECT 1"
+    assert SnapshotStore(directory=str(tmp_path)).get("../etc/passwd") is None
+
+
+def test_results_too_large_to_store_are_not_given_an_id():
+    store = SnapshotStore(max_bytes=10)
+    snapshot = store.create("delays", "SELECT 1", RECORDS)
+
+    assert snapshot.id is None
+    assert snapshot.page(0, 2) == RECORDS[:2]
+    assert store.stats()["entries"] == 0
+
+
+def test_expired_files_are_swept_periodically_not_on_every_create(tmp_path, monkeypatch):
+    store = SnapshotStore(ttl=0.01, directory=str(tmp_path), sweep_interval=3600)
+    sweeps = []
+    monkeypatch.setattr(store, "_remove_expired_files", lambda: sweeps.append(1))
+
+    for _ in range(3):
+        store.create("delays", "SELECT 1", RECORDS)
+
+    assert len(sweeps) == 1
+
+
+def test_chat_renders_first_page_and_results_endpoint_pages(server, fake_llm, monkeypatch):
+    monkeypatch.setattr(config, "RESULT_PAGE_SIZE", 5)
+    fake_llm.add_response("List all airlines", "SELECT iata_code, airline FROM airlines")
+    client = TestClient(server.app)
+
+    html = client.post("/chat", data={"text": "List all airlines"}).text
+
+    assert html.count("<tr>") == 1 + 5
+    assert "Rows 1-5 of 14" in html
+    snapshot_id = re.search(r'/results/([\w-]+)\?', html).group(1)
+
+    page = client.get(f"/results/{snapshot_id}", params={"offset": 10, "limit": 10}).json()
+    assert page["total"] == 14
+    assert len(page["rows"]) == 4
+    assert page["next_offset"] is None
+
+    ordered = client.get(
+        f"/results/{snapshot_id}", params={"limit": 3, "sort": "iata_code", "order": "desc"}
+    ).json()
+    assert [row["iata_code"] for row in ordered["rows"]] == ["WN", "VX", "US"]
+    assert ordered["next_offset"] == 3
+
+    fragment = client.get(f"/results/{snapshot_id}", params={"format": "html", "offset": 3, "limit": 3})
+    assert fragment.text.count("<tr>") == 1 + 3
+    assert client.get("/results/unknown").status_code == 404
+    assert client.get(f"/results/{snapshot_id}", params={"sort": "nope"}).status_code == 400
+
+
+def test_chat_renders_results_too_large_to_store(server, fake_llm, monkeypatch):
+    monkeypatch.setattr(config, "RESULT_PAGE_SIZE", 5)
+    monkeypatch.setattr(server, "result_snapshots", SnapshotStore(max_bytes=10))
+    fake_llm.add_response("List all airlines", "SELECT iata_code, airline FROM airlines")
+
+    response = TestClient(server.app).post("/chat", data={"text": "List all airlines"})
+
+    assert response.status_code == 200
+    assert response.text.count("<tr>") == 1 + 5
+    assert "Rows 1-5 of 14" in response.text
+    assert "/results/" not in response.text
@@ -0,0 +1,44 @@
+from src.db.create_table import Airline
+from src.utils.schema_utils import SchemaSelector, render_schema_prompt, render_table_prompt
+
+
+def test_render_table_prompt_from_model_comments():
+    assert render_table_prompt(Airline.__table__) == (
+        "airlines table: This table provides information about airline IATA codes and their full names.\n"
+        "Columns:\n"
+        "iata_code: Two-letter IATA code assigned to the airline.\n"
+        "airline: Full name of the airline."
+    )
+
+
+def test_full_schema_skips_internal_tables_and_hidden_columns():
+    schema = render_schema_prompt()
+
+    assert "flights table:" in schema
+    assert "data_versions" not in schema
+    assert "\nid:" not in schema
+
+
+def test_selector_prunes_unrelated_tables_and_columns():
+    selection = SchemaSelector().select(
+        "What is the average departure delay for flights departing from LAX?"
+    )
+
+    assert set(selection) == {"flights", "airlines", "airports"}
+    assert "departure_delay" in selection["flights"]
+    assert "origin_airport" in selection["flights"]
+    assert "taxi_in" not in selection["flights"]
+
+
+def test_selector_keeps_only_mentioned_small_table():
+    assert SchemaSelector().select("Which state has the most airports?") == {
+        "airports": None
+    }
+
+
+def test_selector_falls_back_to_full_schema():
+    selector = SchemaSelector()
+    selection = selector.select("hello")
+
+    assert selection == {"airlines": None, "airports": None, "flights": None}
+    assert not selector.has_json_columns(selection)
@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+from src.config import config
+from src.core import llm as llm_module
+from src.core.fake_llm import CassetteModel
+from src.core.llm import GenerativeModelWrapper
+from src.utils.cache_utils import normalize_question
+from src.utils.cost_guard import CostGuard
+
+QUESTION = "How many airlines are there?"
+GOOD_SQL = json.dumps({"sql": "SELECT COUNT(*) AS total FROM airlines"})
+BAD_SQL = json.dumps({"sql": "SELECT COUNT(*) FROM airline_names"})
+
+
+@pytest.fixture
+def cassette(monkeypatch, server):
+    def install(responses):
+        model = CassetteModel({QUESTION: responses})
+        monkeypatch.setitem(
+            llm_module._llm_clients,
+            config.LLM_MODEL_NAME,
+            GenerativeModelWrapper(model_name=config.LLM_MODEL_NAME, model=model),
+        )
+        return model
+
+    monkeypatch.setattr(config, "SPECULATIVE_CANDIDATES", 3)
+    return install
+
+
+@pytest.mark.asyncio
+async def test_first_valid_candidate_wins(server, cassette):
+    model = cassette([BAD_SQL, GOOD_SQL, GOOD_SQL])
+
+    sql, results = await server.generate_and_execute_with_retries(QUESTION)
+
+    assert sql == "SELECT COUNT(*) AS total FROM airlines"
+    assert results == [{"total": 14}]
+    assert model.calls[normalize_question(QUESTION)] == 3
+
+
+@pytest.mark.asyncio
+async def test_falls_back_to_correction_when_every_candidate_fails(server, cassette):
+    model = cassette([BAD_SQL, BAD_SQL, BAD_SQL, GOOD_SQL])
+
+    sql, results = await server.generate_and_execute_with_retries(QUESTION)
+
+    assert results == [{"total": 14}]
+    assert model.calls[normalize_question(QUESTION)] == 4
+
+
+@pytest.mark.asyncio
+async def test_candidates_skip_explain_when_the_cost_guard_is_off(server, cassette, monkeypatch):
+    cassette([GOOD_SQL, GOOD_SQL, GOOD_SQL])
+    explained = []
+    monkeypatch.setattr(server, "cost_guard", CostGuard())
+    monkeypatch.setattr(server.db_connector, "estimate_cost", lambda sql: explained.append(sql))
+
+    _, results = await server.generate_and_execute_with_retries(QUESTION)
+
+    assert results == [{"total": 14}]
+    assert explained == []
@@ -0,0 +1,72 @@
+import pandas as pd
+import pytest
+
+from src.utils.sql_validator import SQLValidator, format_validation_errors
+
+validator = SQLValidator()
+
+
+def _codes(sql):
+    return [error.code for error in validator.validate(sql)]
+
+
+@pytest.mark.parametrize("sql", pd.read_csv("data/eval.csv")["sql_query"].tolist())
+def test_eval_queries_pass_validation(sql):
+    assert validator.validate(sql) == []
+
+
+def test_derived_relations_and_casts_pass_validation():
+    assert _codes(
+        "WITH t AS (SELECT airline, COUNT(*) c FROM flights GROUP BY airline) "
+        "SELECT t.c, anything FROM t ORDER BY 1"
+    ) == []
+    assert _codes("SELECT CAST(year AS TEXT) AS y, distance::numeric(10, 2) FROM flights;") == []
+    assert _codes("SELECT EXTRACT(YEAR FROM CURRENT_DATE)") == []
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "SELECT x.airline FROM (SELECT airline FROM flights) x",
+        "SELECT x.airline FROM (SELECT airline FROM flights) AS x WHERE x.airline = 'AA'",
+        "SELECT f.airline, a.city FROM flights f, airports a WHERE f.origin_airport = a.iata_code",
+        "SELECT a.city FROM flights f, (SELECT iata_code, city FROM airports) a "
+        "WHERE f.origin_airport = a.iata_code",
+        "SELECT do.city FROM flights f JOIN airports do ON f.destination_airport = do.iata_code",
+        "SELECT COUNT(*) AS do FROM flights",
+        "SELECT EXTRACT(YEAR FROM f.scheduled_departure) FROM flights f",
+    ],
+)
+def test_derived_aliases_comma_joins_and_keyword_aliases_pass_validation(sql):
+    assert validator.validate(sql) == []
+
+
+@pytest.mark.parametrize(
+    "sql, code",
+    [
+        ("", "empty"),
+        ("DELETE FROM flights", "forbidden_keyword"),
+        ("SELECT * INTO backup FROM flights", "forbidden_keyword"),
+        ("SELECT 1; DROP TABLE flights", "multiple_statements"),
+        ("EXPLAIN SELECT 1", "not_select"),
+        ("SELECT COUNT(* FROM flights", "syntax"),
+        ("SELECT * FROM flight", "unknown_table"),
+        ("SELECT f.delay FROM flights f", "unknown_column"),
+        ("SELECT delay FROM flights", "unknown_column"),
+        ("SELECT a.airline FROM flights f", "unknown_alias"),
+        ("SELECT a.delay FROM flights f, airports a", "unknown_column"),
+        ("SELECT 1 FROM flights f, airport a", "unknown_table"),
+        ("SELECT y.airline FROM (SELECT airline FROM flights) x", "unknown_alias"),
+        ("SELECT 1 FROM flights WHERE EXISTS (DELETE FROM airlines)", "forbidden_keyword"),
+        ("SELECT pg_sleep(10) FROM flights", "function_not_allowed"),
+    ],
+)
+def test_invalid_queries_are_rejected(sql, code):
+    assert code in _codes(sql)
+
+
+def test_errors_are_formatted_for_correction_prompt():
+    message = format_validation_errors(validator.validate("SELECT f.delay FROM flights f"))
+
+    assert message.startswith("Static validation failed:")
+    assert 'Column "delay" does not exist in table "flights"' in message
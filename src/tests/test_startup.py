@@ -0,0 +1,45 @@
+import subprocess
+import sys
+
+from fastapi.testclient import TestClient
+
+from src.benchmarks.startup import parse_importtime
+
+
+def test_importing_the_app_defers_heavy_dependencies():
+    code = (
+        "import sys, src.server.app as app; "
+        "print(app.db_connector is None, 'google.generativeai' in sys.modules, "
+        "'markdown2' in sys.modules, 'pandas' in sys.modules)"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+
+    assert result.stdout.split() == ["True", "False", "False", "False"]
+
+
+def test_readiness_follows_the_lifespan(server, monkeypatch):
+    monkeypatch.setattr(server, "startup_state", {"ready": False, "seconds": None, "error": None})
+    client = TestClient(server.app)
+
+    assert client.get("/healthz").json() == {"status": "ok"}
+    assert client.get("/readyz").status_code == 503
+    with client:
+        response = client.get("/readyz")
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "ready"
+
+
+def test_parse_importtime_reads_depth_and_times():
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |   json.decoder\n"
+        "import time:        80 |        200 | json\n"
+    )
+
+    assert parse_importtime(stderr) == [
+        {"module": "json.decoder", "depth": 1, "self_us": 120, "cumulative_us": 120},
+        {"module": "json", "depth": 0, "self_us": 80, "cumulative_us": 200},
+    ]
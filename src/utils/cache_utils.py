@@ -0,0 +1,359 @@
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from src.utils.sql_validator import (
+    _CLAUSE_KEYWORDS,
+    _SPECIAL_FORM_FUNCTIONS,
+    _is_name,
+    tokenize_sql,
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def normalize_question(question: str) -> str:
+    """Normalizes a user question so trivially different phrasings share a cache key."""
+    normalized = re.sub(r"\s+", " ", question).strip().lower()
+    return normalized.rstrip("?.!; ")
+
+
+def prompt_fingerprint(prompt: str) -> str:
+    """Returns a short stable hash of a prompt, used to invalidate cached SQL on prompt changes."""
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16]
+
+
+class TTLCache:
+    """Thread-safe in-process LRU cache whose entries expire after `ttl` seconds."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING or item[1] < time.monotonic():
+                if item is not _MISSING:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._data)}
+
+
+class DiskCache:
+    """Persistent key/value store backed by SQLite, so cached entries survive restarts."""
+
+    def __init__(self, path: str, ttl: float = 3600):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return default
+            if row[1] < time.time():
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return default
+            return json.loads(row[0])
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time() + self.ttl),
+            )
+            self._conn.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self._conn.commit()
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class SQLCache:
+    """
+    Two-tier cache mapping a user question to SQL that is known to execute.
+    Lookups hit the in-process LRU first and fall back to the optional on-disk store,
+    promoting disk hits into memory.
+    """
+
+    def __init__(
+        self, maxsize: int = 1024, ttl: float = 3600, path: Optional[str] = None
+    ):
+        self.memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.disk = DiskCache(path, ttl=ttl) if path else None
+
+    @staticmethod
+    def make_key(question: str, model_name: str, prompt_hash: str) -> str:
+        raw = f"{model_name}\x1f{prompt_hash}\x1f{normalize_question(question)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        sql = self.memory.get(key)
+        if sql is None and self.disk is not None:
+            sql = self.disk.get(key)
+            if sql is not None:
+                self.memory.set(key, sql)
+        return sql
+
+    def set(self, key: str, sql: str) -> None:
+        self.memory.set(key, sql)
+        if self.disk is not None:
+            self.disk.set(key, sql)
+
+    def delete(self, key: str) -> None:
+        self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+
+_SQL_TOKEN_RE = re.compile(
+    r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|(?P<comment>--[^\n]*|/\*.*?\*/)|\s+"
+    r"|(?:[^'\"\s\-/]|-(?!-)|/(?!\*))+",
+    re.DOTALL,
+)
+_SQL_PUNCTUATION = "(),=<>+*/|"
+
+
+def canonicalize_sql(query: str) -> str:
+    """
+    Canonicalizes a SQL string so formatting differences do not produce distinct cache keys.
+    Comments are dropped, whitespace is collapsed, keywords and identifiers are lower-cased
+    and trailing semicolons are removed; quoted literals and identifiers are left untouched.
+    """
+    parts = []
+    for match in _SQL_TOKEN_RE.finditer(query):
+        token = match.group()
+        if token[0] in "'\"":
+            parts.append(token)
+        elif match.group("comment") is not None or token.isspace():
+            # A comment separates tokens like whitespace; a "--" comment also ends its line
+            if not parts or parts[-1] != " ":
+                parts.append(" ")
+        else:
+            parts.append(token.lower())
+
+    # Drop whitespace at the edges and next to punctuation so "a = b" and "a=b" match
+    canonical = []
+    for index, part in enumerate(parts):
+        if part == " ":
+            before = canonical[-1][-1] if canonical else ""
+            after = parts[index + 1][0] if index + 1 < len(parts) else ""
+            if not before or not after:
+                continue
+            if before in _SQL_PUNCTUATION or after in _SQL_PUNCTUATION:
+                continue
+        canonical.append(part)
+    return "".join(canonical).rstrip("; ")
+
+
+def fingerprint_sql(query: str) -> str:
+    """Returns a stable hash of the canonical form of a SQL string."""
+    return hashlib.sha256(canonicalize_sql(query).encode("utf-8")).hexdigest()
+
+
+def referenced_tables(query: str) -> frozenset:
+    """
+    Returns the names of the relations a query reads from: every name after FROM or JOIN or
+    in a comma-separated FROM list, quoted or not, without its schema. CTE names are included.
+    """
+    tokens = tokenize_sql(query)
+    tables = set()
+    openers = []  # token before each open "("
+    from_depths = set()  # depths currently inside a FROM list
+    depth = 0
+    for index, token in enumerate(tokens):
+        previous = tokens[index - 1] if index else None
+        following = tokens[index + 1] if index + 1 < len(tokens) else None
+        if token.value == "(":
+            openers.append(previous)
+            depth += 1
+            continue
+        if token.value == ")":
+            from_depths.discard(depth)
+            if openers:
+                openers.pop()
+            depth -= 1
+            continue
+        # EXTRACT(YEAR FROM ...) and the like use FROM as a separator
+        opener = openers[-1] if openers else None
+        in_special_form = opener is not None and opener.upper in _SPECIAL_FORM_FUNCTIONS
+        if token.kind == "word" and token.upper == "FROM" and not in_special_form:
+            from_depths.add(depth)
+            continue
+        if token.kind == "word" and token.upper in _CLAUSE_KEYWORDS:
+            from_depths.discard(depth)
+            continue
+        starts_relation = previous is not None and (
+            (previous.upper in ("FROM", "JOIN") and not in_special_form)
+            or (previous.value == "," and depth in from_depths)
+        )
+        if not starts_relation or not _is_name(token):
+            continue
+        if following is not None and following.value == "(":
+            continue  # a set-returning function
+        if following is not None and following.value == "." and index + 2 < len(tokens):
+            token = tokens[index + 2]  # schema-qualified
+        tables.add(token.identifier)
+    return frozenset(tables)
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache of executed query results bounded by their approximate size in bytes.
+    Each entry remembers the data versions of the tables it read; an entry is dropped as soon
+    as `version_source` reports a different version for any of those tables.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        version_source=None,
+        version_check_interval: float = 1.0,
+    ):
+        self.max_bytes = max_bytes
+        self.version_source = version_source
+        self.version_check_interval = version_check_interval
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._versions: Optional[Dict[str, int]] = {}
+        self._versions_checked_at = float("-inf")
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _table_versions(self) -> Optional[Dict[str, int]]:
+        """Returns the current data versions, or None when they could not be read."""
+        if self.version_source is None:
+            return {}
+        now = time.monotonic()
+        if now - self._versions_checked_at >= self.version_check_interval:
+            try:
+                self._versions = self.version_source()
+            except Exception as e:
+                logger.warning(f"Could not read data versions, bypassing the result cache: {e}")
+                self._versions = None
+            self._versions_checked_at = now
+        return self._versions
+
+    def _pop(self, key: str) -> None:
+        _, size, _ = self._data.pop(key)
+        self.current_bytes -= size
+
+    def get(self, query: str) -> Any:
+        key = fingerprint_sql(query)
+        versions = self._table_versions()
+        with self._lock:
+            item = self._data.get(key)
+            # Without the versions no entry can be shown to be fresh
+            if item is None or versions is None:
+                self.misses += 1
+                return None
+            records, _, snapshot = item
+            if any(versions.get(table) != version for table, version in snapshot.items()):
+                self._pop(key)
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return records
+
+    def set(self, query: str, records: Any) -> None:
+        size = len(json.dumps(records, default=str))
+        if size > self.max_bytes:
+            return
+        key = fingerprint_sql(query)
+        versions = self._table_versions()
+        if versions is None:
+            return
+        tables = referenced_tables(query)
+        # Without the tables read, no data version bump could invalidate the entry
+        if self.version_source is not None and not tables:
+            return
+        snapshot = {table: versions.get(table) for table in tables}
+        with self._lock:
+            if key in self._data:
+                self._pop(key)
+            self._data[key] = (records, size, snapshot)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                self._pop(next(iter(self._data)))
+                self.evictions += 1
+
+    def invalidate(self, tables=None) -> None:
+        """Drops cached results that read any of `tables`, or everything when no tables are given."""
+        with self._lock:
+            for key, (_, _, snapshot) in list(self._data.items()):
+                if tables is None or any(table in snapshot for table in tables):
+                    self._pop(key)
+                    self.invalidations += 1
+            self._versions_checked_at = float("-inf")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "entries": len(self._data),
+            "bytes": self.current_bytes,
+        }
@@ -1,4 +1,6 @@
+import json
 import re
+import time
 
 def clean_generation_result(result: str) -> str:
     """Cleans the generated SQL query by removing unnecessary characters and whitespace."""
@@ -15,3 +17,10 @@ def clean_generation_result(result: str) -> str:
         .replace("```", "")
         .replace(";", "")
     )
+
+
+def log_generated_sql(path: str, question: str, sql: str) -> None:
+    """Appends a generated SQL query and the question it answers to a JSONL log."""
+    entry = {"timestamp": time.time(), "question": question, "sql": sql}
+    with open(path, "a") as f:
+        f.write(json.dumps(entry) + "\n")
@@ -0,0 +1,241 @@
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+from src.db.create_table import partition_parent
+from src.utils.sql_validator import _is_name, tokenize_sql
+
+GUARD_ACTIONS = ("reject", "limit", "sample")
+
+# Sampling clause per dialect; dialects without one fall back to a LIMIT. PostgreSQL samples
+# whole pages, so fewer are read; DuckDB's SYSTEM sampling picks whole vectors of 2048 rows,
+# too coarse for small tables, so it samples rows instead
+_SAMPLE_CLAUSES = {
+    "postgresql": "TABLESAMPLE SYSTEM ({percent})",
+    "duckdb": "TABLESAMPLE BERNOULLI ({percent}%)",
+}
+
+# Explanation prepended to rewritten SQL, so it travels with the SQL through the caches
+_NOTICE_PREFIX = "/* Cost guard: "
+_NOTICE_RE = re.compile(r"^/\* Cost guard: (.*?) \*/")
+
+
+@dataclass
+class QueryCost:
+    """Planner estimates of a query: result rows, total cost and rows read per table."""
+
+    rows: float
+    cost: Optional[float] = None
+    scans: Dict[str, float] = field(default_factory=dict)
+
+
+@dataclass
+class GuardDecision:
+    """What the cost guard did with a query: allow, limit, sample or reject."""
+
+    action: str
+    sql: str
+    reason: str = ""
+
+
+def explain_statement(dialect: str, sql: str) -> str:
+    """Returns the EXPLAIN (without ANALYZE) statement that plans `sql` on `dialect`."""
+    if dialect == "postgresql":
+        return f"EXPLAIN (FORMAT JSON) {sql}"
+    if dialect == "duckdb":
+        return f"EXPLAIN (FORMAT json) {sql}"
+    return f"EXPLAIN {sql}"
+
+
+def parse_plan(dialect: str, rows: Sequence, sql: str) -> Optional[QueryCost]:
+    """Reads the estimates from the EXPLAIN output rows, or None when `dialect` gives none."""
+    if dialect == "postgresql":
+        plan = rows[0][0]
+        cost = parse_postgres_plan(json.loads(plan) if isinstance(plan, str) else plan)
+    elif dialect == "duckdb":
+        cost = parse_duckdb_plan(json.loads(rows[0][1]))
+    else:
+        return None
+    # Row estimates of LIMIT nodes are not always reported
+    limit = outer_limit(sql)
+    if limit is not None:
+        cost.rows = min(cost.rows, limit)
+    return cost
+
+
+def parse_postgres_plan(plan: List[Dict]) -> QueryCost:
+    """
+    Reads a PostgreSQL `EXPLAIN (FORMAT JSON)` plan. Scans of a partitioned table's partitions
+    are added up under the table's name.
+    """
+    root = plan[0]["Plan"]
+    relations: Dict[str, float] = {}
+    nodes = [root]
+    while nodes:
+        node = nodes.pop()
+        if "Relation Name" in node:
+            name = node["Relation Name"].lower()
+            relations[name] = max(relations.get(name, 0.0), float(node["Plan Rows"]))
+        nodes.extend(node.get("Plans", []))
+    scans: Dict[str, float] = {}
+    for name, rows in relations.items():
+        table = partition_parent(name)
+        scans[table] = scans.get(table, 0.0) + rows
+    return QueryCost(rows=float(root["Plan Rows"]), cost=float(root["Total Cost"]), scans=scans)
+
+
+def parse_duckdb_plan(plan: List[Dict]) -> QueryCost:
+    """Reads a DuckDB `EXPLAIN (FORMAT json)` plan, which has row estimates but no costs."""
+    scans: Dict[str, float] = {}
+
+    def estimate(node: Dict) -> float:
+        info = node.get("extra_info") or {}
+        children = [estimate(child) for child in node.get("children", [])]
+        if "Table" in info and "Estimated Cardinality" in info:
+            name = info["Table"].split(".")[-1].lower()
+            scans[name] = max(scans.get(name, 0.0), float(info["Estimated Cardinality"]))
+        if "Estimated Cardinality" in info:
+            return float(info["Estimated Cardinality"])
+        if node.get("name") == "CROSS_PRODUCT":
+            product = 1.0
+            for rows in children:
+                product *= rows
+            return product
+        # e.g. LIMIT and ORDER_BY nodes pass their input through
+        return max(children, default=0.0)
+
+    return QueryCost(rows=estimate(plan[0]), scans=scans)
+
+
+def outer_limit(sql: str) -> Optional[int]:
+    """Returns the constant LIMIT of the outermost query, if it has one."""
+    tokens = tokenize_sql(sql)
+    depth = 0
+    for index, token in enumerate(tokens[:-1]):
+        if token.value == "(":
+            depth += 1
+        elif token.value == ")":
+            depth -= 1
+        elif depth == 0 and token.upper == "LIMIT" and tokens[index + 1].kind == "number":
+            return int(float(tokens[index + 1].value))
+    return None
+
+
+def cost_guard_notice(sql: str) -> Optional[str]:
+    """Returns the explanation the cost guard left on SQL it rewrote, if any."""
+    match = _NOTICE_RE.match(sql or "")
+    return match.group(1) if match else None
+
+
+def _with_notice(sql: str, notice: str) -> str:
+    return f"{_NOTICE_PREFIX}{notice.replace('*/', '* /')} */\n{sql}"
+
+
+def _strip_statement(sql: str) -> str:
+    return sql.strip().rstrip(";").rstrip()
+
+
+def limit_sql(sql: str, max_rows: int) -> str:
+    """Wraps `sql` so that it returns at most `max_rows` rows."""
+    return f"SELECT * FROM (\n{_strip_statement(sql)}\n) AS guarded LIMIT {max_rows}"
+
+
+def sample_sql(sql: str, table: str, percent: float, dialect: str) -> Optional[str]:
+    """
+    Adds a TABLESAMPLE clause of `percent` to the first reference to `table` in `sql`. Returns
+    None when the dialect cannot sample or the table reference is not found.
+    """
+    clause = _SAMPLE_CLAUSES.get(dialect)
+    if clause is None:
+        return None
+    sql = _strip_statement(sql)
+    tokens = tokenize_sql(sql)
+    for index, token in enumerate(tokens):
+        if token.kind not in ("word", "quoted") or token.identifier != table:
+            continue
+        start = index
+        if index >= 2 and tokens[index - 1].value == "." and _is_name(tokens[index - 2]):
+            start = index - 2  # schema-qualified
+        if start == 0 or tokens[start - 1].upper not in ("FROM", "JOIN", ","):
+            continue
+        if index + 1 < len(tokens) and tokens[index + 1].value in ("(", "."):
+            continue
+        end = index
+        if index + 2 < len(tokens) and tokens[index + 1].upper == "AS":
+            end = index + 2
+        elif index + 1 < len(tokens) and _is_name(tokens[index + 1]):
+            end = index + 1
+        position = tokens[end].position + len(tokens[end].value)
+        sample = clause.format(percent=f"{percent:g}")
+        return f"{sql[:position]} {sample}{sql[position:]}"
+    return None
+
+
+class CostGuard:
+    """
+    Decides what to do with a query whose planner estimates exceed `max_rows` result rows or
+    a total cost of `max_cost` (0 disables either check). With the "limit" action a query
+    returning too many rows gets a LIMIT; with "sample" its largest table is read through
+    TABLESAMPLE instead, which also brings its cost down. Queries that cannot be limited or
+    sampled, and every query with the "reject" action, are rejected.
+    """
+
+    def __init__(self, max_rows: int = 0, max_cost: float = 0, action: str = "limit"):
+        if action not in GUARD_ACTIONS:
+            raise ValueError(f"Unknown cost guard action: {action}")
+        self.max_rows = max_rows
+        self.max_cost = max_cost
+        self.action = action
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_rows > 0 or self.max_cost > 0
+
+    @property
+    def fingerprint(self) -> str:
+        """Identifies the settings, so SQL rewritten under other limits is cached apart."""
+        return f"{self.action}:{self.max_rows}:{self.max_cost:g}"
+
+    def check(self, sql: str, cost: Optional[QueryCost], dialect: str) -> GuardDecision:
+        if cost is None or not self.enabled:
+            return GuardDecision("allow", sql)
+        over_rows = self.max_rows > 0 and cost.rows > self.max_rows
+        over_cost = self.max_cost > 0 and cost.cost is not None and cost.cost > self.max_cost
+        if not (over_rows or over_cost):
+            return GuardDecision("allow", sql)
+
+        problems = []
+        if over_rows:
+            problems.append(f"{cost.rows:,.0f} rows (limit {self.max_rows:,})")
+        if over_cost:
+            problems.append(f"a cost of {cost.cost:,.0f} (limit {self.max_cost:,.0f})")
+        estimate = f"The planner estimates {' and '.join(problems)}"
+
+        if self.action == "sample" and cost.scans:
+            fraction = 1.0
+            if over_rows:
+                fraction = min(fraction, self.max_rows / cost.rows)
+            if over_cost:
+                fraction = min(fraction, self.max_cost / cost.cost)
+            percent = max(round(fraction * 100, 2), 0.01)
+            table = max(cost.scans, key=cost.scans.get)
+            sampled = sample_sql(sql, table, percent, dialect)
+            if sampled is not None:
+                reason = (
+                    f"{estimate}, so only a {percent:g}% sample of {table} was read; "
+                    "counts and totals cover that sample only and are not scaled up."
+                )
+                return GuardDecision("sample", _with_notice(sampled, reason), reason)
+
+        if self.action != "reject" and not over_cost:
+            reason = f"{estimate}, so only the first {self.max_rows:,} rows are returned."
+            limited = limit_sql(sql, self.max_rows)
+            return GuardDecision("limit", _with_notice(limited, reason), reason)
+
+        reason = (
+            f"The query is too expensive to run: {estimate[0].lower()}{estimate[1:]}. "
+            "Filter the rows, aggregate them, or join tables on their keys instead of "
+            "combining every row with every other row."
+        )
+        return GuardDecision("reject", sql, reason)
@@ -1,40 +1,386 @@
+import asyncio
+import contextvars
 import logging
-from typing import Dict
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Sequence
 
-import pandas as pd
 from fastapi import HTTPException
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError, SQLAlchemyError
+from sqlalchemy.orm import sessionmaker
 
 from src.config import config
-from src.db.database import create_db_connection
+from src.core.deadline import check_deadline, remaining
+from src.db.create_table import get_data_versions
+from src.db.database import (
+    create_db_connection,
+    create_replica_engines,
+    escape_driver_sql,
+    pool_options,
+)
+from src.db.replicas import Replica, ReplicaRouter
+from src.utils.cache_utils import ResultCache
+from src.utils.cost_guard import QueryCost, explain_statement, parse_plan
+from src.utils.materializers import records_from_rows
+from src.utils.metrics import (
+    CACHE_LOOKUPS,
+    DB_POOL_CHECKED_OUT,
+    DB_POOL_OVERFLOW,
+    DB_POOL_SIZE,
+    DB_QUERIES,
+    DB_REPLICA_HEALTHY,
+    span,
+)
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-class DatabaseConnector:
+class QueryCancellation:
+    """Lets the event loop cancel a query that is running on a worker thread."""
+
     def __init__(self):
-        self.engine, self.SessionLocal = create_db_connection(config.DB_PASS)
+        self.cancelled = False
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def attach(self, dbapi_connection) -> None:
+        with self._lock:
+            self._connection = dbapi_connection
+            if self.cancelled:
+                self._cancel_backend()
+
+    def detach(self) -> None:
+        with self._lock:
+            self._connection = None
+
+    def cancel(self) -> None:
+        """Cancels the running statement, or the next one if none has started yet."""
+        with self._lock:
+            self.cancelled = True
+            if self._connection is not None:
+                self._cancel_backend()
+
+    def _cancel_backend(self) -> None:
+        # psycopg2 and psycopg 3 send a cancel request to the server; sqlite3 interrupts in-process
+        cancel = getattr(self._connection, "cancel", None) or getattr(
+            self._connection, "interrupt", None
+        )
+        if cancel is None:
+            return
+        try:
+            cancel()
+        except Exception:
+            logger.exception("Failed to cancel the running query")
+
+
+# Cancellation handle of the query the current worker thread runs for an async caller
+_query_cancellation: contextvars.ContextVar[Optional[QueryCancellation]] = (
+    contextvars.ContextVar("query_cancellation", default=None)
+)
+
+
+class DatabaseConnector:
+    """
+    Runs generated queries. Reads go to the read replicas when there are any (falling back to
+    the primary when none is healthy); everything else uses the primary `engine`.
+    """
+
+    def __init__(
+        self,
+        engine: Engine = None,
+        result_cache_bytes: int = None,
+        executor_workers: int = None,
+        materializer: str = None,
+        replicas: List[Engine] = None,
+    ):
+        # Bounded pool that runs blocking pandas/DB-API work off the event loop
+        self.executor_workers = executor_workers or config.DB_EXECUTOR_WORKERS
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.executor_workers, thread_name_prefix="db-query"
+        )
+
+        if engine is None:
+            # By default one pooled connection per worker thread so queries never wait on the pool
+            self.engine, self.SessionLocal = create_db_connection(
+                config.DB_PASS,
+                **pool_options(
+                    config.DB_POOL_SIZE or self.executor_workers,
+                    config.DB_MAX_OVERFLOW,
+                    config.DB_POOL_RECYCLE,
+                    config.DB_POOL_PRE_PING,
+                ),
+            )
+            if replicas is None:
+                replicas = create_replica_engines(self.executor_workers)
+        else:
+            self.engine = engine
+            self.SessionLocal = sessionmaker(
+                autocommit=False, autoflush=False, bind=engine
+            )
+
+        self.replicas = (
+            ReplicaRouter(
+                replicas,
+                balancing=config.DB_REPLICA_BALANCING,
+                max_failures=config.DB_REPLICA_MAX_FAILURES,
+                eject_seconds=config.DB_REPLICA_EJECT_SECONDS,
+            )
+            if replicas
+            else None
+        )
+
+        # "records" converts DB-API rows directly, "pandas" goes through a DataFrame
+        self.materializer = materializer or config.DB_MATERIALIZER
+        if self.materializer not in ("records", "pandas"):
+            raise ValueError(f"Unknown materializer: {self.materializer}")
+
+        if result_cache_bytes is None:
+            result_cache_bytes = config.RESULT_CACHE_MAX_BYTES
+        self.result_cache = (
+            ResultCache(
+                max_bytes=result_cache_bytes,
+                version_source=lambda: get_data_versions(self.engine),
+                version_check_interval=config.RESULT_CACHE_VERSION_CHECK,
+            )
+            if result_cache_bytes > 0
+            else None
+        )
 
     def execute_query(self, query: str) -> Dict:
         """Executes the given SQL query and returns the results as a list of dictionaries."""
+        if self.result_cache is not None:
+            cached = self.result_cache.get(query)
+            CACHE_LOOKUPS.inc(cache="result", result="miss" if cached is None else "hit")
+            if cached is not None:
+                return cached
         try:
-            df_result = pd.read_sql_query(query, self.engine)
-            df_result = self._parse_nan_values(df_result)
-            df_result = self._parse_numeric_values(df_result)
-            return df_result.to_dict(orient="records")
+            with span("execute"), self._connect() as conn:
+                result = conn.exec_driver_sql(escape_driver_sql(conn.engine, query))
+                columns = list(result.keys())
+                description = result.cursor.description
+                rows = result.fetchall()
+            with span("postprocess"):
+                records = self._materialize(columns, description, rows)
         except SQLAlchemyError as e:
             logger.error(f"Database error: {e}")
             raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        except HTTPException:
+            raise
         except Exception:
             logger.exception("Unexpected error during query execution")
             raise HTTPException(status_code=500, detail="Error executing query.")
+        if self.result_cache is not None:
+            self.result_cache.set(query, records)
+        return records
+
+    def stream_query_batches(self, query: str, fetch_size: int = None) -> Iterator[List[Dict]]:
+        """
+        Executes the given SQL query with a server-side cursor and yields the results in batches
+        of `fetch_size` dictionaries, so memory stays flat regardless of the result size.
+        """
+        fetch_size = fetch_size or config.DB_STREAM_FETCH_SIZE
+        try:
+            with self._connect() as conn:
+                result = conn.execution_options(
+                    stream_results=True, max_row_buffer=fetch_size
+                ).exec_driver_sql(escape_driver_sql(conn.engine, query))
+                columns = list(result.keys())
+                description = result.cursor.description
+                for rows in result.partitions(fetch_size):
+                    yield self._materialize(columns, description, rows)
+        except SQLAlchemyError as e:
+            logger.error(f"Database error: {e}")
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    def stream_query(self, query: str, fetch_size: int = None) -> Iterator[Dict]:
+        """Executes the given SQL query with a server-side cursor and yields one dictionary per row."""
+        for batch in self.stream_query_batches(query, fetch_size):
+            yield from batch
+
+    def probe_query(self, query: str) -> List:
+        """Checks that the given SQL query plans and runs without fetching any rows."""
+        return self.execute_query(f"SELECT * FROM ({query}) AS probe LIMIT 0")
+
+    def explain_query(self, query: str) -> None:
+        """Checks that the database can plan the given SQL query without running it."""
+        try:
+            with self._connect() as conn:
+                conn.exec_driver_sql(escape_driver_sql(conn.engine, f"EXPLAIN {query}")).fetchall()
+        except SQLAlchemyError as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    async def explain_query_async(self, query: str) -> None:
+        """Runs `explain_query` on the connector's thread pool."""
+        return await self._run_in_executor(self.explain_query, query)
+
+    def estimate_cost(self, query: str) -> Optional[QueryCost]:
+        """
+        Plans the given SQL query without running it and returns the planner's estimates, or
+        None when the database does not report any (e.g. SQLite).
+        """
+        try:
+            with self._connect() as conn:
+                dialect = conn.engine.dialect.name
+                statement = escape_driver_sql(conn.engine, explain_statement(dialect, query))
+                rows = conn.exec_driver_sql(statement).fetchall()
+        except SQLAlchemyError as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        return parse_plan(dialect, rows, query)
+
+    async def estimate_cost_async(self, query: str) -> Optional[QueryCost]:
+        """Runs `estimate_cost` on the connector's thread pool."""
+        return await self._run_in_executor(self.estimate_cost, query)
+
+    async def probe_query_async(self, query: str) -> List:
+        """Runs `probe_query` on the connector's thread pool."""
+        return await self._run_in_executor(self.probe_query, query)
+
+    async def execute_query_async(self, query: str) -> Dict:
+        """Executes the given SQL query on the connector's thread pool without blocking the event loop."""
+        return await self._run_in_executor(self.execute_query, query)
+
+    async def _run_in_executor(self, func, *args):
+        """
+        Runs `func` on the query thread pool in a copy of the caller's context, so stage timings
+        and the deadline reach the worker. Cancelling the caller cancels the backend query.
+        """
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        cancellation = QueryCancellation()
+        context.run(_query_cancellation.set, cancellation)
+        try:
+            return await loop.run_in_executor(self._executor, context.run, func, *args)
+        except asyncio.CancelledError:
+            cancellation.cancel()
+            raise
+
+    @contextmanager
+    def _connect(self) -> Iterator[Connection]:
+        """
+        Opens a connection for one read query, on a replica when there are any: fails fast once
+        the request deadline has passed, caps PostgreSQL statements at the time left and
+        registers the connection for cancellation.
+        """
+        check_deadline()
+        cancellation = _query_cancellation.get()
+        if cancellation is not None and cancellation.cancelled:
+            raise HTTPException(status_code=499, detail="Query cancelled.")
+        replica = self.replicas.acquire() if self.replicas is not None else None
+        try:
+            with self._checkout(replica) as conn:
+                left = remaining()
+                if left is not None and conn.engine.dialect.name == "postgresql":
+                    # SET LOCAL lasts until the connection's transaction ends when it is returned
+                    conn.exec_driver_sql(
+                        f"SET LOCAL statement_timeout = {max(int(left * 1000), 1)}"
+                    )
+                if cancellation is not None:
+                    cancellation.attach(conn.connection.dbapi_connection)
+                try:
+                    yield conn
+                except DBAPIError as e:
+                    if replica is not None and e.connection_invalidated:
+                        self.replicas.record_failure(replica)
+                    raise
+                finally:
+                    if cancellation is not None:
+                        cancellation.detach()
+        finally:
+            if replica is not None:
+                self.replicas.release(replica)
+
+    def _checkout(self, replica: Optional[Replica]) -> Connection:
+        """Connects to `replica`, or to the primary when there is none or it cannot be reached."""
+        if replica is not None:
+            try:
+                conn = replica.engine.connect()
+            except SQLAlchemyError as e:
+                self.replicas.record_failure(replica)
+                logger.warning(f"Cannot connect to {replica.name}, using the primary: {e}")
+            else:
+                self.replicas.record_success(replica)
+                DB_QUERIES.inc(engine=replica.name)
+                return conn
+        DB_QUERIES.inc(engine="primary")
+        return self.engine.connect()
+
+    def ping(self) -> None:
+        """Opens a pooled connection and runs a trivial query; raises if the database is unreachable."""
+        with self.engine.connect() as conn:
+            conn.exec_driver_sql("SELECT 1").fetchall()
+
+    async def ping_async(self) -> None:
+        """Runs `ping` on the connector's thread pool."""
+        return await self._run_in_executor(self.ping)
+
+    def close(self):
+        """Shuts down the query thread pool and disposes the engines' connections."""
+        self._executor.shutdown(wait=True)
+        self.engine.dispose()
+        if self.replicas is not None:
+            for replica in self.replicas.replicas:
+                replica.engine.dispose()
+
+    def pool_stats(self) -> List[Dict]:
+        """Returns connection pool usage of the primary and each replica."""
+        engines = [("primary", self.engine, True, 0)]
+        if self.replicas is not None:
+            engines += [
+                (replica["name"], state.engine, replica["healthy"], replica["in_flight"])
+                for replica, state in zip(self.replicas.stats(), self.replicas.replicas)
+            ]
+        stats = []
+        for name, engine, healthy, in_flight in engines:
+            pool = engine.pool
+            entry = {"engine": name, "healthy": healthy, "in_flight": in_flight}
+            # Queue pools report usage; single-connection pools such as in-memory SQLite do not
+            if hasattr(pool, "checkedout"):
+                entry.update(
+                    size=pool.size(), checked_out=pool.checkedout(), overflow=pool.overflow()
+                )
+            stats.append(entry)
+        return stats
+
+    def update_pool_metrics(self) -> None:
+        """Copies the current pool usage into the pool gauges."""
+        for entry in self.pool_stats():
+            name = entry["engine"]
+            DB_REPLICA_HEALTHY.set(int(entry["healthy"]), engine=name)
+            if "size" in entry:
+                DB_POOL_SIZE.set(entry["size"], engine=name)
+                DB_POOL_CHECKED_OUT.set(entry["checked_out"], engine=name)
+                DB_POOL_OVERFLOW.set(entry["overflow"], engine=name)
+
+    def cache_stats(self) -> Dict:
+        """Returns hit/miss counters of the result cache."""
+        return self.result_cache.stats() if self.result_cache is not None else {}
+
+    def _materialize(
+        self, columns: List[str], description: Sequence, rows: Sequence
+    ) -> List[Dict]:
+        """Converts fetched DB-API rows to dictionaries with the configured materializer."""
+        if self.materializer == "records":
+            return records_from_rows(columns, description, rows)
+
+        import pandas as pd
+
+        df_result = pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+        # Round before filling NaNs, which would turn numeric columns into objects
+        df_result = self._parse_numeric_values(df_result)
+        df_result = self._parse_nan_values(df_result)
+        return df_result.to_dict(orient="records")
 
-    def _parse_nan_values(self, dataframe: pd.DataFrame) -> pd.DataFrame:
+    def _parse_nan_values(self, dataframe: "pd.DataFrame") -> "pd.DataFrame":
         """Replaces NaN values in the DataFrame with empty strings."""
         return dataframe.fillna("")
 
-    def _parse_numeric_values(self, dataframe: pd.DataFrame) -> pd.DataFrame:
+    def _parse_numeric_values(self, dataframe: "pd.DataFrame") -> "pd.DataFrame":
         """Rounds numeric values in the DataFrame to 2 decimal places."""
         for column in dataframe.select_dtypes(include=["number"]).columns:
             dataframe[column] = dataframe[column].round(2)
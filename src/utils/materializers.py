@@ -0,0 +1,69 @@
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional, Sequence
+
+# PostgreSQL type OIDs reported by psycopg2 for float4, float8 and numeric columns
+_FLOAT_TYPE_CODES = {700, 701, 1700}
+_FLOAT_TYPE_NAMES = ("FLOAT", "DOUBLE", "REAL", "DECIMAL", "NUMERIC")
+_NON_FLOAT_TYPE_CODES = {16, 20, 21, 23, 25, 1042, 1043, 1082, 1114, 1184}
+
+
+def _is_float_type(type_code) -> Optional[bool]:
+    """Returns whether a cursor description type code is a float type, or None when unknown."""
+    if not isinstance(type_code, (int, str)) and type_code is not None:
+        # e.g. DuckDB reports type objects whose string form is the SQL type name
+        type_code = str(type_code)
+    if type_code in _FLOAT_TYPE_CODES:
+        return True
+    if type_code in _NON_FLOAT_TYPE_CODES:
+        return False
+    if isinstance(type_code, str):
+        return type_code.upper().startswith(_FLOAT_TYPE_NAMES)
+    return None
+
+
+def _convert_plain(value):
+    return "" if value is None else value
+
+
+def _convert_float(value):
+    if value is None or value != value:
+        return ""
+    return round(float(value), 2)
+
+
+def _convert_unknown(value):
+    if value is None:
+        return ""
+    if isinstance(value, (float, Decimal)):
+        return "" if value != value else round(float(value), 2)
+    return value
+
+
+def column_converters(description: Optional[Sequence], width: int) -> List[Callable]:
+    """
+    Picks a converter per column from DB-API cursor description metadata: float columns are
+    rounded to 2 decimal places, NULLs become empty strings, and columns whose type the driver
+    does not report fall back to a per-value check.
+    """
+    if not description:
+        return [_convert_unknown] * width
+    converters = []
+    for column in description:
+        is_float = _is_float_type(column[1])
+        if is_float is None:
+            converters.append(_convert_unknown)
+        else:
+            converters.append(_convert_float if is_float else _convert_plain)
+    return converters
+
+
+def records_from_rows(
+    columns: List[str], description: Optional[Sequence], rows: Sequence
+) -> List[Dict]:
+    """Converts DB-API rows straight to a list of dictionaries without going through pandas."""
+    converters = column_converters(description, len(columns))
+    return [
+        dict(zip(columns, [convert(value) for convert, value in zip(converters, row)]))
+        for row in rows
+    ]
+
@@ -0,0 +1,307 @@
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Default latency buckets in seconds, from sub-millisecond local work up to slow LLM calls
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+    30.0, 60.0,
+)
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames: Sequence[str], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, optionally split by labels."""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(
+                    f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                )
+        return lines
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, such as a queue depth."""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(
+                    f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                )
+        return lines
+
+
+class Histogram(_Metric):
+    """Distribution of observed values over fixed cumulative buckets."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last one is +Inf), sum, count]
+        self._values: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds the process metrics and renders them in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric):
+                    raise ValueError(f"Metric {metric.name} is already registered")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "nl2sql_stage_duration_seconds", "Time spent in each pipeline stage.", ["stage"]
+)
+GENERATION_ATTEMPTS = REGISTRY.counter(
+    "nl2sql_generation_attempts_total", "SQL generation attempts, including corrections."
+)
+ATTEMPT_FAILURES = REGISTRY.counter(
+    "nl2sql_attempt_failures_total",
+    "Generation attempts that failed, by the stage that rejected them.",
+    ["reason"],
+)
+ATTEMPTS_PER_REQUEST = REGISTRY.histogram(
+    "nl2sql_attempts_per_request",
+    "Generation attempts needed per question.",
+    buckets=(0, 1, 2, 3),
+)
+SPECULATIVE_CANDIDATES = REGISTRY.counter(
+    "nl2sql_speculative_candidates_total",
+    "Speculative SQL candidates by outcome (won, failed or cancelled).",
+    ["outcome"],
+)
+REQUEST_FAILURES = REGISTRY.counter(
+    "nl2sql_request_failures_total", "Questions that failed after every attempt."
+)
+CACHE_LOOKUPS = REGISTRY.counter(
+    "nl2sql_cache_lookups_total", "Cache lookups by cache and outcome.", ["cache", "result"]
+)
+ROWS_RETURNED = REGISTRY.counter("nl2sql_rows_returned_total", "Result rows returned.")
+PROMPT_CHARS = REGISTRY.histogram(
+    "nl2sql_prompt_chars",
+    "Size of the prompts sent to the LLM in characters.",
+    buckets=(500, 1000, 2000, 4000, 8000, 16000, 32000, 64000),
+)
+RESULT_ROWS = REGISTRY.histogram(
+    "nl2sql_result_rows",
+    "Rows per query result.",
+    buckets=(0, 1, 10, 100, 1000, 10_000, 100_000, 1_000_000),
+)
+LLM_QUEUE_DEPTH = REGISTRY.gauge(
+    "nl2sql_llm_queue_depth", "LLM calls waiting for admission."
+)
+LLM_IN_FLIGHT = REGISTRY.gauge("nl2sql_llm_in_flight", "LLM calls currently admitted.")
+LLM_QUEUE_WAIT_SECONDS = REGISTRY.histogram(
+    "nl2sql_llm_queue_wait_seconds",
+    "Time LLM calls waited for admission, by priority.",
+    ["priority"],
+)
+LLM_ADMISSION_REJECTIONS = REGISTRY.counter(
+    "nl2sql_llm_admission_rejections_total",
+    "LLM calls turned away by admission control (queue_full, rate_limited or timeout).",
+    ["reason"],
+)
+COST_GUARD_ACTIONS = REGISTRY.counter(
+    "nl2sql_cost_guard_actions_total",
+    "Generated queries by what the cost guard did (allow, limit, sample or reject).",
+    ["action"],
+)
+DB_QUERIES = REGISTRY.counter(
+    "nl2sql_db_queries_total", "Queries run, by engine (primary or replica-N).", ["engine"]
+)
+DB_POOL_SIZE = REGISTRY.gauge(
+    "nl2sql_db_pool_size", "Configured connection pool size, by engine.", ["engine"]
+)
+DB_POOL_CHECKED_OUT = REGISTRY.gauge(
+    "nl2sql_db_pool_checked_out", "Pooled connections in use, by engine.", ["engine"]
+)
+DB_POOL_OVERFLOW = REGISTRY.gauge(
+    "nl2sql_db_pool_overflow",
+    "Connections open beyond the pool size (negative while the pool is not full), by engine.",
+    ["engine"],
+)
+DB_REPLICA_HEALTHY = REGISTRY.gauge(
+    "nl2sql_db_engine_healthy", "Whether an engine is in rotation (1) or ejected (0).", ["engine"]
+)
+
+# Stage durations of the request being handled, for the Server-Timing header
+_request_timings: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar(
+    "request_timings", default=None
+)
+
+
+def start_request_timings() -> Dict[str, float]:
+    """Starts collecting stage durations for the current request and returns the collection."""
+    timings: Dict[str, float] = {}
+    _request_timings.set(timings)
+    return timings
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Times a pipeline stage into the stage histogram and the current request's timings."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + elapsed
+
+
+def server_timing_header(timings: Dict[str, float]) -> str:
+    """Formats stage durations as a Server-Timing header value (durations in milliseconds)."""
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items())
@@ -1,4 +1,4 @@
-TEXT_TO_SQL_RULES = """
+CORE_SQL_RULES = """
 #### SQL RULES ####
 - ONLY USE SELECT statements, NO DELETE, UPDATE OR INSERT etc. statements that might change the data in the database.
 - ONLY USE the tables and columns mentioned in the database schema.
@@ -97,6 +97,10 @@ TEXT_TO_SQL_RULES = """
     - `=`
     - `<>`
     - `!=`
+"""
+
+# Only sent when the selected schema has JSON columns
+JSON_SQL_RULES = """
 - ONLY USE JSON_QUERY for querying fields if "json_type":"JSON" is identified in the columns comment, NOT the deprecated JSON_EXTRACT_SCALAR function.
     - DON'T USE CAST for JSON fields, ONLY USE the following funtions:
       - LAX_BOOL for boolean fields
@@ -132,66 +136,13 @@ TEXT_TO_SQL_RULES = """
 - DON'T USE LAX_BOOL, LAX_FLOAT64, LAX_INT64, LAX_STRING when "json_type":"".
 """
 
+TEXT_TO_SQL_RULES = CORE_SQL_RULES + JSON_SQL_RULES
+
 background_for_context = """
 The U.S. Department of Transportation's (DOT) Bureau of Transportation Statistics tracks the on-time performance of domestic flights operated by large air carriers. 
 Summary information on the number of on-time, delayed, canceled, and diverted flights is published in DOT's monthly Air Travel Consumer Report and in this dataset of 2015 flight delays and cancellations.
 """
 
-airlines_prompt = """
-airlines table: This table provides a information about IATA codes and their full names.
-Columns:
-iata_code: Two-letter IATA code assigned to the airline.
-airline: Full name of the airline.
-"""
-
-airports_prompt = """
-airports table: This table contains information about various airports, including their locations.
-Columns:
-iata_code: Three-letter IATA airport code.
-airport: Name of the airport.
-city: City where the airport is located.
-state: State where the airport is located.
-country: Country where the airport is located.
-latitude: Geographical latitude of the airport.
-longitude: Geographical longitude of the airport.
-"""
-
-flights_prompt = """
-flights table: This table contains comprehensive details of individual flight records for the year 2015.
-Columns:
-year: Year of the flight (2015).
-month: Month of the flight (1–12).
-day: Day of the month (1–31).
-day_of_week: Day of the week (1=Monday, 7=Sunday).
-airline: Two-letter IATA code of the airline.
-flight_number: Flight number.
-tail_number: Aircraft's tail number.
-origin_airport: IATA code of the origin airport.
-destination_airport: IATA code of the destination airport.
-scheduled_departure: Scheduled departure time (HHMM, local time).
-departure_time: Actual departure time (HHMM, local time).
-departure_delay: Difference in minutes between scheduled and actual departure times.
-taxi_out: Taxi-out time in minutes.
-wheels_off: Time when the aircraft's wheels leave the ground (HHMM, local time).
-scheduled_time: Scheduled flight time in minutes.
-elapsed_time: Actual flight time in minutes.
-air_time: Time spent in the air in minutes.
-distance: Distance between airports in miles.
-wheels_on: Time when the aircraft's wheels touch the ground (HHMM, local time).
-taxi_in: Taxi-in time in minutes.
-scheduled_arrival: Scheduled arrival time (HHMM, local time).
-arrival_time: Actual arrival time (HHMM, local time).
-arrival_delay: Difference in minutes between scheduled and actual arrival times.
-diverted: Indicates if the flight was diverted (1=yes, 0=no).
-cancelled: Indicates if the flight was canceled (1=yes, 0=no).
-cancellation_reason: Reason for cancellation (A=Airline/Carrier, B=Weather, C=National Air System, D=Security).
-air_system_delay: Delay due to air traffic control in minutes.
-security_delay: Delay caused by security issues in minutes.
-airline_delay: Delay caused by the airline in minutes.
-late_aircraft_delay: Delay due to a previous flight with the same aircraft arriving late, causing the present flight to depart late in minutes.
-weather_delay: Delay caused by weather conditions in minutes.
-"""
-
 
 sql_generation_system_prompt = f"""
 You are a helpful assistant that converts natural language queries into ANSI SQL queries.
@@ -202,14 +153,7 @@ You are a helpful assistant that converts natural language queries into ANSI SQL
 
 ###Database Schema###
 
-The database contains three tables: airlines, airports and flights. The detail are as follows:
-
-{airlines_prompt}
-
-{airports_prompt}
-
-{flights_prompt}
-
+The database contains three tables: airlines, airports and flights. The part of the schema relevant to the user's question is given along with the question.
 
 Given user's question, database schema, etc., you should think deeply and carefully and generate the SQL query based on the given reasoning plan step by step.
 Also be aware when using where clause to values they might be case sensitive as well.
@@ -222,7 +166,7 @@ Also, if users asks no related questions, then simply reply, I am only able to a
 <user>: what was the sales today?
 <response> Hello, I am Text2SQL assitant, I am only trained to answer flight related query. format like "SELECT 'Hello, I am Text2SQL assitant, I am only trained to answer flight related query;'" use single quotes!!
 
-{TEXT_TO_SQL_RULES}
+{CORE_SQL_RULES}
 
 ### FINAL ANSWER FORMAT ###
 The final answer must be a ANSI SQL query in JSON format. Strictly provide the output, no explanation details or summarizing.
@@ -232,12 +176,23 @@ The final answer must be a ANSI SQL query in JSON format. Strictly provide the o
 }}
 """
 
+sql_generation_user_prompt = """
+### DATABASE SCHEMA ###
+{schema}
+{extra_rules}
+### QUESTION ###
+{user_query}
+"""
+
 sql_correction_prompt = """
 ### TASK ###
 You are an ANSI SQL expert with exceptional logical thinking skills and debugging skills.
 
 Now you are given syntactically incorrect ANSI SQL query and related error message, please generate the syntactically correct ANSI SQL query without changing original semantics.
 
+### DATABASE SCHEMA ###
+{schema}
+
 ### QUESTION ###
 SQL query asked by user: {user_query}
 GENERATED SQL: {generated_sql}
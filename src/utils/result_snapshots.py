@@ -0,0 +1,212 @@
+import gzip
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ResultSnapshot:
+    """An executed result stored column-wise as (columns, rows) so it can be paged later."""
+
+    id: Optional[str]
+    question: str
+    sql: str
+    columns: List[str]
+    rows: List[list]
+    expires_at: float
+    # Sorted row orders already computed for (column, descending)
+    _orders: Dict[Tuple[str, bool], List[int]] = field(default_factory=dict, repr=False)
+
+    @property
+    def total(self) -> int:
+        return len(self.rows)
+
+    def page(
+        self, offset: int = 0, limit: int = 15, sort: str = None, descending: bool = False
+    ) -> List[Dict]:
+        """Returns `limit` rows from `offset` as dictionaries, optionally ordered by `sort`."""
+        if sort is None:
+            selected = self.rows[offset : offset + limit]
+        else:
+            order = self._order(sort, descending)
+            selected = [self.rows[index] for index in order[offset : offset + limit]]
+        return [dict(zip(self.columns, row)) for row in selected]
+
+    def _order(self, column: str, descending: bool) -> List[int]:
+        key = (column, descending)
+        order = self._orders.get(key)
+        if order is None:
+            position = self.columns.index(column)
+            values = [row[position] for row in self.rows]
+            # Empty values (NULLs) always go last, numbers sort before text
+            present = [index for index, value in enumerate(values) if value not in ("", None)]
+            missing = [index for index, value in enumerate(values) if value in ("", None)]
+            present.sort(
+                key=lambda index: (
+                    isinstance(values[index], str),
+                    values[index] if not isinstance(values[index], bool) else int(values[index]),
+                ),
+                reverse=descending,
+            )
+            order = self._orders[key] = present + missing
+        return order
+
+
+def _snapshot_size(columns: List[str], rows: List[list]) -> int:
+    return len(json.dumps([columns, rows], default=str, separators=(",", ":")))
+
+
+class SnapshotStore:
+    """
+    Keeps executed results for `ttl` seconds under a random ID so they can be paged and sorted
+    without asking the question again. Snapshots live in an in-process LRU bounded by
+    `max_bytes`; with a `directory` they are also written there as gzipped JSON, which lets
+    them outlive memory evictions and restarts. Expired files are swept at most once every
+    `sweep_interval` seconds (by default a tenth of the TTL, at most a minute).
+
+    Creating and reading snapshots serializes whole results and touches the disk, so async
+    callers should run them in a worker thread.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 3600,
+        max_bytes: int = 64 * 1024 * 1024,
+        directory: str = None,
+        sweep_interval: float = None,
+    ):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.sweep_interval = min(ttl / 10, 60.0) if sweep_interval is None else sweep_interval
+        self._next_sweep = 0.0
+        self._data: "OrderedDict[str, Tuple[ResultSnapshot, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def create(self, question: str, sql: str, records: List[Dict]) -> ResultSnapshot:
+        """
+        Stores `records` and returns the new snapshot. A result too large to keep in memory,
+        with no directory to write it to, is not stored, and its snapshot has no ID.
+        """
+        columns = list(records[0].keys()) if records else []
+        rows = [list(record.values()) for record in records]
+        snapshot = ResultSnapshot(
+            id=secrets.token_urlsafe(12),
+            question=question,
+            sql=sql,
+            columns=columns,
+            rows=rows,
+            expires_at=time.time() + self.ttl,
+        )
+        size = _snapshot_size(columns, rows)
+        if self.directory:
+            self._write(snapshot)
+            self._sweep_if_due()
+        if size <= self.max_bytes:
+            self._remember(snapshot, size)
+        elif not self.directory:
+            logger.warning(f"Result of {size} bytes is too large to snapshot in memory")
+            snapshot.id = None
+        return snapshot
+
+    def get(self, snapshot_id: str) -> Optional[ResultSnapshot]:
+        """Returns the snapshot with `snapshot_id`, or None when it is unknown or expired."""
+        with self._lock:
+            item = self._data.get(snapshot_id)
+            if item is not None:
+                if item[0].expires_at < time.time():
+                    self._pop(snapshot_id)
+                    return None
+                self._data.move_to_end(snapshot_id)
+                return item[0]
+        if not self.directory:
+            return None
+        snapshot = self._read(snapshot_id)
+        if snapshot is not None:
+            size = _snapshot_size(snapshot.columns, snapshot.rows)
+            if size <= self.max_bytes:
+                self._remember(snapshot, size)
+        return snapshot
+
+    def _remember(self, snapshot: ResultSnapshot, size: int) -> None:
+        with self._lock:
+            if snapshot.id in self._data:
+                self._pop(snapshot.id)
+            self._data[snapshot.id] = (snapshot, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                self._pop(next(iter(self._data)))
+
+    def _pop(self, snapshot_id: str) -> None:
+        _, size = self._data.pop(snapshot_id)
+        self.current_bytes -= size
+
+    def _path(self, snapshot_id: str) -> str:
+        return os.path.join(self.directory, f"{snapshot_id}.json.gz")
+
+    def _write(self, snapshot: ResultSnapshot) -> None:
+        payload = {
+            "question": snapshot.question,
+            "sql": snapshot.sql,
+            "columns": snapshot.columns,
+            "rows": snapshot.rows,
+            "expires_at": snapshot.expires_at,
+        }
+        temporary = self._path(snapshot.id) + ".tmp"
+        with gzip.open(temporary, "wt", encoding="utf-8") as f:
+            json.dump(payload, f, default=str, separators=(",", ":"))
+        os.replace(temporary, self._path(snapshot.id))
+
+    def _read(self, snapshot_id: str) -> Optional[ResultSnapshot]:
+        # IDs come from URLs; only ever open files this store could have written
+        if not snapshot_id.replace("-", "").replace("_", "").isalnum():
+            return None
+        path = self._path(snapshot_id)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                payload = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if payload["expires_at"] < time.time():
+            self._remove(path)
+            return None
+        return ResultSnapshot(id=snapshot_id, **payload)
+
+    def _sweep_if_due(self) -> None:
+        now = time.time()
+        with self._lock:
+            if now < self._next_sweep:
+                return
+            self._next_sweep = now + self.sweep_interval
+        self._remove_expired_files()
+
+    def _remove_expired_files(self) -> None:
+        now = time.time()
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if name.endswith(".json.gz") and os.path.getmtime(path) + self.ttl < now:
+                    self._remove(path)
+            except OSError:
+                continue
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._data), "bytes": self.current_bytes}
@@ -0,0 +1,151 @@
+import re
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import JSON, Table
+
+from src.db.create_table import Base
+
+# Words too common in questions or column comments to signal relevance
+_STOPWORDS = {
+    "a", "an", "the", "of", "in", "on", "for", "to", "from", "by", "with", "and", "or",
+    "is", "are", "was", "were", "be", "what", "which", "who", "how", "many", "much",
+    "me", "show", "give", "list", "find", "get", "there", "that", "this", "than", "each",
+    "per", "all", "any", "do", "does", "did", "has", "have", "had", "at", "as", "it",
+    "its", "most", "least", "top", "number", "total", "average", "count", "time",
+    "minutes", "local", "hhmm", "yes", "no", "between", "table", "record", "records",
+}
+# Phrases asking for every column of a table
+_ALL_COLUMNS_RE = re.compile(r"\b(all (the )?(columns|fields|details|information)|everything|details)\b")
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def _stem(word: str) -> str:
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def tokenize(value: str) -> Set[str]:
+    """Splits text into lower-cased, crudely stemmed words without stopwords."""
+    return {
+        _stem(word)
+        for word in _WORD_RE.findall(value.lower().replace("_", " "))
+        if word not in _STOPWORDS
+    }
+
+
+def _visible_columns(table: Table) -> list:
+    return [column for column in table.columns if not column.info.get("hidden")]
+
+
+def render_table_prompt(table: Table, columns: Optional[List[str]] = None) -> str:
+    """Renders the schema description of a table from its model comments."""
+    lines = [f"{table.name} table: {table.comment or ''}".rstrip(), "Columns:"]
+    for column in _visible_columns(table):
+        if columns is None or column.name in columns:
+            lines.append(f"{column.name}: {column.comment or ''}".rstrip())
+    return "\n".join(lines)
+
+
+def render_schema_prompt(selection: Optional[Dict[str, Optional[List[str]]]] = None) -> str:
+    """
+    Renders the schema section of the prompt. `selection` maps table names to the columns
+    to include (None for all of them); without a selection every table is rendered.
+    """
+    tables = Base.metadata.tables
+    if selection is None:
+        selection = {
+            table.name: None for table in Base.metadata.sorted_tables if table.comment
+        }
+    return "\n\n".join(
+        render_table_prompt(tables[name], columns) for name, columns in selection.items()
+    )
+
+
+class SchemaSelector:
+    """
+    Picks the tables and columns a question needs with a local keyword-overlap relevance step,
+    so the prompt only carries the relevant part of the schema.
+
+    A table is selected when the question mentions its name, one of its `keywords` or one of
+    its columns; tables referenced by a selected table's join columns are selected too so the
+    model can still join to them. Tables wider than `min_columns` are narrowed to their key,
+    `core` and mentioned columns unless the question asks for all of them.
+    """
+
+    def __init__(self, min_columns: int = 10, metadata=Base.metadata):
+        self.min_columns = min_columns
+        self.tables = {
+            table.name: table for table in metadata.sorted_tables if table.comment
+        }
+        self._table_tokens = {
+            name: tokenize(name) | {_stem(word) for word in table.info.get("keywords", [])}
+            for name, table in self.tables.items()
+        }
+        self._column_tokens = {
+            name: {
+                column.name: tokenize(column.name) | tokenize(column.comment or "")
+                for column in _visible_columns(table)
+            }
+            for name, table in self.tables.items()
+        }
+        self._column_name_tokens = {
+            name: {column.name: tokenize(column.name) for column in _visible_columns(table)}
+            for name, table in self.tables.items()
+        }
+        # Table-level words ("flight", "airport") say which tables, not which columns
+        self._all_table_tokens = set().union(*self._table_tokens.values())
+
+    def select(self, question: str) -> Dict[str, Optional[List[str]]]:
+        """Returns a mapping of relevant table names to their relevant columns (None for all)."""
+        question_tokens = tokenize(question)
+        column_tokens = question_tokens - self._all_table_tokens
+        selected: Set[str] = set()
+        for name in self.tables:
+            mentions_column = any(
+                tokens & column_tokens
+                for tokens in self._column_name_tokens[name].values()
+            )
+            if self._table_tokens[name] & question_tokens or mentions_column:
+                selected.add(name)
+
+        if not selected:
+            return {name: None for name in self.tables}
+
+        # Keep joins possible: pull in the tables referenced by selected tables
+        for name in list(selected):
+            for column in _visible_columns(self.tables[name]):
+                reference = column.info.get("references")
+                if reference:
+                    selected.add(reference.split(".")[0])
+
+        wants_all = bool(_ALL_COLUMNS_RE.search(question.lower()))
+        selection = {}
+        for name in self.tables:
+            if name not in selected:
+                continue
+            table = self.tables[name]
+            columns = _visible_columns(table)
+            if wants_all or len(columns) <= self.min_columns:
+                selection[name] = None
+                continue
+            selection[name] = [
+                column.name
+                for column in columns
+                if column.primary_key
+                or column.info.get("core")
+                or column.info.get("references")
+                or self._column_tokens[name][column.name] & column_tokens
+            ]
+        return selection
+
+    def has_json_columns(self, selection: Dict[str, Optional[List[str]]]) -> bool:
+        """Returns whether any selected column is a JSON column, which needs the JSON rules."""
+        return any(
+            isinstance(column.type, JSON)
+            for name, columns in selection.items()
+            for column in _visible_columns(self.tables[name])
+            if columns is None or column.name in columns
+        )
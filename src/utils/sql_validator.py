@@ -0,0 +1,460 @@
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set
+
+from src.db.create_table import Base
+from src.utils.prompts import TEXT_TO_SQL_RULES
+
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<space>\s+)
+    |(?P<comment>--[^\n]*|/\*.*?\*/)
+    |(?P<string>(?:[EeNn])?'(?:[^']|'')*')
+    |(?P<quoted>"(?:[^"]|"")*")
+    |(?P<number>\d+(?:\.\d*)?(?:[eE][+-]?\d+)?|\.\d+)
+    |(?P<word>[A-Za-z_][A-Za-z0-9_$]*)
+    |(?P<op>::|<=|>=|<>|!=|\|\||[(),.;*+\-/<>=%\[\]])
+    |(?P<other>.)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+_FORBIDDEN_KEYWORDS = {
+    "INSERT", "UPDATE", "DELETE", "MERGE", "UPSERT", "DROP", "ALTER", "CREATE", "TRUNCATE",
+    "GRANT", "REVOKE", "COPY", "CALL", "DO", "EXECUTE", "VACUUM", "ANALYZE", "REINDEX",
+    "CLUSTER", "LOCK", "INTO", "COMMENT", "SECURITY", "LISTEN", "NOTIFY", "PREPARE",
+}
+
+_KEYWORDS = {
+    "SELECT", "FROM", "WHERE", "GROUP", "BY", "ORDER", "HAVING", "LIMIT", "OFFSET", "JOIN",
+    "INNER", "LEFT", "RIGHT", "FULL", "OUTER", "CROSS", "NATURAL", "LATERAL", "ON", "USING",
+    "AS", "AND", "OR", "NOT", "IN", "IS", "NULL", "LIKE", "ILIKE", "SIMILAR", "ESCAPE",
+    "BETWEEN", "CASE", "WHEN", "THEN", "ELSE", "END", "DISTINCT", "ASC", "DESC", "UNION",
+    "ALL", "EXCEPT", "INTERSECT", "WITH", "RECURSIVE", "TRUE", "FALSE", "EXISTS", "ANY",
+    "SOME", "OVER", "PARTITION", "ROWS", "RANGE", "PRECEDING", "FOLLOWING", "UNBOUNDED",
+    "CURRENT", "ROW", "NULLS", "FIRST", "LAST", "FETCH", "NEXT", "ONLY", "FILTER", "WINDOW",
+    "TIMESTAMP", "TIME", "ZONE", "DATE", "INTERVAL", "WITHOUT", "INTEGER", "INT", "BIGINT",
+    "SMALLINT", "NUMERIC", "DECIMAL", "FLOAT", "REAL", "DOUBLE", "PRECISION", "VARCHAR",
+    "CHAR", "CHARACTER", "VARYING", "TEXT", "BOOLEAN", "YEAR", "MONTH", "DAY", "HOUR",
+    "MINUTE", "SECOND", "DOW", "ISODOW", "DOY", "EPOCH", "QUARTER", "WEEK", "CENTURY",
+    "DECADE", "CURRENT_DATE", "CURRENT_TIME", "CURRENT_TIMESTAMP", "LEADING", "TRAILING",
+    "BOTH", "FOR", "UNNEST", "ARRAY",
+}
+
+# Keywords that may directly precede "(" without being a function call
+_PAREN_KEYWORDS = {
+    "IN", "EXISTS", "ANY", "SOME", "ALL", "OVER", "AS", "FROM", "JOIN", "ON", "WHERE",
+    "AND", "OR", "NOT", "SELECT", "WHEN", "THEN", "ELSE", "BY", "HAVING", "USING", "WITH",
+    "UNION", "EXCEPT", "INTERSECT", "LATERAL", "VALUES", "ARRAY", "IS", "BETWEEN", "CASE",
+    "LIMIT", "OFFSET", "DISTINCT", "RETURNING", "FILTER",
+}
+
+# Type names that take a length or precision, e.g. NUMERIC(10, 2)
+_TYPE_NAMES = {
+    "NUMERIC", "DECIMAL", "VARCHAR", "CHAR", "CHARACTER", "TIMESTAMP", "TIME", "FLOAT",
+    "INTEGER", "INT", "BIGINT", "SMALLINT", "TEXT", "DATE", "BOOLEAN", "REAL", "DOUBLE",
+}
+
+# Keywords that end a FROM list, or may follow an alias in its place
+_CLAUSE_KEYWORDS = {
+    "WHERE", "GROUP", "ORDER", "HAVING", "LIMIT", "OFFSET", "UNION", "EXCEPT", "INTERSECT",
+    "WINDOW", "FETCH",
+}
+_AFTER_ALIAS_KEYWORDS = _CLAUSE_KEYWORDS | {
+    "FROM", "JOIN", "ON", "USING", "INNER", "LEFT", "RIGHT", "FULL", "CROSS", "NATURAL",
+}
+
+# Functions whose arguments use FROM/IN as separators rather than clauses
+_SPECIAL_FORM_FUNCTIONS = {"EXTRACT", "SUBSTRING", "TRIM", "POSITION", "OVERLAY"}
+
+# Standard constructs the rules rely on without listing them as functions
+EXTRA_ALLOWED_FUNCTIONS = {
+    "CAST", "COALESCE", "NULLIF", "ROW_NUMBER", "RANK", "DENSE_RANK", "LAG", "LEAD",
+    "UNNEST",
+}
+
+
+def _allowed_functions_from_rules(rules: str) -> Set[str]:
+    """Parses the function names listed under "ONLY USE the following SQL keywords" in the rules."""
+    section = rules.split("ONLY USE the following SQL keywords", 1)[-1]
+    section = section.split("- operators:", 1)[0]
+    return set(re.findall(r"^\s+- ([A-Z_]+)\s*$", section, re.MULTILINE))
+
+
+ALLOWED_FUNCTIONS = _allowed_functions_from_rules(TEXT_TO_SQL_RULES) | EXTRA_ALLOWED_FUNCTIONS
+
+
+@dataclass
+class SQLValidationError:
+    code: str
+    message: str
+    position: Optional[int] = None
+
+    def __str__(self) -> str:
+        return f"[{self.code}] {self.message}"
+
+
+@dataclass
+class _Token:
+    kind: str
+    value: str
+    position: int
+
+    @property
+    def upper(self) -> str:
+        return self.value.upper()
+
+    @property
+    def identifier(self) -> str:
+        return self.value[1:-1].replace('""', '"') if self.kind == "quoted" else self.value.lower()
+
+
+def tokenize_sql(sql: str) -> List[_Token]:
+    """Splits SQL into tokens, dropping whitespace and comments."""
+    return [
+        _Token(match.lastgroup, match.group(), match.start())
+        for match in _TOKEN_RE.finditer(sql)
+        if match.lastgroup not in ("space", "comment")
+    ]
+
+
+def _is_name(token: _Token) -> bool:
+    return token.kind == "quoted" or (token.kind == "word" and token.upper not in _KEYWORDS)
+
+
+def _in_alias_position(tokens: List[_Token], index: int) -> bool:
+    """Whether the word at `index` is used as an alias or a qualifier, e.g. "flights do"."""
+    previous = tokens[index - 1] if index else None
+    following = tokens[index + 1] if index + 1 < len(tokens) else None
+    if previous is None:
+        return False
+    if previous.upper == "AS" or previous.value == "." or (
+        following is not None and following.value == "."
+    ):
+        return True
+    ends_expression = _is_name(previous) or previous.kind in ("number", "string") or (
+        previous.value == ")"
+    )
+    return ends_expression and (
+        following is None
+        or following.value in (",", ")")
+        or following.upper in _AFTER_ALIAS_KEYWORDS
+    )
+
+
+class SQLValidator:
+    """
+    Fast local checks for generated SQL, run before the query reaches the database.
+
+    Enforces a single read-only SELECT statement, checks referenced tables and qualified
+    columns against the SQLAlchemy models and function calls against the allowed-function
+    list in TEXT_TO_SQL_RULES. Unqualified columns are only checked when every relation in
+    the query is a model table, since CTEs and subqueries can define arbitrary columns.
+    """
+
+    def __init__(self, metadata=Base.metadata, allowed_functions: Set[str] = None):
+        self.columns: Dict[str, Set[str]] = {
+            table.name: {column.name for column in table.columns}
+            for table in metadata.sorted_tables
+            if table.comment
+        }
+        self.allowed_functions = allowed_functions or ALLOWED_FUNCTIONS
+
+    def validate(self, sql: str) -> List[SQLValidationError]:
+        tokens = tokenize_sql(sql)
+        while tokens and tokens[-1].value == ";":
+            tokens.pop()
+        if not tokens:
+            return [SQLValidationError("empty", "The SQL query is empty.")]
+
+        errors = self._check_statement(tokens)
+        if errors:
+            return errors
+        errors = self._check_parentheses(tokens)
+        if errors:
+            return errors
+        return self._check_references(tokens)
+
+    def _check_statement(self, tokens: List[_Token]) -> List[SQLValidationError]:
+        errors = []
+        for token in tokens:
+            if token.value == ";":
+                errors.append(
+                    SQLValidationError(
+                        "multiple_statements",
+                        "Only a single SQL statement is allowed.",
+                        token.position,
+                    )
+                )
+                break
+        first = next((token for token in tokens if token.value != "("), tokens[0])
+        if first.upper not in ("SELECT", "WITH"):
+            errors.append(
+                SQLValidationError(
+                    "not_select",
+                    f"Only SELECT statements are allowed, found {first.value!r}.",
+                    first.position,
+                )
+            )
+        for index, token in enumerate(tokens):
+            if (
+                token.kind == "word"
+                and token.upper in _FORBIDDEN_KEYWORDS
+                and not _in_alias_position(tokens, index)
+            ):
+                errors.append(
+                    SQLValidationError(
+                        "forbidden_keyword",
+                        f"{token.upper} is not allowed; the query must only read data.",
+                        token.position,
+                    )
+                )
+        return errors
+
+    def _check_parentheses(self, tokens: List[_Token]) -> List[SQLValidationError]:
+        depth = 0
+        for token in tokens:
+            if token.value == "(":
+                depth += 1
+            elif token.value == ")":
+                depth -= 1
+                if depth < 0:
+                    return [
+                        SQLValidationError(
+                            "syntax", "Unbalanced ')' in the query.", token.position
+                        )
+                    ]
+        if depth:
+            return [SQLValidationError("syntax", "Unclosed '(' in the query.")]
+        return []
+
+    def _check_references(self, tokens: List[_Token]) -> List[SQLValidationError]:
+        errors = []
+        ctes: Set[str] = set()
+        relations: Dict[str, Optional[str]] = {}  # alias or name -> model table (None if derived)
+        declared_aliases: Set[str] = set()
+        has_derived = False
+        special_form_depths: List[int] = []
+        cast_depths: List[int] = []
+        openers: List[Optional[_Token]] = []  # token before each open "("
+        from_depths: Set[int] = set()  # depths currently inside a FROM list
+        schemas: Set[int] = set()  # indexes of schema names qualifying a table
+        depth = 0
+
+        for index, token in enumerate(tokens):
+            previous = tokens[index - 1] if index else None
+            following = tokens[index + 1] if index + 1 < len(tokens) else None
+
+            if token.value == "(":
+                openers.append(previous)
+                depth += 1
+                continue
+            if token.value == ")":
+                if special_form_depths and special_form_depths[-1] == depth:
+                    special_form_depths.pop()
+                if cast_depths and cast_depths[-1] == depth:
+                    cast_depths.pop()
+                from_depths.discard(depth)
+                opener = openers.pop() if openers else None
+                depth -= 1
+                if following is not None and (
+                    following.upper == "AS" or _is_name(following)
+                ):
+                    has_derived = True
+                    # A subquery in FROM: its alias names a relation with unknown columns
+                    if opener is not None and (
+                        opener.upper in ("FROM", "JOIN", "LATERAL")
+                        or (opener.value == "," and depth in from_depths)
+                    ):
+                        alias = following
+                        if following.upper == "AS":
+                            alias = tokens[index + 2] if index + 2 < len(tokens) else None
+                        if alias is not None:
+                            relations[alias.identifier] = None
+                continue
+            if token.kind not in ("word", "quoted"):
+                continue
+
+            in_special_form = bool(special_form_depths) and special_form_depths[-1] == depth
+            if token.upper == "FROM" and token.kind == "word" and not in_special_form:
+                from_depths.add(depth)
+            elif token.upper in _CLAUSE_KEYWORDS and token.kind == "word":
+                from_depths.discard(depth)
+
+            # CTE names: WITH name AS ( ... ), name AS ( ... )
+            if (
+                following is not None
+                and following.upper == "AS"
+                and index + 2 < len(tokens)
+                and tokens[index + 2].value == "("
+                and previous is not None
+                and (previous.upper in ("WITH", "RECURSIVE") or previous.value == ",")
+            ):
+                ctes.add(token.identifier)
+                has_derived = True
+                continue
+
+            # Function calls
+            if token.kind == "word" and following is not None and following.value == "(":
+                name = token.upper
+                if name in _SPECIAL_FORM_FUNCTIONS:
+                    special_form_depths.append(depth + 1)
+                if name == "CAST":
+                    cast_depths.append(depth + 1)
+                is_type = name in _TYPE_NAMES and previous is not None and (
+                    previous.value == "::" or previous.upper == "AS"
+                )
+                if (
+                    name not in _PAREN_KEYWORDS
+                    and not is_type
+                    and name not in self.allowed_functions
+                ):
+                    errors.append(
+                        SQLValidationError(
+                            "function_not_allowed",
+                            f"Function {name} is not in the allowed function list.",
+                            token.position,
+                        )
+                    )
+                continue
+
+            # Relations after FROM / JOIN and in comma-separated FROM lists
+            starts_relation = previous is not None and (
+                previous.upper in ("FROM", "JOIN")
+                or (previous.value == "," and depth in from_depths)
+            )
+            if starts_relation and not in_special_form and _is_name(token):
+                name = token.identifier
+                if following is not None and following.value == ".":
+                    schemas.add(index)  # schema-qualified; the table name follows the dot
+                    continue
+                self._add_relation(tokens, index, name, ctes, relations, errors)
+                continue
+            if (
+                previous is not None
+                and previous.value == "."
+                and index >= 3
+                and not in_special_form
+                and (
+                    tokens[index - 3].upper in ("FROM", "JOIN")
+                    or (tokens[index - 3].value == "," and depth in from_depths)
+                )
+            ):
+                self._add_relation(tokens, index, token.identifier, ctes, relations, errors)
+                continue
+
+            # Aliases: "AS name" or a bare name right after an expression
+            if previous is not None and previous.upper == "AS" and _is_name(token):
+                if not (cast_depths and cast_depths[-1] == depth):
+                    declared_aliases.add(token.identifier)
+                continue
+            if (
+                _is_name(token)
+                and previous is not None
+                and (
+                    previous.kind in ("number", "string")
+                    or previous.value in (")", "*")
+                    or (_is_name(previous) and not (index >= 2 and tokens[index - 2].value == "."))
+                )
+                and (following is None or following.value != ".")
+            ):
+                declared_aliases.add(token.identifier)
+
+        errors.extend(
+            self._check_columns(tokens, relations, declared_aliases, ctes, has_derived, schemas)
+        )
+        return errors
+
+    def _add_relation(self, tokens, index, name, ctes, relations, errors):
+        following = tokens[index + 1] if index + 1 < len(tokens) else None
+        alias_token = None
+        if following is not None and following.upper == "AS" and index + 2 < len(tokens):
+            alias_token = tokens[index + 2]
+        elif following is not None and _is_name(following):
+            alias_token = following
+
+        if name in ctes:
+            table = None
+        elif name in self.columns:
+            table = name
+        else:
+            errors.append(
+                SQLValidationError(
+                    "unknown_table",
+                    f'Table "{name}" does not exist. Available tables: '
+                    f"{', '.join(sorted(self.columns))}.",
+                    tokens[index].position,
+                )
+            )
+            table = None
+        relations[name] = table
+        if alias_token is not None:
+            relations[alias_token.identifier] = table
+
+    def _check_columns(self, tokens, relations, declared_aliases, ctes, has_derived, schemas):
+        errors = []
+        model_tables = {table for table in relations.values() if table is not None}
+        known_columns = set().union(*(self.columns[table] for table in model_tables))
+
+        for index, token in enumerate(tokens):
+            previous = tokens[index - 1] if index else None
+            following = tokens[index + 1] if index + 1 < len(tokens) else None
+
+            # Qualified references: qualifier.column
+            if (
+                following is not None
+                and following.value == "."
+                and index + 2 < len(tokens)
+                and _is_name(token)
+                and index not in schemas
+            ):
+                qualifier = token.identifier
+                column_token = tokens[index + 2]
+                if column_token.value == "*" or not _is_name(column_token):
+                    continue
+                if qualifier not in relations:
+                    if qualifier not in ctes:
+                        errors.append(
+                            SQLValidationError(
+                                "unknown_alias",
+                                f'"{qualifier}" is not a table or alias defined in the FROM clause.',
+                                token.position,
+                            )
+                        )
+                    continue
+                table = relations[qualifier]
+                column = column_token.identifier
+                if table is not None and column not in self.columns[table]:
+                    errors.append(
+                        SQLValidationError(
+                            "unknown_column",
+                            f'Column "{column}" does not exist in table "{table}". '
+                            f"Available columns: {', '.join(sorted(self.columns[table]))}.",
+                            column_token.position,
+                        )
+                    )
+                continue
+
+            # Unqualified references, only when every relation is a model table
+            if has_derived or not model_tables or not _is_name(token):
+                continue
+            if previous is not None and previous.value in (".", "::"):
+                continue
+            if following is not None and following.value in (".", "("):
+                continue
+            name = token.identifier
+            if name in known_columns or name in relations or name in declared_aliases:
+                continue
+            errors.append(
+                SQLValidationError(
+                    "unknown_column",
+                    f'Column "{name}" does not exist in {", ".join(sorted(model_tables))}.',
+                    token.position,
+                )
+            )
+        return errors
+
+
+def format_validation_errors(errors: List[SQLValidationError]) -> str:
+    """Formats validation errors as a message for the SQL correction prompt."""
+    return "Static validation failed:\n" + "\n".join(f"- {error}" for error in errors)